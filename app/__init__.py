@@ -1,13 +1,22 @@
 import os
 import logging
 from logging.handlers import RotatingFileHandler
-from flask import Flask, jsonify
+from flask import Flask, Request, current_app, jsonify
 from dotenv import load_dotenv
 
 from app.config import config
 from app.extensions import db, ma, cors, limiter
 
 
+class QCRequest(Request):
+    @property
+    def max_content_length(self):
+        # Views marked with app.utils.file_upload.upload_limit() allow larger bodies
+        view = current_app.view_functions.get(self.endpoint) if self.url_rule else None
+        config_key = getattr(view, 'max_content_length', None)
+        return current_app.config[config_key] if config_key else super().max_content_length
+
+
 def create_app(config_name=None):
     load_dotenv()
 
@@ -15,6 +24,7 @@ def create_app(config_name=None):
         config_name = os.environ.get('FLASK_ENV', 'development')
 
     app = Flask(__name__)
+    app.request_class = QCRequest
     app.config.from_object(config.get(config_name, config['default']))
 
     # Initialize extensions
@@ -26,6 +36,9 @@ def create_app(config_name=None):
                   methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
     limiter.init_app(app)
 
+    from app.utils import cache
+    cache.init_app(app)
+
     # Setup logging
     _setup_logging(app)
 
@@ -43,7 +56,7 @@ def create_app(config_name=None):
         response.headers['X-Content-Type-Options'] = 'nosniff'
         response.headers['X-Frame-Options'] = 'DENY'
         response.headers['Strict-Transport-Security'] = 'max-age=31536000'
-        response.headers['Cache-Control'] = 'no-store'
+        response.headers.setdefault('Cache-Control', 'no-store')
         return response
 
     # Health check (no auth)
@@ -64,6 +77,9 @@ def create_app(config_name=None):
     # Register blueprints
     _register_blueprints(app)
 
+    from app.commands import register_commands
+    register_commands(app)
+
     return app
 
 
@@ -77,6 +93,8 @@ def _register_blueprints(app):
     from app.routes.location_routes import location_bp
     from app.routes.system_config_routes import system_config_bp
     from app.routes.lookup_routes import lookup_bp
+    from app.routes.search_routes import search_bp
+    from app.routes.job_routes import job_bp
 
     app.register_blueprint(department_bp, url_prefix='/api/v1')
     app.register_blueprint(masters_bp, url_prefix='/api/v1')
@@ -87,6 +105,8 @@ def _register_blueprints(app):
     app.register_blueprint(location_bp, url_prefix='/api/v1')
     app.register_blueprint(system_config_bp, url_prefix='/api/v1')
     app.register_blueprint(lookup_bp, url_prefix='/api/v1')
+    app.register_blueprint(search_bp, url_prefix='/api/v1')
+    app.register_blueprint(job_bp, url_prefix='/api/v1')
 
 
 def _setup_logging(app):
@@ -0,0 +1,54 @@
+"""Flask CLI commands (flask --app wsgi <command>)."""
+from datetime import date
+
+import click
+from flask.cli import with_appcontext
+
+from app.services import doc_number_service, upload_gc
+
+
+def register_commands(app):
+    app.cli.add_command(uploads_gc)
+    app.cli.add_command(doc_numbers_prepare)
+
+
+@click.command('uploads-gc')
+@click.option('--dry-run', is_flag=True, help='Report what would be done; change nothing.')
+@click.option('--quarantine', is_flag=True,
+              help='Move orphaned files to UPLOAD_DIR/.quarantine/<timestamp>/ (default: only report them).')
+@click.option('--grace-hours', type=float, default=24, show_default=True,
+              help='Leave files and blobs younger than this alone.')
+@click.option('--workers', type=int, default=8, show_default=True, help='Threads scanning UPLOAD_DIR.')
+@click.option('--list', 'list_paths', is_flag=True, help='Print every orphaned and missing file.')
+@with_appcontext
+def uploads_gc(dry_run, quarantine, grace_hours, workers, list_paths):
+    """Reclaim unreferenced blobs and expired uploads; find orphaned and missing files under UPLOAD_DIR."""
+    grace = int(grace_hours * 3600)
+    prefix = '[dry run] ' if dry_run else ''
+
+    count, size = upload_gc.reclaim_blobs(grace, dry_run=dry_run)
+    click.echo(f'{prefix}Unreferenced blobs reclaimed: {count} ({size} bytes)')
+    click.echo(f'{prefix}Expired upload sessions removed: {upload_gc.purge_sessions(dry_run=dry_run)}')
+
+    target = upload_gc.quarantine_dir() if quarantine and not dry_run else None
+    stats = upload_gc.sweep_files(
+        grace, workers=workers, quarantine_dir=target,
+        on_orphan=(lambda path, size: click.echo(f'orphan  {path} ({size} bytes)')) if list_paths else None,
+        on_missing=(lambda path: click.echo(f'missing {path}')) if list_paths else None)
+    click.echo(f"Files scanned: {stats['scanned']}")
+    click.echo(f"Orphaned files: {stats['orphaned']} ({stats['orphaned_bytes']} bytes)")
+    if target:
+        click.echo(f"Quarantined: {stats['quarantined']} -> {target}")
+    elif quarantine:
+        click.echo(f"{prefix}Would quarantine: {stats['orphaned']}")
+    click.echo(f"Missing files (row without file): {stats['missing']}")
+
+
+@click.command('doc-numbers-prepare')
+@click.option('--year', type=int, help='Year to prepare (default: next year).')
+@with_appcontext
+def doc_numbers_prepare(year):
+    """Create next year's document number sequences, so the first inserts of the year do not create them."""
+    year = year or date.today().year + 1
+    created = doc_number_service.prepare_year(year)
+    click.echo(f'Document number sequences created for {year}: {created}')
@@ -2,7 +2,7 @@ from app.models.masters import (
     Department, User, Role, UserRole, Permission, RolePermission,
     UserProductAccess, SystemConfig, UserSession,
     ProductCategory, ProductGroup, Unit, Instrument, Vendor,
-    DefectType, RejectionReason, Location,
+    DefectType, RejectionReason, Location, UsageCounter,
 )
 from app.models.sampling import SamplingPlan, SamplingPlanDetail
 from app.models.qc_plans import QCPlan, QCPlanStage, QCPlanParameter
@@ -11,3 +11,5 @@ from app.models.components import (
     ComponentDocument, ComponentVendor,
 )
 from app.models.audit import AuditLog, ApprovalHistory, ComponentHistory
+from app.models.jobs import BackgroundJob
+from app.models.files import FileBlob
@@ -107,10 +107,12 @@ class ComponentDocument(db.Model):
     document_type = db.Column(db.String(50), nullable=False)
     file_name = db.Column(db.String(300), nullable=False)
     original_name = db.Column(db.String(300))
+    storage = db.Column(db.String(20), nullable=False, default='local')  # 's3': file_path is an object key
     file_path = db.Column(db.String(500))
     file_url = db.Column(db.String(500))
     file_size = db.Column(db.Integer)
     mime_type = db.Column(db.String(100))
+    content_hash = db.Column(db.String(64), db.ForeignKey('qc_file_blobs.digest'))  # NULL for pre-010 uploads
     version = db.Column(db.String(20), default='1.0')
     is_current = db.Column(db.Boolean, default=True)
     uploaded_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
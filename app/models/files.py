@@ -0,0 +1,15 @@
+from app.extensions import db
+from datetime import datetime, timezone
+
+
+class FileBlob(db.Model):
+    """Stored file content, one row per SHA-256 digest (see app.services.blob_store)."""
+    __tablename__ = 'qc_file_blobs'
+
+    digest = db.Column(db.String(64), primary_key=True)
+    storage = db.Column(db.String(20), nullable=False, default='local')  # backend holding file_path
+    file_path = db.Column(db.String(500), nullable=False)
+    file_size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)  # maintained by trg_cd_blob_refs
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    released_at = db.Column(db.DateTime(timezone=True))
@@ -0,0 +1,26 @@
+from app.extensions import db
+from datetime import datetime, timezone
+
+
+class BackgroundJob(db.Model):
+    """Async job (e.g. a large export) run by app.services.job_service."""
+    __tablename__ = 'qc_background_jobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    params_hash = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    file_path = db.Column(db.String(500))
+    file_name = db.Column(db.String(300))
+    mime_type = db.Column(db.String(100))
+    file_size = db.Column(db.BigInteger)
+    error = db.Column(db.Text)
+    created_by = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime(timezone=True))
+    updated_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    completed_at = db.Column(db.DateTime(timezone=True))
+    expires_at = db.Column(db.DateTime(timezone=True))
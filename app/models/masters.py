@@ -58,6 +58,7 @@ class Role(db.Model):
     is_system_role = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
 
 class UserRole(db.Model):
@@ -181,6 +182,7 @@ class Unit(db.Model):
     unit_type = db.Column(db.String(50))
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
 
 class Instrument(db.Model):
@@ -267,6 +269,7 @@ class DefectType(db.Model):
     description = db.Column(db.Text)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
 
 class RejectionReason(db.Model):
@@ -279,6 +282,7 @@ class RejectionReason(db.Model):
     description = db.Column(db.Text)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
 
 class Location(db.Model):
@@ -295,3 +299,15 @@ class Location(db.Model):
     is_restricted = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class UsageCounter(db.Model):
+    """Reference counts maintained by DB triggers (db/migrations/002_usage_counters.sql)."""
+    __tablename__ = 'qc_usage_counters'
+
+    ref_table = db.Column(db.String(100), primary_key=True)
+    ref_id = db.Column(db.Integer, primary_key=True)
+    usage_type = db.Column(db.String(50), primary_key=True)
+    usage_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
@@ -1,23 +1,60 @@
+import csv
+import mimetypes
 import os
-from uuid import uuid4
-from flask import Blueprint, request, g, current_app, send_from_directory
+import re
+from datetime import datetime, timezone
+from flask import Blueprint, request, g, current_app, send_from_directory, stream_with_context
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from werkzeug.http import parse_content_range_header
 from werkzeug.utils import secure_filename
 from app.extensions import db
-from app.models.components import (ComponentMaster, ComponentCheckingParam,
-                                    ComponentSpecification, ComponentDocument, ComponentVendor)
+from app.models.components import ComponentMaster, ComponentDocument
 from app.models.audit import AuditLog
+from app.models.files import FileBlob
 from app.schemas.components_schema import ComponentSchema
 from app.middleware.auth_middleware import token_required, role_required
 from app.utils.responses import success_response, error_response, validation_error
-from app.utils.pagination import get_pagination_params, paginate_query, get_sort_params
-from app.services.component_service import validate_component_refs, create_component, update_component
+from app.utils.file_upload import send_stored_file, validate_upload, upload_limit
+from app.utils.pagination import (get_pagination_params, paginate_query, get_sort_params,
+                                  use_keyset_pagination, paginate_keyset)
+from app.services.component_service import (validate_component_refs, create_component, update_component,
+                                            get_child_counts, load_component_children, child_counts_from)
+from app.services.search_service import apply_search
+from app.services.part_code_service import is_part_code_taken, check_part_codes
+from app.services.component_import import open_import_sources, import_components
+from app.services.component_export import EXPORT_FORMATS, export_format, stream_export
+from app.services.job_service import submit_job, serialize_job
+from app.services.blob_store import store_stream, store_streams, store_file, release_blob, register_uploaded_blob, blob_key
+from app.services.storage import get_storage
+from app.services.upload_sessions import (UploadSessionError, create_session, get_session, append_chunk,
+                                          completing, discard_session)
+from app.services.preview_service import is_previewable, schedule_previews, get_preview, remove_previews
+from app.services.component_clone import PartCodeConflict, clone_components, validate_part_code_rule
 from marshmallow import ValidationError
 
 component_bp = Blueprint('components', __name__)
 comp_schema = ComponentSchema()
 
 
-def _serialize_component(c, full=False):
+DOCUMENT_TYPES = ['drawing', 'test_cert', 'fqir', 'coc', 'specification', 'other', 'spec_sheet']
+SHA256_RE = re.compile(r'[0-9a-f]{64}')
+# How long after presigning /documents/complete still accepts the upload (the PUT may start just before expiry)
+UPLOAD_COMPLETE_GRACE = 3600
+
+
+def _document_urls(doc):
+    base = f'/api/v1/components/documents/{doc.id}'
+    # Previews are rendered from local files only
+    previewable = is_previewable(doc.file_name) and doc.storage == 'local'
+    return {'download_url': f'{base}/download',
+            'thumbnail_url': f'{base}/thumbnail' if previewable else None,
+            'preview_url': f'{base}/preview' if previewable else None}
+
+
+def _serialize_component(c, full=False, counts=None):
+    children = load_component_children(c.id) if full else None
+    if counts is None:
+        counts = child_counts_from(children) if full else get_child_counts([c.id])[c.id]
     category = None
     if c.category:
         category = {'id': c.category.id, 'category_code': c.category.category_code,
@@ -56,10 +93,7 @@ def _serialize_component(c, full=False):
         'pr_process_code': c.pr_process_code, 'pr_process_name': c.pr_process_name,
         'drawing_no': c.drawing_no,
         'department': department, 'primary_vendor': primary_vendor,
-        'checking_params_count': c.checking_params.count(),
-        'specifications_count': c.specifications.count(),
-        'documents_count': c.documents.count(),
-        'vendors_count': c.component_vendors.count(),
+        **counts,
         'status': c.status, 'is_deleted': c.is_deleted,
         'created_at': c.created_at.isoformat() if c.created_at else None,
         'updated_at': c.updated_at.isoformat() if c.updated_at else None,
@@ -68,7 +102,9 @@ def _serialize_component(c, full=False):
 
     if full:
         result['checking_parameters'] = []
-        for p in c.checking_params.filter_by(is_active=True).order_by(ComponentCheckingParam.sort_order).all():
+        for p in children['checking_params']:
+            if not p.is_active:
+                continue
             unit = {'id': p.unit.id, 'unit_code': p.unit.unit_code, 'unit_name': p.unit.unit_name} if p.unit else None
             inst = {'id': p.instrument.id, 'instrument_code': p.instrument.instrument_code,
                      'instrument_name': p.instrument.instrument_name} if p.instrument else None
@@ -84,17 +120,18 @@ def _serialize_component(c, full=False):
             })
         result['specifications'] = [
             {'id': s.id, 'spec_key': s.spec_key, 'spec_value': s.spec_value, 'sort_order': s.sort_order}
-            for s in c.specifications.order_by(ComponentSpecification.sort_order).all()
+            for s in children['specifications']
         ]
         result['documents'] = [
             {'id': d.id, 'document_type': d.document_type, 'file_name': d.original_name or d.file_name,
              'file_path': d.file_path, 'file_size': d.file_size, 'mime_type': d.mime_type,
              'uploaded_by': d.uploaded_by,
-             'uploaded_at': d.uploaded_at.isoformat() if d.uploaded_at else None}
-            for d in c.documents.filter_by(is_current=True).all()
+             'uploaded_at': d.uploaded_at.isoformat() if d.uploaded_at else None,
+             **_document_urls(d)}
+            for d in children['documents'] if d.is_current
         ]
         result['approved_vendors'] = []
-        for cv in c.component_vendors.all():
+        for cv in children['component_vendors']:
             v = cv.vendor
             result['approved_vendors'].append({
                 'id': cv.id, 'vendor_id': cv.vendor_id,
@@ -122,19 +159,18 @@ def get_components():
         query = query.filter_by(default_inspection_type=request.args['inspection_type'])
     if request.args.get('department_id'):
         query = query.filter_by(department_id=int(request.args['department_id']))
-    search = request.args.get('search')
-    if search:
-        query = query.filter(db.or_(
-            ComponentMaster.part_code.ilike(f'%{search}%'),
-            ComponentMaster.part_name.ilike(f'%{search}%'),
-            ComponentMaster.component_code.ilike(f'%{search}%')))
+    query = apply_search(query, 'components', request.args.get('search'))
     sort_by, sort_order = get_sort_params(
         ['part_code', 'part_name', 'component_code', 'created_at', 'updated_at'], 'created_at', 'desc')
     col = getattr(ComponentMaster, sort_by)
-    query = query.order_by(col.asc() if sort_order == 'asc' else col.desc())
     page, per_page = get_pagination_params()
-    items, meta = paginate_query(query, page, per_page)
-    return success_response(data=[_serialize_component(c) for c in items], meta=meta)
+    if use_keyset_pagination():
+        items, meta = paginate_keyset(query, sort_by, col, sort_order, ComponentMaster.id, per_page)
+    else:
+        query = query.order_by(col.asc() if sort_order == 'asc' else col.desc())
+        items, meta = paginate_query(query, page, per_page)
+    counts = get_child_counts([c.id for c in items])
+    return success_response(data=[_serialize_component(c, counts=counts[c.id]) for c in items], meta=meta)
 
 
 @component_bp.route('/components/<int:id>', methods=['GET'])
@@ -218,65 +254,128 @@ def duplicate_comp(id):
     comp = ComponentMaster.query.filter_by(id=id, is_deleted=False).first()
     if not comp:
         return error_response('Component not found', 404)
-    # Generate new part_code
-    new_code = f'{comp.part_code}-COPY'
-    suffix = 2
-    while ComponentMaster.query.filter_by(part_code=new_code, is_deleted=False).first():
-        new_code = f'{comp.part_code}-COPY-{suffix}'
-        suffix += 1
-
-    new_comp = ComponentMaster(
-        part_code=new_code, part_name=f'{comp.part_name} (Copy)',
-        part_description=comp.part_description, category_id=comp.category_id,
-        product_group_id=comp.product_group_id, qc_required=comp.qc_required,
-        qc_plan_id=comp.qc_plan_id, default_inspection_type=comp.default_inspection_type,
-        default_sampling_plan_id=comp.default_sampling_plan_id,
-        test_cert_required=comp.test_cert_required, spec_required=comp.spec_required,
-        fqir_required=comp.fqir_required, coc_required=comp.coc_required,
-        pr_process_code=comp.pr_process_code, pr_process_name=comp.pr_process_name,
-        skip_lot_enabled=comp.skip_lot_enabled,
-        skip_lot_count=comp.skip_lot_count, skip_lot_threshold=comp.skip_lot_threshold,
-        department_id=comp.department_id, primary_vendor_id=comp.primary_vendor_id,
-        status='draft', created_by=g.current_user.get('user_name'))
-    db.session.add(new_comp)
-    db.session.flush()
-
-    # Copy checking params
-    for p in comp.checking_params.filter_by(is_active=True).all():
-        db.session.add(ComponentCheckingParam(
-            component_id=new_comp.id, checking_type=p.checking_type,
-            checking_point=p.checking_point, specification=p.specification,
-            unit_id=p.unit_id, unit_code=p.unit_code,
-            nominal_value=p.nominal_value, tolerance_min=p.tolerance_min,
-            tolerance_max=p.tolerance_max, instrument_id=p.instrument_id,
-            instrument_name=p.instrument_name, input_type=p.input_type,
-            sort_order=p.sort_order, is_mandatory=p.is_mandatory))
-    for s in comp.specifications.all():
-        db.session.add(ComponentSpecification(
-            component_id=new_comp.id, spec_key=s.spec_key, spec_value=s.spec_value, sort_order=s.sort_order))
-    for cv in comp.component_vendors.all():
-        db.session.add(ComponentVendor(
-            component_id=new_comp.id, vendor_id=cv.vendor_id,
-            is_primary=cv.is_primary, unit_price=cv.unit_price, lead_time_days=cv.lead_time_days))
+    try:
+        clones, errors = clone_components([id])
+    except PartCodeConflict as e:
+        return error_response(f'{e}; try again', 409)
+    if errors:
+        return validation_error(errors)
     db.session.commit()
+    new_comp = db.session.get(ComponentMaster, clones[0]['id'])
     return success_response(data=_serialize_component(new_comp, full=True), message='Component duplicated', status_code=201)
 
 
+@component_bp.route('/components/clone', methods=['POST'])
+@token_required
+@role_required('admin')
+def clone_comps():
+    """Bulk clone as drafts: {"component_ids": [...]} or {"product_group_id": n}, plus optional
+    "part_code_rule": {"prefix", "suffix", "find", "replace"} (default suffix -COPY).
+    """
+    data = request.get_json(silent=True) or {}
+    component_ids, group_id = data.get('component_ids'), data.get('product_group_id')
+    if (component_ids is None) == (group_id is None):
+        return error_response('Provide either component_ids or product_group_id', 400)
+    if group_id is not None:
+        if not isinstance(group_id, int) or isinstance(group_id, bool):
+            return error_response('product_group_id must be an integer', 400)
+        component_ids = db.session.scalars(
+            db.select(ComponentMaster.id)
+            .where(ComponentMaster.product_group_id == group_id, ComponentMaster.is_deleted == False)
+            .order_by(ComponentMaster.part_code)).all()
+        if not component_ids:
+            return error_response('No components in this product group', 404)
+    elif (not isinstance(component_ids, list) or not component_ids
+          or any(not isinstance(i, int) or isinstance(i, bool) for i in component_ids)):
+        return error_response('component_ids must be a non-empty list of integers', 400)
+    max_clones = current_app.config.get('COMPONENT_CLONE_MAX', 5000)
+    if len(component_ids) > max_clones:
+        return error_response(f'At most {max_clones} components per clone request', 400)
+
+    rule = data.get('part_code_rule')
+    if rule is not None:
+        rule_error = validate_part_code_rule(rule)
+        if rule_error:
+            return error_response(rule_error, 400)
+
+    try:
+        clones, errors = clone_components(component_ids, rule)
+    except PartCodeConflict as e:
+        return error_response(f'{e}; try again', 409)
+    if errors:
+        return validation_error(errors)
+    db.session.commit()
+    return success_response(data=clones, message=f'{len(clones)} components cloned', status_code=201,
+                            meta={'count': len(clones)})
+
+
 @component_bp.route('/components/validate-part-code', methods=['GET'])
 @token_required
 def validate_part_code():
     part_code = request.args.get('part_code', '').strip().upper()
     if not part_code:
         return error_response('part_code parameter required', 400)
-    exists = ComponentMaster.query.filter(
-        db.func.lower(ComponentMaster.part_code) == part_code.lower(),
-        ComponentMaster.is_deleted == False).first() is not None
+    exists = is_part_code_taken(part_code)
     return success_response(data={
         'available': not exists,
         'message': f'Part code {part_code} {"already exists" if exists else "is available"}'
     })
 
 
+@component_bp.route('/components/validate-part-codes', methods=['POST'])
+@token_required
+def validate_part_codes():
+    data = request.get_json(silent=True) or {}
+    part_codes = data.get('part_codes')
+    if not isinstance(part_codes, list) or not part_codes:
+        return error_response('part_codes must be a non-empty list', 400)
+    max_codes = current_app.config.get('PART_CODE_BATCH_MAX', 20000)
+    if len(part_codes) > max_codes:
+        return error_response(f'At most {max_codes} part codes per request', 400)
+    results, duplicates = check_part_codes(part_codes)
+    available = sum(1 for r in results if r['available'])
+    return success_response(data={
+        'results': results,
+        'duplicates': duplicates,
+        'available_count': available,
+        'taken_count': len(results) - available,
+    })
+
+
+def _check_document_target(component_id, document_type, file_name=None):
+    """Error response if a document of this type (and name) may not be added to the component, else None."""
+    try:
+        if isinstance(component_id, (bool, float)):
+            raise TypeError
+        component_id = int(component_id)
+    except (TypeError, ValueError):
+        return error_response('component_id must be an integer', 400)
+    if file_name is not None and not isinstance(file_name, str):
+        return error_response('file_name must be a string', 400)
+    comp = ComponentMaster.query.filter_by(id=component_id, is_deleted=False).first()
+    if not comp:
+        return error_response('Component not found', 404)
+    if document_type not in DOCUMENT_TYPES:
+        return error_response(f'Invalid document_type. Must be one of: {", ".join(DOCUMENT_TYPES)}', 400)
+    error = validate_upload(file_name) if file_name is not None else None
+    return error_response(error, 400) if error else None
+
+
+def _serialize_document(doc):
+    return {
+        'id': doc.id, 'component_id': doc.component_id, 'document_type': doc.document_type,
+        'file_name': doc.original_name, 'file_path': doc.file_path,
+        'file_size': doc.file_size, 'mime_type': doc.mime_type,
+        'uploaded_by': doc.uploaded_by,
+        'uploaded_at': doc.uploaded_at.isoformat() if doc.uploaded_at else None,
+        **_document_urls(doc),
+    }
+
+
+def _upload_tokens():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='document-upload')
+
+
 @component_bp.route('/components/upload-document', methods=['POST'])
 @token_required
 @role_required('admin')
@@ -286,40 +385,318 @@ def upload_document():
     file = request.files.get('file')
     if not all([component_id, document_type, file]):
         return error_response('component_id, document_type, and file are required', 400)
-    comp = ComponentMaster.query.filter_by(id=int(component_id), is_deleted=False).first()
-    if not comp:
-        return error_response('Component not found', 404)
-    valid_types = ['drawing', 'test_cert', 'fqir', 'coc', 'specification', 'other', 'spec_sheet']
-    if document_type not in valid_types:
-        return error_response(f'Invalid document_type. Must be one of: {", ".join(valid_types)}', 400)
-    # File validation
+    error = _check_document_target(component_id, document_type, file.filename)
+    if error:
+        return error
     filename = secure_filename(file.filename)
-    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
-    allowed = current_app.config.get('ALLOWED_EXTENSIONS', {'pdf', 'jpg', 'jpeg', 'png', 'xlsx', 'docx'})
-    if ext not in allowed:
-        return error_response(f'File type .{ext} not allowed', 400)
-    # Save locally
-    upload_dir = os.path.join(current_app.config['UPLOAD_DIR'], 'components', str(component_id))
-    os.makedirs(upload_dir, exist_ok=True)
-    stored_name = f'{uuid4().hex}_{filename}'
-    filepath = os.path.join(upload_dir, stored_name)
-    file.save(filepath)
-    file_size = os.path.getsize(filepath)
+    # Stored once per content digest; identical files share one blob
+    blob = store_stream(file.stream)
 
     doc = ComponentDocument(
         component_id=int(component_id), document_type=document_type,
-        file_name=stored_name, original_name=file.filename,
-        file_path=filepath, file_size=file_size,
+        file_name=filename, original_name=file.filename, storage=blob.storage,
+        file_path=blob.file_path, file_size=blob.file_size, content_hash=blob.digest,
         mime_type=file.content_type, uploaded_by=g.current_user.get('user_name'))
     db.session.add(doc)
     db.session.commit()
-    return success_response(data={
-        'id': doc.id, 'component_id': doc.component_id, 'document_type': doc.document_type,
-        'file_name': doc.original_name, 'file_path': doc.file_path,
-        'file_size': doc.file_size, 'mime_type': doc.mime_type,
-        'uploaded_by': doc.uploaded_by,
-        'uploaded_at': doc.uploaded_at.isoformat() if doc.uploaded_at else None,
-    }, message='Document uploaded', status_code=201)
+    if doc.storage == 'local':
+        schedule_previews(doc.file_path, doc.file_name)
+    return success_response(data=_serialize_document(doc), message='Document uploaded', status_code=201)
+
+
+@component_bp.route('/components/documents/batch', methods=['POST'])
+@upload_limit('BATCH_UPLOAD_MAX_CONTENT_LENGTH')
+@token_required
+@role_required('admin')
+def upload_documents_batch():
+    """Upload many files (form field `files`, repeated) to one component in one request.
+
+    Files failing the type / size checks are reported and skipped; the rest are
+    stored in parallel and their document rows inserted in one transaction.
+    """
+    component_id = request.form.get('component_id')
+    document_type = request.form.get('document_type')
+    files = [f for f in request.files.getlist('files') if f.filename]
+    if not all([component_id, document_type, files]):
+        return error_response('component_id, document_type, and files are required', 400)
+    max_files = current_app.config.get('BATCH_UPLOAD_MAX_FILES')
+    if len(files) > max_files:
+        return error_response(f'At most {max_files} files per batch', 400)
+    error = _check_document_target(component_id, document_type)
+    if error:
+        return error
+
+    results, accepted = [], []
+    for index, file in enumerate(files):
+        file.stream.seek(0, os.SEEK_END)
+        size = file.stream.tell()
+        file.stream.seek(0)
+        error = validate_upload(file.filename, size)
+        results.append({'file_name': file.filename, 'status': 'rejected' if error else 'uploaded', 'error': error})
+        if not error:
+            accepted.append(index)
+    if not accepted:
+        return error_response('No file could be uploaded', 400, errors=results)
+
+    blobs = store_streams([files[i].stream for i in accepted])
+    docs = []
+    for index, blob in zip(accepted, blobs):
+        file = files[index]
+        docs.append(ComponentDocument(
+            component_id=int(component_id), document_type=document_type,
+            file_name=secure_filename(file.filename), original_name=file.filename, storage=blob.storage,
+            file_path=blob.file_path, file_size=blob.file_size, content_hash=blob.digest,
+            mime_type=file.content_type, uploaded_by=g.current_user.get('user_name')))
+    db.session.add_all(docs)
+    db.session.commit()
+    for index, doc in zip(accepted, docs):
+        results[index]['document'] = _serialize_document(doc)
+        if doc.storage == 'local':
+            schedule_previews(doc.file_path, doc.file_name)
+    return success_response(data=results, message=f'{len(docs)} of {len(files)} documents uploaded',
+                            status_code=201, meta={'uploaded': len(docs), 'rejected': len(files) - len(docs)})
+
+
+@component_bp.route('/components/documents/presign', methods=['POST'])
+@token_required
+@role_required('admin')
+def presign_document():
+    """Presigned PUT to upload a document straight to object storage; finish with /components/documents/complete.
+
+    Body: component_id, document_type, file_name, size, sha256 (hex), content_type.
+    `upload` is null when the content is already stored; complete right away.
+    """
+    storage = get_storage()
+    if not storage.direct_uploads:
+        return error_response('Direct uploads need UPLOAD_STORAGE=s3; use /components/upload-document', 400)
+    data = request.get_json(silent=True) or {}
+    component_id, document_type, file_name = data.get('component_id'), data.get('document_type'), data.get('file_name')
+    size, sha256 = data.get('size'), str(data.get('sha256') or '').lower()
+    if not all([component_id, document_type, file_name, size, sha256]):
+        return error_response('component_id, document_type, file_name, size, and sha256 are required', 400)
+    error = _check_document_target(component_id, document_type, file_name)
+    if error:
+        return error
+    if not SHA256_RE.fullmatch(sha256):
+        return error_response('sha256 must be the hex SHA-256 of the file', 400)
+    max_size = current_app.config.get('DIRECT_UPLOAD_MAX_SIZE')
+    if not isinstance(size, int) or size <= 0 or size > max_size:
+        return error_response(f'size must be between 1 and {max_size} bytes', 400)
+    content_type = data.get('content_type') or mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+
+    blob = db.session.get(FileBlob, sha256)
+    upload = None
+    if not blob or blob.file_size != size:
+        upload = storage.presign_put(storage.location(blob_key(sha256)), size, sha256, content_type)
+    token = _upload_tokens().dumps({
+        'component_id': int(component_id), 'document_type': document_type, 'file_name': file_name,
+        'size': size, 'sha256': sha256, 'content_type': content_type,
+        'user': g.current_user.get('user_name')})
+    return success_response(data={'upload': upload, 'token': token},
+                            message='Upload the file, then complete' if upload else 'File already stored')
+
+
+@component_bp.route('/components/documents/complete', methods=['POST'])
+@token_required
+@role_required('admin')
+def complete_document():
+    """Register a document uploaded through /components/documents/presign."""
+    token = (request.get_json(silent=True) or {}).get('token')
+    if not token:
+        return error_response('token is required', 400)
+    try:
+        upload = _upload_tokens().loads(
+            token, max_age=current_app.config.get('S3_PRESIGN_EXPIRY') + UPLOAD_COMPLETE_GRACE)
+    except BadSignature:
+        return error_response('Upload token is invalid or has expired', 400)
+    if upload['user'] != g.current_user.get('user_name'):
+        return error_response('Upload token belongs to another user', 403)
+    error = _check_document_target(upload['component_id'], upload['document_type'], upload['file_name'])
+    if error:
+        return error
+    blob = register_uploaded_blob(upload['sha256'], upload['size'])
+    if blob is None:
+        db.session.rollback()
+        return error_response('Uploaded file not found in storage, or it does not match size and sha256', 409)
+
+    doc = ComponentDocument(
+        component_id=upload['component_id'], document_type=upload['document_type'],
+        file_name=secure_filename(upload['file_name']), original_name=upload['file_name'], storage=blob.storage,
+        file_path=blob.file_path, file_size=blob.file_size, content_hash=blob.digest,
+        mime_type=upload['content_type'], uploaded_by=g.current_user.get('user_name'))
+    db.session.add(doc)
+    db.session.commit()
+    if doc.storage == 'local':
+        schedule_previews(doc.file_path, doc.file_name)
+    return success_response(data=_serialize_document(doc), message='Document uploaded', status_code=201)
+
+
+def _upload_session_data(session):
+    return {'upload_id': session['upload_id'], 'offset': session['offset'], 'size': session['size'],
+            'chunk_size': current_app.config.get('UPLOAD_CHUNK_SIZE'),
+            'expires_at': datetime.fromtimestamp(session['expires_at'], timezone.utc).isoformat(),
+            'upload_url': f'/api/v1/components/documents/uploads/{session["upload_id"]}'}
+
+
+def _upload_session_error(e):
+    response, status_code = error_response(str(e), e.status_code)
+    if e.offset is not None:
+        response.headers['Upload-Offset'] = str(e.offset)
+    return response, status_code
+
+
+def _own_upload_session(upload_id):
+    session = get_session(upload_id)
+    if session['user'] != g.current_user.get('user_name'):
+        raise UploadSessionError('Upload not found', 404)
+    return session
+
+
+@component_bp.route('/components/documents/uploads', methods=['POST'])
+@token_required
+@role_required('admin')
+def create_upload_session():
+    """Start a resumable upload. Body: component_id, document_type, file_name, size, sha256 (hex), content_type.
+
+    Then PUT the bytes to upload_url in chunks (Content-Range: bytes <start>-<end>/<size>), and POST
+    upload_url/complete. After a dropped connection, GET upload_url for the offset to resume from.
+    """
+    data = request.get_json(silent=True) or {}
+    component_id, document_type, file_name = data.get('component_id'), data.get('document_type'), data.get('file_name')
+    size, sha256 = data.get('size'), str(data.get('sha256') or '').lower()
+    if not all([component_id, document_type, file_name, size, sha256]):
+        return error_response('component_id, document_type, file_name, size, and sha256 are required', 400)
+    error = _check_document_target(component_id, document_type, file_name)
+    if error:
+        return error
+    if not SHA256_RE.fullmatch(sha256):
+        return error_response('sha256 must be the hex SHA-256 of the file', 400)
+    max_size = current_app.config.get('DIRECT_UPLOAD_MAX_SIZE')
+    if not isinstance(size, int) or size <= 0 or size > max_size:
+        return error_response(f'size must be between 1 and {max_size} bytes', 400)
+    session = create_session(
+        component_id=int(component_id), document_type=document_type, file_name=file_name, size=size,
+        sha256=sha256, content_type=data.get('content_type') or mimetypes.guess_type(file_name)[0],
+        user=g.current_user.get('user_name'))
+    data = _upload_session_data(session)
+    response, status_code = success_response(data=data, message='Upload started', status_code=201)
+    response.headers['Location'] = data['upload_url']
+    return response, status_code
+
+
+@component_bp.route('/components/documents/uploads/<upload_id>', methods=['GET'])
+@token_required
+@role_required('admin')
+def get_upload_session(upload_id):
+    try:
+        session = _own_upload_session(upload_id)
+    except UploadSessionError as e:
+        return _upload_session_error(e)
+    response, status_code = success_response(data=_upload_session_data(session))
+    response.headers['Upload-Offset'] = str(session['offset'])
+    return response, status_code
+
+
+@component_bp.route('/components/documents/uploads/<upload_id>', methods=['PUT'])
+@token_required
+@role_required('admin')
+def put_upload_chunk(upload_id):
+    """Append the body at the offset given by Content-Range; a chunk must start where the upload stands."""
+    content_range = parse_content_range_header(request.headers.get('Content-Range'))
+    if content_range is None or content_range.units != 'bytes' or content_range.start is None:
+        return error_response('Content-Range: bytes <start>-<end>/<size> is required', 400)
+    length = content_range.stop - content_range.start
+    if request.content_length != length:
+        return error_response('Content-Length does not match Content-Range', 400)
+    try:
+        session = _own_upload_session(upload_id)
+        if content_range.length not in (None, session['size']):
+            return error_response(f'Upload size is {session["size"]} bytes', 400)
+        offset = append_chunk(upload_id, content_range.start, length, request.stream)
+    except UploadSessionError as e:
+        return _upload_session_error(e)
+    response, status_code = success_response(data=_upload_session_data(dict(session, offset=offset)),
+                                             message='Chunk stored')
+    response.headers['Upload-Offset'] = str(offset)
+    return response, status_code
+
+
+@component_bp.route('/components/documents/uploads/<upload_id>/complete', methods=['POST'])
+@token_required
+@role_required('admin')
+def complete_upload_session(upload_id):
+    """Check the uploaded file against its sha256 and register the document."""
+    try:
+        session = _own_upload_session(upload_id)
+        error = _check_document_target(session['component_id'], session['document_type'], session['file_name'])
+        if error:
+            discard_session(upload_id)
+            return error
+        with completing(upload_id) as (session, data_path, digest):
+            blob = store_file(data_path, digest, session['size'])
+            doc = ComponentDocument(
+                component_id=session['component_id'], document_type=session['document_type'],
+                file_name=secure_filename(session['file_name']), original_name=session['file_name'],
+                storage=blob.storage, file_path=blob.file_path, file_size=blob.file_size,
+                content_hash=blob.digest, mime_type=session['content_type'],
+                uploaded_by=g.current_user.get('user_name'))
+            db.session.add(doc)
+            db.session.commit()
+    except UploadSessionError as e:
+        return _upload_session_error(e)
+    if doc.storage == 'local':
+        schedule_previews(doc.file_path, doc.file_name)
+    return success_response(data=_serialize_document(doc), message='Document uploaded', status_code=201)
+
+
+@component_bp.route('/components/documents/uploads/<upload_id>', methods=['DELETE'])
+@token_required
+@role_required('admin')
+def cancel_upload_session(upload_id):
+    try:
+        _own_upload_session(upload_id)
+    except UploadSessionError as e:
+        return _upload_session_error(e)
+    discard_session(upload_id)
+    return success_response(message='Upload cancelled')
+
+
+def _live_document(doc_id):
+    return (ComponentDocument.query.join(ComponentMaster, ComponentMaster.id == ComponentDocument.component_id)
+            .filter(ComponentDocument.id == doc_id, ComponentMaster.is_deleted == False).first())
+
+
+@component_bp.route('/components/documents/<int:doc_id>/download', methods=['GET'])
+@token_required
+def download_document(doc_id):
+    """Document file; ?inline=true to display instead of download. Range and If-None-Match supported."""
+    doc = _live_document(doc_id)
+    if not doc:
+        return error_response('Document not found', 404)
+    storage = get_storage(doc.storage)
+    if not doc.file_path or (storage.name == 'local' and not os.path.exists(doc.file_path)):
+        return error_response('Document file not found', 404)
+    inline = request.args.get('inline', '').lower() == 'true'
+    # Blob content never changes, so its digest is a strong ETag. S3 documents redirect to a presigned GET.
+    return storage.send(doc.file_path, mimetype=doc.mime_type, download_name=doc.original_name or doc.file_name,
+                            etag=doc.content_hash or True, as_attachment=not inline)
+
+
+@component_bp.route('/components/documents/<int:doc_id>/thumbnail', methods=['GET'])
+@component_bp.route('/components/documents/<int:doc_id>/preview', methods=['GET'])
+@token_required
+def document_preview(doc_id):
+    """Small JPEG of an image or a PDF's first page (thumbnail 256px, preview 1024px)."""
+    doc = _live_document(doc_id)
+    if not doc or not doc.file_path:
+        return error_response('Document not found', 404)
+    if doc.storage != 'local':
+        return error_response('No preview available for this document', 404)
+    kind = 'thumb' if request.path.endswith('/thumbnail') else 'preview'
+    path = get_preview(doc.file_path, doc.file_name, kind)
+    if not path:
+        return error_response('No preview available for this document', 404)
+    return send_stored_file(path, mimetype='image/jpeg', as_attachment=False)
 
 
 @component_bp.route('/components/documents/<int:doc_id>', methods=['DELETE'])
@@ -327,48 +704,70 @@ def upload_document():
 @role_required('admin')
 def delete_document(doc_id):
     doc = ComponentDocument.query.get_or_404(doc_id, description='Document not found')
-    if doc.file_path and os.path.exists(doc.file_path):
-        os.remove(doc.file_path)
-    db.session.delete(doc)
+    if doc.content_hash:
+        digest = doc.content_hash
+        db.session.delete(doc)
+        release_blob(digest)
+    else:
+        if doc.file_path and os.path.exists(doc.file_path):
+            os.remove(doc.file_path)
+            remove_previews(doc.file_path)
+        db.session.delete(doc)
     db.session.commit()
     return success_response(message='Document deleted')
 
 
+@component_bp.route('/components/import', methods=['POST'])
+@token_required
+@role_required('admin')
+def import_comps():
+    """Bulk import: multipart `file` (.xlsx, or .csv plus optional checking_parameters /
+    specifications / vendors CSVs). Bad rows are reported per row; valid rows are inserted."""
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return error_response('file is required (.xlsx or .csv)', 400)
+    ext = file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else ''
+    if ext not in ('xlsx', 'csv'):
+        return error_response(f'File type .{ext} not allowed. Must be .xlsx or .csv', 400)
+    dry_run = request.form.get('dry_run', 'false').lower() in ('true', '1', 'yes')
+
+    try:
+        result = import_components(open_import_sources(request.files, ext), dry_run=dry_run)
+    except (ValueError, csv.Error) as e:
+        db.session.rollback()
+        return error_response(f'Could not read import file: {e}', 400)
+    if dry_run:
+        db.session.rollback()
+        message = f'Dry run: {result["valid"]} of {result["total_rows"]} rows valid'
+    else:
+        db.session.commit()
+        message = f'{result["created"]} of {result["total_rows"]} components imported'
+    return success_response(data=result, message=message)
+
+
 @component_bp.route('/components/export', methods=['POST'])
 @token_required
 @role_required('admin', 'checker')
 def export_components():
-    from openpyxl import Workbook
-    from io import BytesIO
-    from flask import send_file
-
-    filters = request.get_json() or {}
-    query = ComponentMaster.query.filter_by(is_deleted=False)
-    if filters.get('category_id'):
-        query = query.filter_by(category_id=filters['category_id'])
-    if filters.get('status'):
-        query = query.filter_by(status=filters['status'])
-    if filters.get('qc_required') is not None:
-        query = query.filter_by(qc_required=filters['qc_required'])
-
-    components = query.order_by(ComponentMaster.part_code).all()
-    wb = Workbook()
-    ws = wb.active
-    ws.title = 'Components'
-    headers = ['Component Code', 'Part Code', 'Part Name', 'Category', 'Group',
-               'QC Required', 'Inspection Type', 'QC Plan', 'Status']
-    ws.append(headers)
-    for c in components:
-        ws.append([
-            c.component_code, c.part_code, c.part_name,
-            c.category.category_name if c.category else '',
-            c.product_group.group_name if c.product_group else '',
-            'Yes' if c.qc_required else 'No',
-            c.default_inspection_type,
-            c.qc_plan.plan_code if c.qc_plan else '',
-            c.status])
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return send_file(output, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                     as_attachment=True, download_name='components_export.xlsx')
+    """Streamed export. Format: ?format= or body `format` (xlsx, csv, ndjson), else Accept; default xlsx.
+
+    ?async=true (or body `async: true`) queues a background job and returns 202 with the job;
+    an identical export already in progress is attached to instead of built twice.
+    """
+    filters = request.get_json(silent=True) or {}
+    fmt = export_format(request.args.get('format') or filters.get('format'), request.accept_mimetypes)
+    if fmt is None:
+        return error_response(f'Invalid format. Must be one of: {", ".join(EXPORT_FORMATS)}', 400)
+    if request.args.get('async', '').lower() == 'true' or filters.get('async') is True:
+        params = {'filters': {key: filters.get(key) for key in ('category_id', 'status', 'qc_required')},
+                  'format': fmt}
+        job, attached = submit_job('component_export', params)
+        message = 'Attached to export already in progress' if attached else 'Export queued'
+        response, status_code = success_response(data=serialize_job(job), message=message, status_code=202,
+                                                 meta={'attached': attached})
+        response.headers['Location'] = f'/api/v1/jobs/{job.id}'
+        return response, status_code
+    mimetype, download_name = EXPORT_FORMATS[fmt]
+    response = current_app.response_class(stream_with_context(stream_export(filters, fmt)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={download_name}'
+    return response
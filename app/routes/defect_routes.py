@@ -5,6 +5,7 @@ from app.models.audit import AuditLog
 from app.schemas.masters_schema import DefectTypeSchema, RejectionReasonSchema
 from app.middleware.auth_middleware import token_required, role_required
 from app.utils.responses import success_response, error_response, validation_error
+from app.utils.sync import apply_since
 from marshmallow import ValidationError
 
 defect_bp = Blueprint('defects', __name__)
@@ -20,12 +21,13 @@ def get_defect_types():
         query = query.filter_by(severity_level=int(request.args['severity_level']))
     if request.args.get('defect_category'):
         query = query.filter_by(defect_category=request.args['defect_category'])
+    query, sync_meta = apply_since(query, DefectType)
     items = query.order_by(DefectType.severity_level.desc(), DefectType.defect_name).all()
     return success_response(data=[{
         'id': d.id, 'defect_code': d.defect_code, 'defect_name': d.defect_name,
         'defect_category': d.defect_category, 'severity_level': d.severity_level,
         'description': d.description, 'is_active': d.is_active,
-    } for d in items])
+    } for d in items], meta=sync_meta)
 
 
 @defect_bp.route('/defect-types', methods=['POST'])
@@ -84,11 +86,12 @@ def get_rejection_reasons():
         query = query.filter_by(is_active=True)
     if request.args.get('reason_category'):
         query = query.filter_by(reason_category=request.args['reason_category'])
+    query, sync_meta = apply_since(query, RejectionReason)
     items = query.order_by(RejectionReason.reason_name).all()
     return success_response(data=[{
         'id': r.id, 'reason_code': r.reason_code, 'reason_name': r.reason_name,
         'reason_category': r.reason_category, 'description': r.description, 'is_active': r.is_active,
-    } for r in items])
+    } for r in items], meta=sync_meta)
 
 
 @defect_bp.route('/rejection-reasons', methods=['POST'])
@@ -5,6 +5,7 @@ from app.models.audit import AuditLog
 from app.schemas.masters_schema import DepartmentSchema
 from app.middleware.auth_middleware import token_required, role_required
 from app.utils.responses import success_response, error_response, validation_error
+from app.utils.sync import apply_since
 from marshmallow import ValidationError
 
 department_bp = Blueprint('departments', __name__)
@@ -47,7 +48,9 @@ def get_departments():
         query = query.filter(db.or_(
             Department.department_code.ilike(f'%{search}%'),
             Department.department_name.ilike(f'%{search}%')))
-    return success_response(data=[_serialize_dept(d) for d in query.order_by(Department.department_name).all()])
+    query, sync_meta = apply_since(query, Department)
+    return success_response(data=[_serialize_dept(d) for d in query.order_by(Department.department_name).all()],
+                            meta=sync_meta)
 
 
 @department_bp.route('/departments', methods=['POST'])
@@ -0,0 +1,41 @@
+import os
+from flask import Blueprint
+from app.extensions import db
+from app.models.jobs import BackgroundJob
+from app.middleware.auth_middleware import token_required
+from app.utils.responses import success_response, error_response
+from app.utils.file_upload import send_stored_file
+from app.services.job_service import purge_expired_jobs, serialize_job
+
+job_bp = Blueprint('jobs', __name__)
+
+
+def _get_job(job_id):
+    purge_expired_jobs()
+    db.session.commit()
+    return db.session.get(BackgroundJob, job_id)
+
+
+@job_bp.route('/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_job(job_id):
+    """Status and progress of a background job (e.g. an async export)."""
+    job = _get_job(job_id)
+    if not job:
+        return error_response('Job not found', 404)
+    return success_response(data=serialize_job(job))
+
+
+@job_bp.route('/jobs/<job_id>/download', methods=['GET'])
+@token_required
+def download_job(job_id):
+    job = _get_job(job_id)
+    if not job:
+        return error_response('Job not found', 404)
+    if job.status == 'expired':
+        return error_response('Job result has expired', 410)
+    if job.status != 'completed':
+        return error_response(f'Job is {job.status}', 409)
+    if not job.file_path or not os.path.exists(job.file_path):
+        return error_response('Job result file not found', 410)
+    return send_stored_file(job.file_path, mimetype=job.mime_type, download_name=job.file_name)
@@ -5,6 +5,7 @@ from app.models.audit import AuditLog
 from app.schemas.masters_schema import LocationSchema
 from app.middleware.auth_middleware import token_required, role_required
 from app.utils.responses import success_response, error_response, validation_error
+from app.utils.sync import apply_since
 from marshmallow import ValidationError
 
 location_bp = Blueprint('locations', __name__)
@@ -18,13 +19,14 @@ def get_locations():
         query = query.filter_by(is_active=True)
     if request.args.get('location_type'):
         query = query.filter_by(location_type=request.args['location_type'])
+    query, sync_meta = apply_since(query, Location)
     items = query.order_by(Location.location_name).all()
     return success_response(data=[{
         'id': l.id, 'location_code': l.location_code, 'location_name': l.location_name,
         'location_type': l.location_type, 'warehouse_name': l.warehouse_name,
         'is_quarantine': l.is_quarantine, 'is_restricted': l.is_restricted,
         'odoo_location_id': l.odoo_location_id, 'is_active': l.is_active,
-    } for l in items])
+    } for l in items], meta=sync_meta)
 
 
 @location_bp.route('/locations', methods=['POST'])
@@ -1,163 +1,237 @@
+import hashlib
+
 from flask import Blueprint, request
-from app.extensions import db
+from werkzeug.datastructures import MultiDict
 from app.models.masters import (ProductCategory, ProductGroup, Unit, Instrument,
                                  Vendor, DefectType, RejectionReason, Location,
                                  Department, User, Role, UserRole)
 from app.models.sampling import SamplingPlan
 from app.models.qc_plans import QCPlan
 from app.middleware.auth_middleware import token_required
-from app.utils.responses import success_response
+from app.utils.cache import cached_lookup, get_cached_fragment
+from app.utils.responses import error_response, json_fragment_response
+from app.utils.sync import lookup_rows
 
 lookup_bp = Blueprint('lookups', __name__)
 
 
 @lookup_bp.route('/lookups/categories', methods=['GET'])
 @token_required
-def lookup_categories():
-    items = ProductCategory.query.filter_by(is_active=True).order_by(ProductCategory.sort_order).all()
-    return success_response(data=[{
-        'id': i.id, 'category_code': i.category_code, 'category_name': i.category_name
-    } for i in items])
+@cached_lookup('qc_product_categories')
+def lookup_categories(args):
+    query = ProductCategory.query.filter_by(is_active=True)
+    items = lookup_rows(query.order_by(ProductCategory.sort_order), args)
+    return [{
+        'id': i.id, 'category_code': i.category_code, 'category_name': i.category_name,
+        'is_active': active
+    } for i, active in items]
 
 
 @lookup_bp.route('/lookups/groups', methods=['GET'])
 @token_required
-def lookup_groups():
+@cached_lookup('qc_product_groups')
+def lookup_groups(args):
     query = ProductGroup.query.filter_by(is_active=True)
-    if request.args.get('category_id'):
-        query = query.filter_by(category_id=int(request.args['category_id']))
-    items = query.order_by(ProductGroup.sort_order).all()
-    return success_response(data=[{
+    if args.get('category_id'):
+        query = query.filter_by(category_id=int(args['category_id']))
+    items = lookup_rows(query.order_by(ProductGroup.sort_order), args)
+    return [{
         'id': i.id, 'group_code': i.group_code, 'group_name': i.group_name,
-        'category_id': i.category_id
-    } for i in items])
+        'category_id': i.category_id, 'is_active': active
+    } for i, active in items]
 
 
 @lookup_bp.route('/lookups/units', methods=['GET'])
 @token_required
-def lookup_units():
+@cached_lookup('qc_units')
+def lookup_units(args):
     query = Unit.query.filter_by(is_active=True)
-    if request.args.get('unit_type'):
-        query = query.filter_by(unit_type=request.args['unit_type'])
-    items = query.order_by(Unit.unit_name).all()
-    return success_response(data=[{
+    if args.get('unit_type'):
+        query = query.filter_by(unit_type=args['unit_type'])
+    items = lookup_rows(query.order_by(Unit.unit_name), args)
+    return [{
         'id': i.id, 'unit_code': i.unit_code, 'unit_name': i.unit_name,
-        'unit_symbol': i.unit_symbol, 'unit_type': i.unit_type
-    } for i in items])
+        'unit_symbol': i.unit_symbol, 'unit_type': i.unit_type, 'is_active': active
+    } for i, active in items]
 
 
 @lookup_bp.route('/lookups/instruments', methods=['GET'])
 @token_required
-def lookup_instruments():
-    items = Instrument.query.filter_by(is_active=True).order_by(Instrument.instrument_name).all()
-    return success_response(data=[{
+@cached_lookup('qc_instruments')
+def lookup_instruments(args):
+    query = Instrument.query.filter_by(is_active=True)
+    items = lookup_rows(query.order_by(Instrument.instrument_name), args)
+    return [{
         'id': i.id, 'instrument_code': i.instrument_code,
-        'instrument_name': i.instrument_name, 'instrument_type': i.instrument_type
-    } for i in items])
+        'instrument_name': i.instrument_name, 'instrument_type': i.instrument_type, 'is_active': active
+    } for i, active in items]
 
 
 @lookup_bp.route('/lookups/vendors', methods=['GET'])
 @token_required
-def lookup_vendors():
+@cached_lookup('qc_vendors')
+def lookup_vendors(args):
     query = Vendor.query.filter_by(is_active=True)
-    if request.args.get('approved_only', '').lower() == 'true':
+    if args.get('approved_only', '').lower() == 'true':
         query = query.filter_by(is_approved=True)
-    items = query.order_by(Vendor.vendor_name).all()
-    return success_response(data=[{
+    items = lookup_rows(query.order_by(Vendor.vendor_name), args)
+    return [{
         'id': i.id, 'vendor_code': i.vendor_code, 'vendor_name': i.vendor_name,
-        'is_approved': i.is_approved
-    } for i in items])
+        'is_approved': i.is_approved, 'is_active': active
+    } for i, active in items]
 
 
 @lookup_bp.route('/lookups/sampling-plans', methods=['GET'])
 @token_required
-def lookup_sampling_plans():
-    items = SamplingPlan.query.filter_by(is_active=True).order_by(SamplingPlan.plan_code).all()
-    return success_response(data=[{
+@cached_lookup('qc_sampling_plans')
+def lookup_sampling_plans(args):
+    query = SamplingPlan.query.filter_by(is_active=True)
+    items = lookup_rows(query.order_by(SamplingPlan.plan_code), args)
+    return [{
         'id': i.id, 'plan_code': i.plan_code, 'plan_name': i.plan_name,
-        'plan_type': i.plan_type
-    } for i in items])
+        'plan_type': i.plan_type, 'is_active': active
+    } for i, active in items]
 
 
 @lookup_bp.route('/lookups/qc-plans', methods=['GET'])
 @token_required
-def lookup_qc_plans():
-    items = QCPlan.query.filter_by(status='active', is_active=True).order_by(QCPlan.plan_code).all()
-    return success_response(data=[{
+@cached_lookup('qc_plans')
+def lookup_qc_plans(args):
+    query = QCPlan.query.filter_by(status='active', is_active=True)
+    items = lookup_rows(query.order_by(QCPlan.plan_code), args)
+    return [{
         'id': i.id, 'plan_code': i.plan_code, 'plan_name': i.plan_name,
-        'inspection_stages': i.inspection_stages
-    } for i in items])
+        'inspection_stages': i.inspection_stages, 'is_active': active
+    } for i, active in items]
 
 
 @lookup_bp.route('/lookups/departments', methods=['GET'])
 @token_required
-def lookup_departments():
-    items = Department.query.filter_by(is_active=True).order_by(Department.department_name).all()
-    return success_response(data=[{
-        'id': i.id, 'department_code': i.department_code, 'department_name': i.department_name
-    } for i in items])
+@cached_lookup('qc_departments')
+def lookup_departments(args):
+    query = Department.query.filter_by(is_active=True)
+    items = lookup_rows(query.order_by(Department.department_name), args)
+    return [{
+        'id': i.id, 'department_code': i.department_code, 'department_name': i.department_name,
+        'is_active': active
+    } for i, active in items]
 
 
 @lookup_bp.route('/lookups/defect-types', methods=['GET'])
 @token_required
-def lookup_defect_types():
-    items = DefectType.query.filter_by(is_active=True).order_by(DefectType.defect_name).all()
-    return success_response(data=[{
+@cached_lookup('qc_defect_types')
+def lookup_defect_types(args):
+    query = DefectType.query.filter_by(is_active=True)
+    items = lookup_rows(query.order_by(DefectType.defect_name), args)
+    return [{
         'id': i.id, 'defect_code': i.defect_code, 'defect_name': i.defect_name,
-        'defect_category': i.defect_category, 'severity_level': i.severity_level
-    } for i in items])
+        'defect_category': i.defect_category, 'severity_level': i.severity_level, 'is_active': active
+    } for i, active in items]
 
 
 @lookup_bp.route('/lookups/rejection-reasons', methods=['GET'])
 @token_required
-def lookup_rejection_reasons():
-    items = RejectionReason.query.filter_by(is_active=True).order_by(RejectionReason.reason_name).all()
-    return success_response(data=[{
+@cached_lookup('qc_rejection_reasons')
+def lookup_rejection_reasons(args):
+    query = RejectionReason.query.filter_by(is_active=True)
+    items = lookup_rows(query.order_by(RejectionReason.reason_name), args)
+    return [{
         'id': i.id, 'reason_code': i.reason_code, 'reason_name': i.reason_name,
-        'reason_category': i.reason_category
-    } for i in items])
+        'reason_category': i.reason_category, 'is_active': active
+    } for i, active in items]
 
 
 @lookup_bp.route('/lookups/locations', methods=['GET'])
 @token_required
-def lookup_locations():
+@cached_lookup('qc_locations')
+def lookup_locations(args):
     query = Location.query.filter_by(is_active=True)
-    if request.args.get('location_type'):
-        query = query.filter_by(location_type=request.args['location_type'])
-    if request.args.get('is_quarantine', '').lower() == 'true':
+    if args.get('location_type'):
+        query = query.filter_by(location_type=args['location_type'])
+    if args.get('is_quarantine', '').lower() == 'true':
         query = query.filter_by(is_quarantine=True)
-    items = query.order_by(Location.location_name).all()
-    return success_response(data=[{
+    items = lookup_rows(query.order_by(Location.location_name), args)
+    return [{
         'id': i.id, 'location_code': i.location_code, 'location_name': i.location_name,
-        'location_type': i.location_type, 'is_quarantine': i.is_quarantine
-    } for i in items])
+        'location_type': i.location_type, 'is_quarantine': i.is_quarantine, 'is_active': active
+    } for i, active in items]
 
 
 @lookup_bp.route('/lookups/users', methods=['GET'])
 @token_required
-def lookup_users():
+@cached_lookup('qc_users', 'qc_user_roles', 'qc_roles', supports_delta=False)
+def lookup_users(args):
     query = User.query.filter_by(is_active=True)
-    role_filter = request.args.get('role')
+    role_filter = args.get('role')
     if role_filter:
         query = query.join(UserRole).join(Role).filter(
             Role.role_code == role_filter, UserRole.is_active == True
         )
-    dept_filter = request.args.get('department_id')
+    dept_filter = args.get('department_id')
     if dept_filter:
         query = query.filter_by(department_id=int(dept_filter))
     items = query.order_by(User.user_name).all()
-    return success_response(data=[{
+    return [{
         'id': i.id, 'user_code': i.user_code, 'user_name': i.user_name,
         'email': i.email, 'designation': i.designation,
         'department_id': i.department_id
-    } for i in items])
+    } for i in items]
 
 
 @lookup_bp.route('/lookups/roles', methods=['GET'])
 @token_required
-def lookup_roles():
-    items = Role.query.filter_by(is_active=True).order_by(Role.role_name).all()
-    return success_response(data=[{
+@cached_lookup('qc_roles')
+def lookup_roles(args):
+    query = Role.query.filter_by(is_active=True)
+    items = lookup_rows(query.order_by(Role.role_name), args)
+    return [{
         'id': i.id, 'role_code': i.role_code, 'role_name': i.role_name,
-        'is_system_role': i.is_system_role
-    } for i in items])
+        'is_system_role': i.is_system_role, 'is_active': active
+    } for i, active in items]
+
+
+LOOKUPS = {
+    'categories': lookup_categories,
+    'groups': lookup_groups,
+    'units': lookup_units,
+    'instruments': lookup_instruments,
+    'vendors': lookup_vendors,
+    'sampling-plans': lookup_sampling_plans,
+    'qc-plans': lookup_qc_plans,
+    'departments': lookup_departments,
+    'defect-types': lookup_defect_types,
+    'rejection-reasons': lookup_rejection_reasons,
+    'locations': lookup_locations,
+    'users': lookup_users,
+    'roles': lookup_roles,
+}
+
+
+@lookup_bp.route('/lookups/bundle', methods=['GET'])
+@token_required
+def lookup_bundle():
+    """Several lookups in one response: ?include=units,vendors&units.unit_type=length
+
+    A top-level ?since= applies to every included lookup unless overridden per lookup.
+    """
+    include = request.args.get('include')
+    names = [n.strip() for n in include.split(',') if n.strip()] if include else list(LOOKUPS)
+    unknown = [n for n in names if n not in LOOKUPS]
+    if unknown:
+        return error_response(f'Unknown lookup(s): {", ".join(unknown)}', 400)
+
+    parts, sync = [], {}
+    for name in dict.fromkeys(names):
+        prefix = f'{name}.'
+        args = MultiDict([(k[len(prefix):], v) for k, v in request.args.items(multi=True)
+                          if k.startswith(prefix)])
+        if request.args.get('since') and 'since' not in args:
+            args['since'] = request.args['since']
+        fragment, sync[name] = get_cached_fragment(LOOKUPS[name].builder, args)
+        parts.append(b'"' + name.encode() + b'":' + fragment)
+    data_json = b'{' + b','.join(parts) + b'}'
+
+    response = json_fragment_response(data_json, meta={'sync': sync})
+    response.set_etag(hashlib.sha1(data_json).hexdigest())
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
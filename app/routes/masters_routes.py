@@ -1,16 +1,18 @@
 from flask import Blueprint, request, g
 from app.extensions import db
 from app.models.masters import (ProductCategory, ProductGroup, Unit, Instrument,
-                                 Vendor, Department)
-from app.models.components import ComponentMaster, ComponentCheckingParam
-from app.models.qc_plans import QCPlanParameter
+                                 Vendor, Department, UsageCounter)
 from app.models.audit import AuditLog
 from app.schemas.masters_schema import (CategorySchema, ProductGroupSchema, UnitSchema,
                                          InstrumentSchema, VendorSchema)
 from app.middleware.auth_middleware import token_required, role_required
 from app.utils.responses import success_response, error_response, validation_error
-from app.utils.pagination import get_pagination_params, paginate_query, get_sort_params
+from app.utils.pagination import (get_pagination_params, paginate_query, get_sort_params,
+                                  use_keyset_pagination, paginate_keyset)
+from app.utils.sync import apply_since
 from app.utils.validators import validate_gst, validate_pan, validate_pincode, validate_email
+from app.services.usage_service import get_usage_count, get_usage_counts
+from app.services.search_service import apply_search
 from marshmallow import ValidationError
 
 masters_bp = Blueprint('masters', __name__)
@@ -18,31 +20,46 @@ masters_bp = Blueprint('masters', __name__)
 
 # ══════ CATEGORIES ══════
 
+def _components_counter(ref_table, ref_id_col):
+    """Aliased usage counter of live components plus its outer-join condition."""
+    counter = db.aliased(UsageCounter)
+    return counter, db.and_(counter.ref_table == ref_table, counter.ref_id == ref_id_col,
+                            counter.usage_type == 'components')
+
+
 @masters_bp.route('/categories', methods=['GET'])
 @token_required
 def get_categories():
-    query = ProductCategory.query
+    # Whole tree (categories -> active groups, with component counts) in one statement
+    group_counts, group_on = _components_counter('qc_product_groups', ProductGroup.id)
+    cat_counts, cat_on = _components_counter('qc_product_categories', ProductCategory.id)
+    query = (db.session.query(ProductCategory, ProductGroup, group_counts.usage_count, cat_counts.usage_count)
+             .outerjoin(ProductGroup, db.and_(ProductGroup.category_id == ProductCategory.id,
+                                              ProductGroup.is_active == True))
+             .outerjoin(group_counts, group_on)
+             .outerjoin(cat_counts, cat_on))
     if request.args.get('is_active', '').lower() == 'true':
-        query = query.filter_by(is_active=True)
-    cats = query.order_by(ProductCategory.sort_order, ProductCategory.category_name).all()
-    result = []
-    for c in cats:
-        groups = ProductGroup.query.filter_by(category_id=c.id, is_active=True).order_by(ProductGroup.sort_order).all()
-        group_list = []
-        for g_item in groups:
-            cnt = ComponentMaster.query.filter_by(product_group_id=g_item.id, is_deleted=False).count()
-            group_list.append({'id': g_item.id, 'group_code': g_item.group_code,
-                               'group_name': g_item.group_name, 'components_count': cnt})
-        result.append({
-            'id': c.id, 'category_code': c.category_code, 'category_name': c.category_name,
-            'icon': c.icon, 'description': c.description, 'sort_order': c.sort_order,
-            'is_active': c.is_active,
-            'groups_count': len(groups),
-            'components_count': ComponentMaster.query.filter_by(category_id=c.id, is_deleted=False).count(),
-            'groups': group_list,
-            'created_at': c.created_at.isoformat() if c.created_at else None,
-        })
-    return success_response(data=result)
+        query = query.filter(ProductCategory.is_active == True)
+    rows = query.order_by(ProductCategory.sort_order, ProductCategory.category_name, ProductCategory.id,
+                          ProductGroup.sort_order, ProductGroup.id).all()
+    tree = {}
+    for c, g_item, group_cnt, cat_cnt in rows:
+        if c.id not in tree:
+            tree[c.id] = {
+                'id': c.id, 'category_code': c.category_code, 'category_name': c.category_name,
+                'icon': c.icon, 'description': c.description, 'sort_order': c.sort_order,
+                'is_active': c.is_active,
+                'groups_count': 0,
+                'components_count': cat_cnt or 0,
+                'groups': [],
+                'created_at': c.created_at.isoformat() if c.created_at else None,
+            }
+        if g_item is not None:
+            tree[c.id]['groups'].append({'id': g_item.id, 'group_code': g_item.group_code,
+                                         'group_name': g_item.group_name,
+                                         'components_count': group_cnt or 0})
+            tree[c.id]['groups_count'] += 1
+    return success_response(data=list(tree.values()))
 
 
 @masters_bp.route('/categories', methods=['POST'])
@@ -93,7 +110,7 @@ def update_category(id):
 @role_required('admin')
 def delete_category(id):
     cat = ProductCategory.query.get_or_404(id, description='Category not found')
-    if ComponentMaster.query.filter_by(category_id=id, is_deleted=False).count() > 0:
+    if get_usage_count('qc_product_categories', id, 'components') > 0:
         return error_response('Cannot delete: components reference this category', 409)
     cat.is_active = False
     AuditLog.log('qc_product_categories', cat.id, 'DELETE')
@@ -107,13 +124,17 @@ def delete_category(id):
 @token_required
 def get_groups(category_id):
     cat = ProductCategory.query.get_or_404(category_id, description='Category not found')
-    groups = ProductGroup.query.filter_by(category_id=category_id, is_active=True).order_by(ProductGroup.sort_order).all()
+    group_counts, group_on = _components_counter('qc_product_groups', ProductGroup.id)
+    rows = (db.session.query(ProductGroup, group_counts.usage_count)
+            .outerjoin(group_counts, group_on)
+            .filter(ProductGroup.category_id == category_id, ProductGroup.is_active == True)
+            .order_by(ProductGroup.sort_order, ProductGroup.id).all())
     result = []
-    for g_item in groups:
+    for g_item, cnt in rows:
         result.append({
             'id': g_item.id, 'group_code': g_item.group_code, 'group_name': g_item.group_name,
             'description': g_item.description, 'sort_order': g_item.sort_order, 'is_active': g_item.is_active,
-            'components_count': ComponentMaster.query.filter_by(product_group_id=g_item.id, is_deleted=False).count(),
+            'components_count': cnt or 0,
         })
     return success_response(data=result)
 
@@ -165,7 +186,7 @@ def update_group(id):
 @role_required('admin')
 def delete_group(id):
     grp = ProductGroup.query.get_or_404(id, description='Group not found')
-    if ComponentMaster.query.filter_by(product_group_id=id, is_deleted=False).count() > 0:
+    if get_usage_count('qc_product_groups', id, 'components') > 0:
         return error_response('Cannot delete: components reference this group', 409)
     grp.is_active = False
     db.session.commit()
@@ -182,11 +203,12 @@ def get_units():
         query = query.filter_by(unit_type=request.args['unit_type'])
     if request.args.get('is_active', '').lower() == 'true':
         query = query.filter_by(is_active=True)
+    query, sync_meta = apply_since(query, Unit)
     units = query.order_by(Unit.unit_type, Unit.unit_name).all()
     return success_response(data=[{
         'id': u.id, 'unit_code': u.unit_code, 'unit_name': u.unit_name,
         'unit_symbol': u.unit_symbol, 'unit_type': u.unit_type, 'is_active': u.is_active,
-    } for u in units])
+    } for u in units], meta=sync_meta)
 
 
 @masters_bp.route('/units', methods=['POST'])
@@ -231,9 +253,9 @@ def update_unit(id):
 @role_required('admin')
 def delete_unit(id):
     unit = Unit.query.get_or_404(id, description='Unit not found')
-    if ComponentCheckingParam.query.filter_by(unit_id=id).count() > 0:
+    if get_usage_count('qc_units', id, 'checking_params') > 0:
         return error_response('Cannot delete: referenced by checking parameters', 409)
-    if QCPlanParameter.query.filter_by(unit_id=id).count() > 0:
+    if get_usage_count('qc_units', id, 'plan_parameters') > 0:
         return error_response('Cannot delete: referenced by plan parameters', 409)
     unit.is_active = False
     db.session.commit()
@@ -270,13 +292,15 @@ def get_instruments():
         query = query.filter_by(department_id=int(request.args['department_id']))
     if request.args.get('is_active', '').lower() == 'true':
         query = query.filter_by(is_active=True)
-    search = request.args.get('search')
-    if search:
-        query = query.filter(db.or_(
-            Instrument.instrument_code.ilike(f'%{search}%'),
-            Instrument.instrument_name.ilike(f'%{search}%')))
+    query = apply_search(query, 'instruments', request.args.get('search'))
+    query, sync_meta = apply_since(query, Instrument)
     page, per_page = get_pagination_params()
-    items, meta = paginate_query(query.order_by(Instrument.instrument_name), page, per_page)
+    if use_keyset_pagination():
+        items, meta = paginate_keyset(query, 'instrument_name', Instrument.instrument_name, 'asc',
+                                      Instrument.id, per_page)
+    else:
+        items, meta = paginate_query(query.order_by(Instrument.instrument_name), page, per_page)
+    meta.update(sync_meta)
     result = [_serialize_instrument(i) for i in items]
     # Filter by calibration_status in Python (computed field)
     cal_status = request.args.get('calibration_status')
@@ -329,7 +353,7 @@ def update_instrument(id):
 @role_required('admin')
 def delete_instrument(id):
     inst = Instrument.query.get_or_404(id, description='Instrument not found')
-    if ComponentCheckingParam.query.filter_by(instrument_id=id).count() > 0:
+    if get_usage_count('qc_instruments', id, 'checking_params') > 0:
         return error_response('Cannot delete: referenced by checking parameters', 409)
     inst.is_active = False
     db.session.commit()
@@ -338,7 +362,9 @@ def delete_instrument(id):
 
 # ══════ VENDORS ══════
 
-def _serialize_vendor(v):
+def _serialize_vendor(v, components_count=None):
+    if components_count is None:
+        components_count = get_usage_count('qc_vendors', v.id, 'primary_components')
     return {
         'id': v.id, 'vendor_code': v.vendor_code, 'vendor_name': v.vendor_name,
         'vendor_type': v.vendor_type, 'contact_person': v.contact_person,
@@ -350,7 +376,7 @@ def _serialize_vendor(v):
         'quality_rating': float(v.quality_rating) if v.quality_rating else None,
         'delivery_rating': float(v.delivery_rating) if v.delivery_rating else None,
         'odoo_partner_id': v.odoo_partner_id, 'is_active': v.is_active,
-        'components_count': ComponentMaster.query.filter_by(primary_vendor_id=v.id, is_deleted=False).count(),
+        'components_count': components_count,
         'created_at': v.created_at.isoformat() if v.created_at else None,
     }
 
@@ -363,19 +389,20 @@ def get_vendors():
         query = query.filter_by(is_active=True)
     if request.args.get('is_approved', '').lower() == 'true':
         query = query.filter_by(is_approved=True)
-    search = request.args.get('search')
-    if search:
-        query = query.filter(db.or_(
-            Vendor.vendor_code.ilike(f'%{search}%'),
-            Vendor.vendor_name.ilike(f'%{search}%'),
-            Vendor.city.ilike(f'%{search}%')))
+    query = apply_search(query, 'vendors', request.args.get('search'))
     sort_by, sort_order = get_sort_params(
         ['vendor_name', 'vendor_code', 'city', 'created_at'], 'vendor_name', 'asc')
     col = getattr(Vendor, sort_by)
-    query = query.order_by(col.asc() if sort_order == 'asc' else col.desc())
+    query, sync_meta = apply_since(query, Vendor)
     page, per_page = get_pagination_params()
-    items, meta = paginate_query(query, page, per_page)
-    return success_response(data=[_serialize_vendor(v) for v in items], meta=meta)
+    if use_keyset_pagination():
+        items, meta = paginate_keyset(query, sort_by, col, sort_order, Vendor.id, per_page)
+    else:
+        query = query.order_by(col.asc() if sort_order == 'asc' else col.desc())
+        items, meta = paginate_query(query, page, per_page)
+    meta.update(sync_meta)
+    counts = get_usage_counts('qc_vendors', [v.id for v in items], 'primary_components')
+    return success_response(data=[_serialize_vendor(v, counts[v.id]) for v in items], meta=meta)
 
 
 @masters_bp.route('/vendors', methods=['POST'])
@@ -3,12 +3,15 @@ from app.extensions import db
 from app.models.qc_plans import QCPlan, QCPlanStage, QCPlanParameter
 from app.models.sampling import SamplingPlan
 from app.models.masters import Unit, Instrument
-from app.models.components import ComponentMaster
 from app.models.audit import AuditLog
 from app.schemas.qc_plans_schema import QCPlanSchema
 from app.middleware.auth_middleware import token_required, role_required
 from app.utils.responses import success_response, error_response, validation_error
-from app.utils.pagination import get_pagination_params, paginate_query
+from app.utils.pagination import get_pagination_params, paginate_query, use_keyset_pagination, paginate_keyset
+from app.utils.sync import apply_since
+from app.services.usage_service import get_usage_count, get_usage_counts
+from app.services.search_service import apply_search
+from app.services.ref_validation import RefValidator
 from marshmallow import ValidationError
 
 qc_plans_bp = Blueprint('qc_plans', __name__)
@@ -53,7 +56,9 @@ def _serialize_stage(s):
     }
 
 
-def _serialize_plan(p, full=False):
+def _serialize_plan(p, full=False, components_using=None):
+    if components_using is None:
+        components_using = get_usage_count('qc_plans', p.id, 'components')
     result = {
         'id': p.id, 'plan_code': p.plan_code, 'plan_name': p.plan_name,
         'plan_type': p.plan_type, 'revision': p.revision,
@@ -63,7 +68,7 @@ def _serialize_plan(p, full=False):
         'status': p.status, 'is_active': p.is_active,
         'stages_count': p.stages.count(),
         'parameters_count': sum(s.parameters.count() for s in p.stages.all()),
-        'components_using': ComponentMaster.query.filter_by(qc_plan_id=p.id, is_deleted=False).count(),
+        'components_using': components_using,
         'created_at': p.created_at.isoformat() if p.created_at else None,
         'updated_at': p.updated_at.isoformat() if p.updated_at else None,
     }
@@ -72,20 +77,38 @@ def _serialize_plan(p, full=False):
     return result
 
 
+def _validate_stage_refs(stages):
+    """FK checks for stages and their parameters: one IN query per referenced table."""
+    refs = RefValidator()
+    for i, stage in enumerate(stages):
+        refs.check(SamplingPlan, stage.get('sampling_plan_id'), f'stages[{i}].sampling_plan_id',
+                   'Invalid or inactive sampling plan')
+        if not stage.get('parameters'):
+            refs.error(f'stages[{i}].parameters', 'At least 1 parameter required per stage')
+        for j, param in enumerate(stage.get('parameters', [])):
+            refs.check(Unit, param.get('unit_id'), f'stages[{i}].parameters[{j}].unit_id',
+                       'Invalid or inactive unit')
+            refs.check(Instrument, param.get('instrument_id'), f'stages[{i}].parameters[{j}].instrument_id',
+                       'Invalid instrument')
+    return refs.validate()
+
+
 @qc_plans_bp.route('/qc-plans', methods=['GET'])
 @token_required
 def get_qc_plans():
     query = QCPlan.query
     if request.args.get('status'):
         query = query.filter_by(status=request.args['status'])
-    search = request.args.get('search')
-    if search:
-        query = query.filter(db.or_(
-            QCPlan.plan_code.ilike(f'%{search}%'),
-            QCPlan.plan_name.ilike(f'%{search}%')))
+    query = apply_search(query, 'qc_plans', request.args.get('search'))
+    query, sync_meta = apply_since(query, QCPlan)
     page, per_page = get_pagination_params()
-    items, meta = paginate_query(query.order_by(QCPlan.plan_code), page, per_page)
-    return success_response(data=[_serialize_plan(p) for p in items], meta=meta)
+    if use_keyset_pagination():
+        items, meta = paginate_keyset(query, 'plan_code', QCPlan.plan_code, 'asc', QCPlan.id, per_page)
+    else:
+        items, meta = paginate_query(query.order_by(QCPlan.plan_code), page, per_page)
+    meta.update(sync_meta)
+    counts = get_usage_counts('qc_plans', [p.id for p in items], 'components')
+    return success_response(data=[_serialize_plan(p, components_using=counts[p.id]) for p in items], meta=meta)
 
 
 @qc_plans_bp.route('/qc-plans/<int:id>', methods=['GET'])
@@ -108,19 +131,7 @@ def create_qc_plan():
     if QCPlan.query.filter(db.func.lower(QCPlan.plan_code) == data['plan_code'].lower()).first():
         return error_response('Plan code already exists', 409)
     # Validate FK references
-    errors = []
-    for i, stage in enumerate(data.get('stages', [])):
-        if stage.get('sampling_plan_id'):
-            sp = SamplingPlan.query.filter_by(id=stage['sampling_plan_id'], is_active=True).first()
-            if not sp:
-                errors.append({'field': f'stages[{i}].sampling_plan_id', 'message': 'Invalid or inactive sampling plan'})
-        if not stage.get('parameters'):
-            errors.append({'field': f'stages[{i}].parameters', 'message': 'At least 1 parameter required per stage'})
-        for j, param in enumerate(stage.get('parameters', [])):
-            if param.get('unit_id') and not Unit.query.filter_by(id=param['unit_id'], is_active=True).first():
-                errors.append({'field': f'stages[{i}].parameters[{j}].unit_id', 'message': 'Invalid or inactive unit'})
-            if param.get('instrument_id') and not Instrument.query.filter_by(id=param['instrument_id'], is_active=True).first():
-                errors.append({'field': f'stages[{i}].parameters[{j}].instrument_id', 'message': 'Invalid instrument'})
+    errors = _validate_stage_refs(data['stages'])
     if errors:
         return validation_error(errors)
 
@@ -182,6 +193,10 @@ def update_qc_plan(id):
     if 'plan_code' in data and data['plan_code'].lower() != plan.plan_code.lower():
         if QCPlan.query.filter(db.func.lower(QCPlan.plan_code) == data['plan_code'].lower(), QCPlan.id != id).first():
             return error_response('Plan code already exists', 409)
+    if 'stages' in data:
+        errors = _validate_stage_refs(data['stages'])
+        if errors:
+            return validation_error(errors)
     for k in ('plan_code', 'plan_name', 'plan_type', 'revision', 'revision_date',
               'effective_date', 'requires_visual', 'requires_functional', 'document_number'):
         if k in data:
@@ -230,7 +245,7 @@ def delete_qc_plan(id):
     plan = QCPlan.query.get_or_404(id, description='QC Plan not found')
     if plan.status != 'draft':
         return error_response('Only draft plans can be deleted', 409)
-    if ComponentMaster.query.filter_by(qc_plan_id=id, is_deleted=False).count() > 0:
+    if get_usage_count('qc_plans', id, 'components') > 0:
         return error_response('Cannot delete: referenced by components', 409)
     plan.is_active = False
     plan.status = 'superseded'
@@ -1,26 +1,29 @@
 from flask import Blueprint, request, g
 from app.extensions import db
 from app.models.sampling import SamplingPlan, SamplingPlanDetail
-from app.models.components import ComponentMaster
-from app.models.qc_plans import QCPlanStage
 from app.models.audit import AuditLog
 from app.schemas.sampling_schema import SamplingPlanSchema
 from app.middleware.auth_middleware import token_required, role_required
 from app.utils.responses import success_response, error_response, validation_error
+from app.utils.sync import apply_since
+from app.services.usage_service import get_usage_count, get_usage_counts
+from app.services.search_service import apply_search
 from marshmallow import ValidationError
 
 sampling_bp = Blueprint('sampling', __name__)
 plan_schema = SamplingPlanSchema()
 
 
-def _serialize_plan(p, include_details=True):
+def _serialize_plan(p, include_details=True, referenced_by=None):
+    if referenced_by is None:
+        referenced_by = get_usage_count('qc_sampling_plans', p.id, 'components')
+    details = p.details.order_by(SamplingPlanDetail.lot_size_min).all() if include_details else None
     result = {
         'id': p.id, 'plan_code': p.plan_code, 'plan_name': p.plan_name,
         'plan_type': p.plan_type, 'aql_level': p.aql_level,
         'inspection_level': p.inspection_level, 'is_active': p.is_active,
-        'details_count': p.details.count(),
-        'referenced_by_components': ComponentMaster.query.filter_by(
-            default_sampling_plan_id=p.id, is_deleted=False).count(),
+        'details_count': len(details) if details is not None else p.details.count(),
+        'referenced_by_components': referenced_by,
         'created_at': p.created_at.isoformat() if p.created_at else None,
         'updated_at': p.updated_at.isoformat() if p.updated_at else None,
     }
@@ -29,7 +32,7 @@ def _serialize_plan(p, include_details=True):
             'id': d.id, 'lot_size_min': d.lot_size_min, 'lot_size_max': d.lot_size_max,
             'sample_size': d.sample_size, 'accept_number': d.accept_number,
             'reject_number': d.reject_number,
-        } for d in p.details.order_by(SamplingPlanDetail.lot_size_min).all()]
+        } for d in details]
     return result
 
 
@@ -41,13 +44,11 @@ def get_sampling_plans():
         query = query.filter_by(is_active=True)
     if request.args.get('plan_type'):
         query = query.filter_by(plan_type=request.args['plan_type'])
-    search = request.args.get('search')
-    if search:
-        query = query.filter(db.or_(
-            SamplingPlan.plan_code.ilike(f'%{search}%'),
-            SamplingPlan.plan_name.ilike(f'%{search}%')))
+    query = apply_search(query, 'sampling_plans', request.args.get('search'))
+    query, sync_meta = apply_since(query, SamplingPlan)
     plans = query.order_by(SamplingPlan.plan_code).all()
-    return success_response(data=[_serialize_plan(p) for p in plans])
+    counts = get_usage_counts('qc_sampling_plans', [p.id for p in plans], 'components')
+    return success_response(data=[_serialize_plan(p, referenced_by=counts[p.id]) for p in plans], meta=sync_meta)
 
 
 @sampling_bp.route('/sampling-plans/<int:id>', methods=['GET'])
@@ -112,9 +113,9 @@ def update_sampling_plan(id):
 @role_required('admin')
 def delete_sampling_plan(id):
     plan = SamplingPlan.query.get_or_404(id, description='Sampling plan not found')
-    if QCPlanStage.query.filter_by(sampling_plan_id=id).count() > 0:
+    if get_usage_count('qc_sampling_plans', id, 'plan_stages') > 0:
         return error_response('Cannot delete: referenced by QC plan stages', 409)
-    if ComponentMaster.query.filter_by(default_sampling_plan_id=id, is_deleted=False).count() > 0:
+    if get_usage_count('qc_sampling_plans', id, 'components') > 0:
         return error_response('Cannot delete: referenced by components', 409)
     plan.is_active = False
     db.session.commit()
@@ -0,0 +1,34 @@
+from flask import Blueprint, request
+from app.middleware.auth_middleware import token_required
+from app.utils.responses import success_response, error_response
+from app.services.search_service import SEARCH_TYPES, global_search
+
+search_bp = Blueprint('search', __name__)
+
+MIN_QUERY_LENGTH = 3  # shorter terms have no trigrams for the index to use
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+@search_bp.route('/search', methods=['GET'])
+@token_required
+def search():
+    """Ranked top-k matches per entity type: ?q=valve&types=components,vendors&limit=10"""
+    q = (request.args.get('q') or '').strip()
+    if len(q) < MIN_QUERY_LENGTH:
+        return error_response(f'Search term must be at least {MIN_QUERY_LENGTH} characters', 400)
+
+    types_param = request.args.get('types')
+    types = [t.strip() for t in types_param.split(',') if t.strip()] if types_param else list(SEARCH_TYPES)
+    unknown = [t for t in types if t not in SEARCH_TYPES]
+    if unknown:
+        return error_response(f'Unknown search type(s): {", ".join(unknown)}', 400)
+
+    try:
+        limit = int(request.args.get('limit', DEFAULT_LIMIT))
+    except (ValueError, TypeError):
+        limit = DEFAULT_LIMIT
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    results = global_search(q, list(dict.fromkeys(types)), limit)
+    return success_response(data=results, meta={'q': q, 'limit': limit})
@@ -3,7 +3,7 @@ from app.utils.validators import sanitize_string
 
 
 class CheckingParamSchema(Schema):
-    id = fields.Int(dump_only=True)
+    id = fields.Int(allow_none=True)  # existing row on update; omit for new rows
     checking_type = fields.Str(required=True, validate=validate.OneOf(['visual', 'functional']))
     checking_point = fields.Str(required=True, validate=validate.Length(min=1, max=200))
     specification = fields.Str(validate=validate.Length(max=500), load_default=None)
@@ -34,7 +34,7 @@ class CheckingParamSchema(Schema):
 
 
 class SpecificationSchema(Schema):
-    id = fields.Int(dump_only=True)
+    id = fields.Int(allow_none=True)  # existing row on update; omit for new rows
     spec_key = fields.Str(required=True, validate=validate.Length(min=1, max=100))
     spec_value = fields.Str(required=True, validate=validate.Length(min=1, max=500))
     sort_order = fields.Int(load_default=0)
@@ -48,7 +48,7 @@ class SpecificationSchema(Schema):
 
 
 class ComponentVendorSchema(Schema):
-    id = fields.Int(dump_only=True)
+    id = fields.Int(allow_none=True)  # existing row on update; omit for new rows
     vendor_id = fields.Int(required=True)
     is_primary = fields.Bool(load_default=False)
     is_approved = fields.Bool(load_default=False)
@@ -173,5 +173,11 @@ class ComponentSchema(Schema):
         if len(vendor_ids) != len(set(vendor_ids)):
             errors.append({'field': 'approved_vendors', 'message': 'Duplicate vendor_id found'})
 
+        # Validate no duplicate child row ids
+        for key in ('checking_parameters', 'specifications', 'approved_vendors'):
+            ids = [c['id'] for c in data.get(key, []) if c.get('id')]
+            if len(ids) != len(set(ids)):
+                errors.append({'field': key, 'message': 'Duplicate id found'})
+
         if errors:
             raise ValidationError(errors)
@@ -0,0 +1,183 @@
+"""Content-addressed file storage, keyed blobs/ab/cd/<digest> in the storage backend.
+
+store_stream() copies an upload to a temp file once, hashing it on the way, then
+upserts the qc_file_blobs row for the digest (store_streams() does the same for
+a batch, copying the files in parallel). If the content is already stored,
+the temp file is dropped and nothing else is written. Otherwise it is moved into
+place (renamed under UPLOAD_DIR, or uploaded to the bucket). Content a client
+PUT straight to the bucket is registered by register_uploaded_blob(). Rows that
+reference a blob (content_hash) are counted by trg_cd_blob_refs (migration 010).
+
+Both the upsert and release_blob() lock the blob row. A blob is deleted only
+while locked with ref_count = 0, so an upload of the same content either lands
+before the delete (and keeps the blob) or after it (and writes the file again).
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import current_app
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.extensions import db
+from app.models.files import FileBlob
+from app.services.preview_service import remove_previews
+from app.services.storage import get_storage
+
+CHUNK_SIZE = 1024 * 1024
+
+_pool = {'pid': None, 'executor': None}
+_pool_lock = threading.Lock()
+
+
+def _blob_root():
+    return os.path.join(current_app.config['UPLOAD_DIR'], 'blobs')
+
+
+def blob_key(digest):
+    return f'blobs/{digest[:2]}/{digest[2:4]}/{digest}'
+
+
+def _tmp_dir():
+    # Beside the blobs (same filesystem, so the final move is a rename)
+    tmp_dir = os.path.join(_blob_root(), '.tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    return tmp_dir
+
+
+def _spool(stream, tmp_dir):
+    """Copy stream to a temp file in tmp_dir. Returns (tmp_path, sha256 hex, size)."""
+    sha, size = hashlib.sha256(), 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while chunk := stream.read(CHUNK_SIZE):
+                sha.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, sha.hexdigest(), size
+
+
+def store_stream(stream):
+    """Store the stream's content once by SHA-256. Returns the FileBlob (row locked until commit).
+
+    The caller links it with content_hash=blob.digest in the same transaction.
+    """
+    tmp_path, digest, size = _spool(stream, _tmp_dir())
+    try:
+        return store_file(tmp_path, digest, size)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _upsert_blobs(sizes, storage):
+    """Insert or lock the rows for {digest: size}; new rows go to `storage`, existing ones keep their backend.
+
+    Rows are locked in digest order, so concurrent callers cannot deadlock.
+    Returns {digest: FileBlob}.
+    """
+    digests = sorted(sizes)
+    # Waits for a concurrent release_blob() of the same digest to finish
+    insert = pg_insert(FileBlob.__table__).values([
+        {'digest': d, 'storage': storage.name, 'file_path': storage.location(blob_key(d)), 'file_size': sizes[d]}
+        for d in digests])
+    db.session.execute(insert.on_conflict_do_update(index_elements=['digest'],
+                                                    set_={'file_size': insert.excluded.file_size}))
+    blobs = db.session.execute(db.select(FileBlob).where(FileBlob.digest.in_(digests))
+                               .execution_options(populate_existing=True)).scalars()
+    return {blob.digest: blob for blob in blobs}
+
+
+def _upsert_blob(digest, size, storage):
+    return _upsert_blobs({digest: size}, storage)[digest]
+
+
+def _executor():
+    pid = os.getpid()
+    if _pool['pid'] != pid:
+        with _pool_lock:
+            if _pool['pid'] != pid:
+                _pool['executor'] = ThreadPoolExecutor(max_workers=current_app.config.get('UPLOAD_WORKERS', 4),
+                                                       thread_name_prefix='qc-upload')
+                _pool['pid'] = pid
+    return _pool['executor']
+
+
+def _place(storage, tmp_path, location):
+    if not storage.exists(location):
+        storage.put_file(tmp_path, location)
+
+
+def store_streams(streams):
+    """store_stream() for many files at once. Returns one FileBlob per stream, in order.
+
+    Copying, hashing and moving files into place run on a bounded per-process
+    pool (UPLOAD_WORKERS); the rows are upserted here, in one statement.
+    """
+    executor, tmp_dir = _executor(), _tmp_dir()
+    spools, moves = [executor.submit(_spool, stream, tmp_dir) for stream in streams], []
+    try:
+        spooled = [spool.result() for spool in spools]
+        tmp_paths = {digest: tmp_path for tmp_path, digest, _ in spooled}
+        blobs = _upsert_blobs({digest: size for _, digest, size in spooled}, get_storage())
+        moves = [executor.submit(_place, get_storage(blob.storage), tmp_paths[digest], blob.file_path)
+                 for digest, blob in blobs.items()]
+        for move in moves:
+            move.result()
+        return [blobs[digest] for _, digest, _ in spooled]
+    finally:
+        wait(spools + moves)
+        for spool in spools:
+            if spool.exception() is None and os.path.exists(spool.result()[0]):
+                os.remove(spool.result()[0])
+
+
+def store_file(tmp_path, digest, size):
+    """Register a hashed temp file under its digest, moving it into place unless the content is stored already."""
+    blob = _upsert_blob(digest, size, get_storage())
+    storage = get_storage(blob.storage)
+    if not storage.exists(blob.file_path):
+        storage.put_file(tmp_path, blob.file_path)
+    return blob
+
+
+def register_uploaded_blob(digest, size):
+    """Register content a client uploaded to the bucket itself. None if the object is missing or does not match.
+
+    The presigned PUT signs the SHA-256 header, so the store has already checked
+    the body against the digest. On None the caller rolls back.
+    """
+    storage = get_storage()
+    blob = _upsert_blob(digest, size, storage)
+    if blob.storage != storage.name:
+        # Same content already stored elsewhere; the new object is left for cleanup
+        return blob if get_storage(blob.storage).exists(blob.file_path) else None
+    return blob if storage.has_upload(blob.file_path, size, digest) else None
+
+
+def release_blob(digest):
+    """Delete a blob no document references any more (call after deleting the referencing row)."""
+    if not digest:
+        return False
+    db.session.flush()
+    blob = db.session.execute(
+        db.select(FileBlob).where(FileBlob.digest == digest).with_for_update()
+        .execution_options(populate_existing=True)).scalar_one_or_none()
+    if blob is None or blob.ref_count > 0:
+        return False
+    path, storage = blob.file_path, get_storage(blob.storage)
+    db.session.delete(blob)
+    db.session.flush()
+    # Removed before commit while the row lock is held; store_file() rewrites a missing file
+    storage.delete(path)
+    if storage.name == 'local':
+        remove_previews(path)
+    return True
@@ -0,0 +1,204 @@
+"""Server-side component cloning.
+
+Masters are copied with one INSERT ... SELECT ... RETURNING and each child table
+with one INSERT ... SELECT, joined to a VALUES list mapping source ids to new
+part codes / new ids, so no source row is loaded into the ORM. Free part codes
+for the whole batch come from one query over all candidate codes.
+
+A concurrent create or clone can take one of those codes before the insert; the
+masters are then inserted once more with freshly looked-up codes, and a second
+collision raises PartCodeConflict.
+"""
+import re
+
+from flask import g
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.components import ComponentMaster, ComponentCheckingParam, ComponentSpecification, ComponentVendor
+from app.models.audit import AuditLog
+from app.services.doc_number_service import allocate_numbers
+
+RULE_KEYS = ('prefix', 'suffix', 'find', 'replace')
+DEFAULT_RULE = {'suffix': '-COPY'}
+PART_CODE_MAX_LENGTH = 100
+PART_CODE_RE = re.compile(r'^[A-Za-z0-9\-]+$')  # as ComponentSchema.part_code
+PART_NAME_MAX_LENGTH = 300
+CODE_WINDOW = 10  # numbered candidates checked per base in one query
+PART_CODE_CONSTRAINT = 'qc_component_master_part_code_key'
+PART_CODE_DETAIL_RE = re.compile(r'\(part_code\)=\((.*)\)')
+
+# Columns copied from the source master (part_code / part_name / status are set per clone)
+MASTER_COLUMNS = [
+    'part_description', 'category_id', 'product_group_id', 'qc_required', 'qc_plan_id',
+    'default_inspection_type', 'default_sampling_plan_id', 'test_cert_required', 'spec_required',
+    'fqir_required', 'coc_required', 'pr_process_code', 'pr_process_name', 'skip_lot_enabled',
+    'skip_lot_count', 'skip_lot_threshold', 'department_id', 'primary_vendor_id',
+]
+# (model, copied columns, extra filter on source rows)
+CHILD_COLUMNS = [
+    (ComponentCheckingParam,
+     ['checking_type', 'checking_point', 'specification', 'unit_id', 'unit_code', 'nominal_value',
+      'tolerance_min', 'tolerance_max', 'instrument_id', 'instrument_name', 'input_type',
+      'sort_order', 'is_mandatory'],
+     ComponentCheckingParam.is_active == True),
+    (ComponentSpecification, ['spec_key', 'spec_value', 'sort_order'], None),
+    (ComponentVendor, ['vendor_id', 'is_primary', 'unit_price', 'lead_time_days'], None),
+]
+
+
+class PartCodeConflict(Exception):
+    """A new part code was taken by a concurrent request between lookup and insert."""
+
+    def __init__(self, part_code):
+        super().__init__(f'Part code {part_code} is already taken' if part_code else 'A new part code is already taken')
+        self.part_code = part_code
+
+
+def validate_part_code_rule(rule):
+    """Error message for a malformed part-code rule, or None."""
+    if not isinstance(rule, dict) or not rule:
+        return f'part_code_rule must be an object with any of: {", ".join(RULE_KEYS)}'
+    unknown = [key for key in rule if key not in RULE_KEYS]
+    if unknown:
+        return f'Unknown part_code_rule key(s): {", ".join(unknown)}'
+    if any(not isinstance(value, str) for value in rule.values()):
+        return 'part_code_rule values must be strings'
+    if 'replace' in rule and not rule.get('find'):
+        return 'part_code_rule.replace requires find'
+    return None
+
+
+def apply_part_code_rule(part_code, rule):
+    """prefix + part_code (with find -> replace) + suffix, upper-cased like other part codes."""
+    if rule.get('find'):
+        part_code = part_code.replace(rule['find'], rule.get('replace', ''))
+    return f'{rule.get("prefix", "")}{part_code}{rule.get("suffix", "")}'.strip().upper()
+
+
+def _numbered(base, n):
+    return base if n == 1 else f'{base}-{n}'
+
+
+def free_part_codes(bases):
+    """One free code per base, in order: base if free, else base-2, base-3, ...
+
+    A code is taken if any component row has it (the unique constraint includes
+    deleted rows) or a live component has it in another case. Codes handed out
+    earlier in the batch count as taken. One query per CODE_WINDOW candidates.
+    """
+    result = [None] * len(bases)
+    taken = set()
+    pending = list(range(len(bases)))
+    start = 1
+    while pending:
+        candidates = {i: [_numbered(bases[i], n) for n in range(start, start + CODE_WINDOW)] for i in pending}
+        codes = sorted({code for names in candidates.values() for code in names})
+        # One array parameter per side, joined via unnest: a long literal IN list or `= ANY(array)`
+        # costs seconds at a few thousand codes, the semi-join stays on the two part-code indexes
+        exact = db.select(db.func.unnest(db.literal(codes, ARRAY(db.String)))).scalar_subquery()
+        lowered = db.select(db.func.unnest(db.literal([code.lower() for code in codes], ARRAY(db.String)))).scalar_subquery()
+        rows = db.session.scalars(db.select(ComponentMaster.part_code).where(db.or_(
+            ComponentMaster.part_code.in_(exact),
+            db.and_(ComponentMaster.is_deleted == False, db.func.lower(ComponentMaster.part_code).in_(lowered)))))
+        taken.update(code.lower() for code in rows)
+        still_pending = []
+        for i in pending:
+            code = next((name for name in candidates[i] if name.lower() not in taken), None)
+            if code is None:
+                still_pending.append(i)
+                continue
+            result[i] = code
+            taken.add(code.lower())
+        pending = still_pending
+        start += CODE_WINDOW
+    return result
+
+
+def _unnest(name, with_ordinality=None, **columns):
+    """FROM unnest(:array, ...) AS name(col, ...): one bind per column, unlike VALUES which binds every cell."""
+    arrays = [db.literal(values, ARRAY(type_)) for values, type_ in columns.values()]
+    return db.func.unnest(*arrays).table_valued(
+        *[db.column(col, type_) for col, (_, type_) in columns.items()],
+        with_ordinality=with_ordinality).render_derived(name=name, with_types=False)
+
+
+def _insert_masters(source_ids, new_codes, name_suffix):
+    """INSERT ... SELECT the master rows; returns (id, part_code, component_code) rows."""
+    component_codes = allocate_numbers('component', len(source_ids))
+    code_map = _unnest('clone_codes', src_id=(source_ids, db.Integer), new_part_code=(new_codes, db.String),
+                       component_code=(component_codes, db.String), with_ordinality='ord')
+    select_masters = (
+        db.select(code_map.c.new_part_code, code_map.c.component_code,
+                  db.func.left(ComponentMaster.part_name + name_suffix, PART_NAME_MAX_LENGTH),
+                  *[getattr(ComponentMaster, col) for col in MASTER_COLUMNS],
+                  db.literal('draft'), db.literal(g.current_user.get('user_name')))
+        .join_from(code_map, ComponentMaster, ComponentMaster.id == code_map.c.src_id)
+        .order_by(code_map.c.ord)
+    )
+    return db.session.execute(
+        db.insert(ComponentMaster)
+        .from_select(['part_code', 'component_code', 'part_name', *MASTER_COLUMNS, 'status', 'created_by'], select_masters)
+        .returning(ComponentMaster.id, ComponentMaster.part_code, ComponentMaster.component_code)).all()
+
+
+def clone_components(source_ids, rule=None, name_suffix=' (Copy)'):
+    """Copy live components (with active checking params, specs and vendors) as drafts.
+
+    Part codes come from `rule` (see apply_part_code_rule) made unique with -2, -3, ...
+    Returns (clones, errors); clones are {source_id, id, component_code, part_code}
+    in source_ids order. Nothing is written when there are errors. Caller commits.
+    Raises PartCodeConflict if concurrent requests take the new codes twice.
+    """
+    rule = rule or DEFAULT_RULE
+    source_ids = list(dict.fromkeys(source_ids))
+    sources = dict(db.session.execute(
+        db.select(ComponentMaster.id, ComponentMaster.part_code)
+        .where(ComponentMaster.id.in_(source_ids), ComponentMaster.is_deleted == False)).all())
+
+    errors = [{'field': f'component_ids[{i}]', 'message': f'Component {sid} not found'}
+              for i, sid in enumerate(source_ids) if sid not in sources]
+    if errors:
+        return [], errors
+    bases = [apply_part_code_rule(sources[sid], rule) for sid in source_ids]
+    for attempt in range(2):
+        new_codes = free_part_codes(bases)
+        for sid, code in zip(source_ids, new_codes):
+            if len(code) > PART_CODE_MAX_LENGTH or not PART_CODE_RE.match(code):
+                errors.append({'field': 'part_code_rule',
+                               'message': f'New part code {code!r} for {sources[sid]} must be 1-{PART_CODE_MAX_LENGTH} '
+                                          f'alphanumerics and hyphens'})
+        if errors:
+            return [], errors
+        try:
+            with db.session.begin_nested():
+                inserted = _insert_masters(source_ids, new_codes, name_suffix)
+            break
+        except IntegrityError as e:
+            diag = getattr(e.orig, 'diag', None)
+            if getattr(diag, 'constraint_name', None) != PART_CODE_CONSTRAINT:
+                raise
+            if attempt:
+                match = PART_CODE_DETAIL_RE.search(diag.message_detail or '')
+                raise PartCodeConflict(match.group(1) if match else None) from e
+            # Taken by a concurrent create or clone since free_part_codes(): look again
+    by_code = {row.part_code: row for row in inserted}
+
+    clones = [{'source_id': sid, 'id': by_code[code].id, 'component_code': by_code[code].component_code,
+               'part_code': code} for sid, code in zip(source_ids, new_codes)]
+    id_map = _unnest('clone_ids', src_id=([c['source_id'] for c in clones], db.Integer),
+                     new_id=([c['id'] for c in clones], db.Integer))
+    for model, columns, condition in CHILD_COLUMNS:
+        select_children = (
+            db.select(id_map.c.new_id, *[getattr(model, col) for col in columns])
+            .join_from(id_map, model, model.component_id == id_map.c.src_id)
+            .order_by(model.component_id, model.id)
+        )
+        if condition is not None:
+            select_children = select_children.where(condition)
+        db.session.execute(db.insert(model).from_select(['component_id', *columns], select_children))
+
+    for clone in clones:
+        AuditLog.log('qc_component_master', clone['id'], 'INSERT', new_data={'cloned_from': clone['source_id']})
+    return clones, []
@@ -0,0 +1,166 @@
+"""Component catalogue export in constant memory.
+
+Rows are read as plain tuples through a server-side cursor (yield_per), so the
+ORM never holds more than one chunk. CSV and NDJSON are produced chunk by chunk
+and can be streamed to the client as they are built; xlsx is written with
+openpyxl's write-only workbook to a temporary file (a zip cannot be emitted
+before its last row) and that file is then streamed and removed.
+
+write_export() builds the same file as a background job (?async=true) and is
+what job_service runs for 'component_export'.
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+
+from flask import current_app
+
+from app.extensions import db
+from app.models.components import ComponentMaster
+from app.models.masters import ProductCategory, ProductGroup
+from app.models.qc_plans import QCPlan
+from app.services.job_service import job_runner
+
+# format -> (mimetype, download name)
+EXPORT_FORMATS = {
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'components_export.xlsx'),
+    'csv': ('text/csv', 'components_export.csv'),
+    'ndjson': ('application/x-ndjson', 'components_export.ndjson'),
+}
+HEADERS = ['Component Code', 'Part Code', 'Part Name', 'Category', 'Group',
+           'QC Required', 'Inspection Type', 'QC Plan', 'Status']
+KEYS = ['component_code', 'part_code', 'part_name', 'category', 'group',
+        'qc_required', 'inspection_type', 'qc_plan', 'status']
+
+
+def export_format(requested, accept_mimetypes):
+    """Format from ?format= / body `format`, else the Accept header, else xlsx. None if unsupported."""
+    if requested:
+        requested = requested.lower()
+        return requested if requested in EXPORT_FORMATS else None
+    best = accept_mimetypes.best_match([mimetype for mimetype, _ in EXPORT_FORMATS.values()])
+    return next((fmt for fmt, (mimetype, _) in EXPORT_FORMATS.items() if mimetype == best), 'xlsx')
+
+
+def _export_query(filters):
+    stmt = (
+        db.select(ComponentMaster.component_code, ComponentMaster.part_code, ComponentMaster.part_name,
+                  ProductCategory.category_name, ProductGroup.group_name, ComponentMaster.qc_required,
+                  ComponentMaster.default_inspection_type, QCPlan.plan_code, ComponentMaster.status)
+        .outerjoin(ProductCategory, ProductCategory.id == ComponentMaster.category_id)
+        .outerjoin(ProductGroup, ProductGroup.id == ComponentMaster.product_group_id)
+        .outerjoin(QCPlan, QCPlan.id == ComponentMaster.qc_plan_id)
+        .where(ComponentMaster.is_deleted == False)
+    )
+    if filters.get('category_id'):
+        stmt = stmt.where(ComponentMaster.category_id == filters['category_id'])
+    if filters.get('status'):
+        stmt = stmt.where(ComponentMaster.status == filters['status'])
+    if filters.get('qc_required') is not None:
+        stmt = stmt.where(ComponentMaster.qc_required == filters['qc_required'])
+    return stmt.order_by(ComponentMaster.part_code)
+
+
+def iter_chunks(filters):
+    """Lists of row tuples, EXPORT_CHUNK_SIZE at a time, from a server-side cursor."""
+    chunk_size = current_app.config.get('EXPORT_CHUNK_SIZE', 2000)
+    result = db.session.execute(_export_query(filters).execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        yield [tuple(row) for row in partition]
+
+
+def _display(row):
+    values = list(row)
+    values[3] = values[3] or ''
+    values[4] = values[4] or ''
+    values[5] = 'Yes' if values[5] else 'No'
+    values[7] = values[7] or ''
+    return values
+
+
+def iter_csv(chunks):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(HEADERS)
+    for chunk in chunks:
+        writer.writerows(_display(row) for row in chunk)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def iter_ndjson(chunks):
+    for chunk in chunks:
+        yield ''.join(json.dumps(dict(zip(KEYS, row)), default=str) + '\n' for row in chunk)
+
+
+def write_xlsx(chunks, path):
+    """Write a write-only workbook to path; rows go straight to openpyxl's temp sheet file."""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Components')
+    ws.append(HEADERS)
+    for chunk in chunks:
+        for row in chunk:
+            ws.append(_display(row))
+    wb.save(path)
+
+
+def _stream_file(path, block_size=64 * 1024):
+    try:
+        with open(path, 'rb') as f:
+            while block := f.read(block_size):
+                yield block
+    finally:
+        os.remove(path)
+
+
+def count_rows(filters):
+    return db.session.scalar(db.select(db.func.count()).select_from(_export_query(filters).order_by(None).subquery()))
+
+
+@job_runner('component_export')
+def write_export(params, path, progress):
+    """Background build of an export to path (see job_service); reports rows written as progress."""
+    filters, fmt = params['filters'], params['format']
+    progress(0, count_rows(filters))
+
+    def counted(chunks):
+        done = 0
+        for chunk in chunks:
+            yield chunk
+            done += len(chunk)
+            progress(done)
+
+    chunks = counted(iter_chunks(filters))
+    if fmt == 'xlsx':
+        write_xlsx(chunks, path)
+    else:
+        lines = iter_csv(chunks) if fmt == 'csv' else iter_ndjson(chunks)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            f.writelines(lines)
+    mimetype, file_name = EXPORT_FORMATS[fmt]
+    return file_name, mimetype
+
+
+def stream_export(filters, fmt):
+    """Body iterator for an export response (wrap in stream_with_context)."""
+    if fmt == 'csv':
+        return iter_csv(iter_chunks(filters))
+    if fmt == 'ndjson':
+        return iter_ndjson(iter_chunks(filters))
+
+    def xlsx():
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        try:
+            write_xlsx(iter_chunks(filters), path)
+        except Exception:
+            os.remove(path)
+            raise
+        yield from _stream_file(path)
+    return xlsx()
@@ -0,0 +1,408 @@
+"""Bulk component import from an .xlsx workbook or CSV files.
+
+Rows are streamed (openpyxl read-only mode / csv reader) and validated with the
+same schemas and rules as POST /components, but code columns (category_code,
+vendor_code, ...) are resolved against reference maps loaded once per import
+instead of one query per field per row.
+
+Child sheets are read first and their validated rows COPYed into a temp table
+keyed by part_code, so a large workbook is not held in memory; the Components
+sheet is then read in batches, and each batch takes its children from the temp
+table in one query. What stays in memory grows with the number of components,
+not with their child rows: the part codes seen so far, for duplicate checks.
+
+Valid components are written in batches: one multi-row INSERT for the masters,
+with component codes for the whole batch from one allocate_numbers() call, then
+one per child table. Each batch runs in a savepoint; if it fails, its rows are
+retried one at a time so the offending row is reported and the rest still land.
+"""
+import csv
+import io
+import json
+from zipfile import BadZipFile
+
+from flask import current_app, g
+from marshmallow import EXCLUDE, ValidationError
+from sqlalchemy.exc import DBAPIError
+
+from app.extensions import db
+from app.models.components import ComponentMaster
+from app.models.masters import ProductCategory, ProductGroup, Vendor, Department, Unit, Instrument
+from app.models.sampling import SamplingPlan
+from app.models.qc_plans import QCPlan
+from app.models.audit import AuditLog
+from app.schemas.components_schema import (ComponentSchema, CheckingParamSchema,
+                                           SpecificationSchema, ComponentVendorSchema)
+from app.services.component_service import component_values, child_values
+from app.services.doc_number_service import allocate_numbers
+from app.services.part_code_service import taken_part_codes
+
+# section -> (xlsx sheet name, multipart field for CSV uploads)
+SECTIONS = {
+    'components': ('Components', 'file'),
+    'checking_parameters': ('Checking Parameters', 'checking_parameters'),
+    'specifications': ('Specifications', 'specifications'),
+    'approved_vendors': ('Vendors', 'vendors'),
+}
+CHILD_SCHEMAS = {
+    'checking_parameters': CheckingParamSchema(),
+    'specifications': SpecificationSchema(),
+    'approved_vendors': ComponentVendorSchema(),
+}
+
+# code column -> (schema field, reference map, error message)
+MASTER_REFS = {
+    'category_code': ('category_id', 'categories', 'Invalid or inactive category'),
+    'group_code': ('product_group_id', 'groups', 'Invalid or inactive product group'),
+    'qc_plan_code': ('qc_plan_id', 'qc_plans', 'Invalid or inactive QC plan'),
+    'sampling_plan_code': ('default_sampling_plan_id', 'sampling_plans', 'Invalid or inactive sampling plan'),
+    'department_code': ('department_id', 'departments', 'Invalid or inactive department'),
+    'primary_vendor_code': ('primary_vendor_id', 'vendors', 'Invalid or inactive vendor'),
+}
+CHILD_REFS = {
+    'checking_parameters': {
+        'unit_code': ('unit_id', 'units', 'Invalid unit'),
+        'instrument_code': ('instrument_id', 'instruments', 'Invalid instrument'),
+    },
+    'specifications': {},
+    'approved_vendors': {
+        'vendor_code': ('vendor_id', 'vendors', 'Invalid or inactive vendor'),
+    },
+}
+CHILDREN_TABLE = 'import_children'
+COPY_BATCH = 10000
+HEADER_ALIASES = {'inspection_type': 'default_inspection_type'}
+# schema field -> sheet column, so errors name the column the user filled in
+FIELD_COLUMNS = {field: column for refs in (MASTER_REFS, *CHILD_REFS.values())
+                 for column, (field, _, _) in refs.items()}
+
+master_schema = ComponentSchema()
+
+
+def _header(value):
+    key = str(value or '').strip().lower().replace(' ', '_')
+    return HEADER_ALIASES.get(key, key)
+
+
+def _cell(value):
+    """Cell value as a stripped string (None when blank); schemas do the type conversion."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def _rows(records):
+    """(row number, {column: value}) for each non-blank record after the header."""
+    header = next(records, None)
+    if header is None:
+        return
+    keys = [_header(h) for h in header]
+    for row_no, values in enumerate(records, start=2):
+        row = {key: _cell(value) for key, value in zip(keys, values) if key}
+        if any(value is not None for value in row.values()):
+            yield row_no, row
+
+
+def open_import_sources(files, ext):
+    """{section: row iterator} for an uploaded workbook (one sheet per section) or CSV files."""
+    if ext == 'xlsx':
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+        try:
+            wb = load_workbook(files['file'].stream, read_only=True, data_only=True)
+        except (BadZipFile, InvalidFileException, KeyError):
+            raise ValueError('File is not a valid .xlsx workbook')
+        sheets = {ws.title.strip().lower(): ws for ws in wb.worksheets}
+        sources = {}
+        for section, (sheet, _) in SECTIONS.items():
+            ws = sheets.get(sheet.lower())
+            if ws is None and section == 'components':
+                ws = wb.worksheets[0]
+            if ws is not None:
+                sources[section] = _rows(ws.iter_rows(values_only=True))
+        return sources
+    return {
+        section: _rows(csv.reader(io.TextIOWrapper(files[field].stream, encoding='utf-8-sig', newline='')))
+        for section, (_, field) in SECTIONS.items() if files.get(field)
+    }
+
+
+def _load_refs():
+    """Active reference rows keyed by upper-cased code, one query per table."""
+    def active(model, code_col, *extra):
+        rows = db.session.execute(db.select(model.id, code_col, *extra).where(model.is_active == True))
+        return {str(row[1]).upper(): row for row in rows}
+
+    return {
+        'categories': active(ProductCategory, ProductCategory.category_code),
+        'groups': active(ProductGroup, ProductGroup.group_code, ProductGroup.category_id),
+        'qc_plans': active(QCPlan, QCPlan.plan_code),
+        'sampling_plans': active(SamplingPlan, SamplingPlan.plan_code),
+        'departments': active(Department, Department.department_code),
+        'vendors': active(Vendor, Vendor.vendor_code),
+        'units': active(Unit, Unit.unit_code),
+        'instruments': active(Instrument, Instrument.instrument_code, Instrument.instrument_name),
+    }
+
+
+def _flatten(messages, field=None):
+    """(field, message) pairs from marshmallow error messages."""
+    if isinstance(messages, dict):
+        if set(messages) == {'field', 'message'}:
+            yield messages['field'], messages['message']
+            return
+        for key, value in messages.items():
+            if key == '_schema':
+                name = field
+            elif isinstance(key, int):
+                name = f'{field}[{key}]'
+            else:
+                name = f'{field}.{key}' if field else key
+            yield from _flatten(value, name)
+    elif isinstance(messages, list):
+        for message in messages:
+            yield from _flatten(message, field)
+    else:
+        yield field, str(messages)
+
+
+class ComponentImport:
+    """One import run. Call run(sources) once; it returns the summary dict."""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.batch_size = current_app.config.get('COMPONENT_IMPORT_BATCH_SIZE', 500)
+        self.max_errors = current_app.config.get('COMPONENT_IMPORT_MAX_ERRORS', 1000)
+        self.refs = _load_refs()
+        self.taken = taken_part_codes()
+        self.user = getattr(g, 'current_user', {})
+        self.seen = {}          # part_code -> first row number in the components sheet
+        self.failed_rows = set()
+        self.errors = []
+        self.error_count = 0
+        self.total = 0
+        self.valid = 0
+        self.created = 0
+
+    def _error(self, section, row_no, part_code, field, message):
+        self.error_count += 1
+        field = FIELD_COLUMNS.get(field, field)
+        if section == 'components':
+            self.failed_rows.add(row_no)
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'sheet': SECTIONS[section][0], 'row': row_no, 'part_code': part_code or None,
+                                'field': field, 'message': message})
+
+    def _resolve(self, row, refs):
+        """Replace code columns with ids. Returns (data, matched ref rows, errors)."""
+        data, matched, errors = dict(row), {}, []
+        for column, (field, ref_name, message) in refs.items():
+            code = data.pop(column, None)
+            if code is None:
+                continue
+            ref = self.refs[ref_name].get(code.upper())
+            if ref is None:
+                errors.append((column, f'{message}: {code}'))
+            else:
+                data[field] = ref.id
+                matched[column] = ref
+        return data, matched, errors
+
+    def _child_records(self, section, rows):
+        """(part_code, section, row_no, data JSON) per child row; data is empty for invalid rows."""
+        schema = CHILD_SCHEMAS[section]
+        for row_no, row in rows:
+            part_code = (row.pop('part_code', None) or '').upper()
+            if not part_code:
+                self._error(section, row_no, None, 'part_code', 'part_code is required')
+                continue
+            data, matched, errors = self._resolve(row, CHILD_REFS[section])
+            if not errors:
+                try:
+                    data = schema.load(data, unknown=EXCLUDE)
+                except ValidationError as e:
+                    errors = list(_flatten(e.messages))
+            if errors:
+                for field, message in errors:
+                    self._error(section, row_no, part_code, field, message)
+                yield part_code, section, row_no, None
+                continue
+            if 'unit_code' in matched:
+                data['unit_code'] = matched['unit_code'].unit_code
+            if 'instrument_code' in matched and not data.get('instrument_name'):
+                data['instrument_name'] = matched['instrument_code'].instrument_name
+            # Loaded again by ComponentSchema with the master row, so Decimals can go as strings
+            yield part_code, section, row_no, json.dumps(data, default=str)
+
+    def _load_children(self, sources):
+        """COPY the rows of every child sheet into CHILDREN_TABLE (dropped at commit)."""
+        connection = db.session.connection()
+        connection.execute(db.text(
+            f'CREATE TEMP TABLE {CHILDREN_TABLE} (part_code TEXT, section TEXT, row_no INTEGER, data TEXT) '
+            'ON COMMIT DROP'))
+        cursor = connection.connection.cursor()
+        try:
+            for section in CHILD_SCHEMAS:
+                if section in sources:
+                    _copy_rows(cursor, self._child_records(section, sources[section]))
+        finally:
+            cursor.close()
+        connection.execute(db.text(f'CREATE INDEX ON {CHILDREN_TABLE} (part_code)'))
+        connection.execute(db.text(f'ANALYZE {CHILDREN_TABLE}'))
+
+    def _take_children(self, part_codes):
+        """{part_code: {section: [(row_no, data or None)]}} for a batch, removed from CHILDREN_TABLE."""
+        rows = db.session.execute(
+            db.text(f'DELETE FROM {CHILDREN_TABLE} WHERE part_code = ANY(:codes) '
+                    'RETURNING part_code, section, row_no, data'),
+            {'codes': list(part_codes)}).all()
+        children = {}
+        for part_code, section, row_no, data in sorted(rows, key=lambda r: r.row_no):
+            entry = (row_no, json.loads(data) if data is not None else None)
+            children.setdefault(part_code, {}).setdefault(section, []).append(entry)
+        return children
+
+    def _validate_master(self, row_no, row, children):
+        """Loaded component data for a components-sheet row, or None after reporting its errors.
+
+        children is the row's {section: [(row_no, data)]}; data is None for invalid child rows.
+        """
+        part_code = (row.get('part_code') or '').upper()
+        data, matched, errors = self._resolve(row, MASTER_REFS)
+        category, group = matched.get('category_code'), matched.get('group_code')
+        if category and group and group.category_id != category.id:
+            errors.append(('group_code', f'Group does not belong to category {category.category_code}'))
+
+        for section, entries in sorted(children.items()):
+            if any(child is None for _, child in entries):
+                errors.append((section, f'Invalid rows in sheet {SECTIONS[section][0]}'))
+            else:
+                data[section] = [child for _, child in entries]
+
+        if not errors:
+            try:
+                data = master_schema.load(data, unknown=EXCLUDE)
+            except ValidationError as e:
+                errors = list(_flatten(e.messages))
+        if not errors:
+            if data.get('qc_required') and not data.get('checking_parameters'):
+                errors.append(('checking_parameters',
+                               'At least 1 checking parameter required when qc_required=true'))
+            if data['part_code'].lower() in self.taken:
+                errors.append(('part_code', f'Part code {data["part_code"]} already exists'))
+        if part_code:
+            if part_code in self.seen:
+                errors.append(('part_code', f'Duplicate part_code (first seen in row {self.seen[part_code]})'))
+            else:
+                self.seen[part_code] = row_no
+
+        for field, message in errors:
+            self._error('components', row_no, part_code, field, message)
+        return None if errors else data
+
+    def _insert(self, batch):
+        """Write one batch of (row_no, data): masters first, then each child table."""
+        codes = allocate_numbers('component', len(batch))
+        rows = db.session.execute(
+            db.insert(ComponentMaster).returning(ComponentMaster.id, sort_by_parameter_order=True),
+            [dict(component_values(data), component_code=code, status='active',
+                  created_by=self.user.get('user_name'))
+             for (_, data), code in zip(batch, codes)]).all()
+        child_rows = {}
+        for (_, data), (component_id,) in zip(batch, rows):
+            for model, values in child_values(component_id, data):
+                child_rows.setdefault(model, []).extend(values)
+            AuditLog.log('qc_component_master', component_id, 'INSERT')
+        for model, values in child_rows.items():
+            if values:
+                db.session.execute(db.insert(model), values)
+        db.session.flush()
+        return len(rows)
+
+    def _flush(self, batch):
+        self.valid += len(batch)
+        if not batch or self.dry_run:
+            return
+        try:
+            with db.session.begin_nested():
+                self.created += self._insert(batch)
+            return
+        except DBAPIError:
+            pass
+        for item in batch:
+            try:
+                with db.session.begin_nested():
+                    self.created += self._insert([item])
+            except DBAPIError as e:
+                row_no, data = item
+                message = str(getattr(e, 'orig', e)).strip().splitlines()[0]
+                self._error('components', row_no, data['part_code'], None, message)
+
+    def _process(self, rows):
+        """Validate one batch of components-sheet rows and insert the valid ones."""
+        children = self._take_children({(row.get('part_code') or '').upper() for _, row in rows})
+        batch = []
+        for row_no, row in rows:
+            # A repeated part_code gets no children: its first row took them
+            data = self._validate_master(row_no, row, children.pop((row.get('part_code') or '').upper(), {}))
+            if data is not None:
+                batch.append((row_no, data))
+        self._flush(batch)
+
+    def run(self, sources):
+        self._load_children(sources)
+
+        rows = []
+        for row_no, row in sources.get('components', ()):
+            self.total += 1
+            rows.append((row_no, row))
+            if len(rows) >= self.batch_size:
+                self._process(rows)
+                rows = []
+        self._process(rows)
+
+        # Child rows whose part_code has no row in the components sheet
+        leftovers = db.session.execute(db.text(
+            f'SELECT part_code, section, row_no FROM {CHILDREN_TABLE} '
+            'WHERE data IS NOT NULL ORDER BY section, row_no'))
+        for part_code, section, row_no in leftovers:
+            self._error(section, row_no, part_code, 'part_code',
+                        f'No row for part_code {part_code} in sheet {SECTIONS["components"][0]}')
+
+        return {
+            'dry_run': self.dry_run,
+            'total_rows': self.total,
+            'valid': self.valid,
+            'created': self.created,
+            'failed': len(self.failed_rows),
+            'error_count': self.error_count,
+            'errors': sorted(self.errors, key=lambda e: (e['sheet'] != SECTIONS['components'][0], e['sheet'], e['row'])),
+        }
+
+
+def _copy_rows(cursor, records):
+    """COPY records into CHILDREN_TABLE in batches of COPY_BATCH rows."""
+    buffer, count = io.StringIO(), 0
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow(record)
+        count += 1
+        if count % COPY_BATCH == 0:
+            _flush_copy(cursor, buffer)
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+    _flush_copy(cursor, buffer)
+
+
+def _flush_copy(cursor, buffer):
+    buffer.seek(0)
+    cursor.copy_expert(f'COPY {CHILDREN_TABLE} (part_code, section, row_no, data) FROM STDIN WITH (FORMAT csv)',
+                       buffer)
+
+
+def import_components(sources, dry_run=False):
+    """Validate and insert every row from open_import_sources(). Caller commits."""
+    return ComponentImport(dry_run=dry_run).run(sources)
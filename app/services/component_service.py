@@ -1,51 +1,33 @@
 """Component service for complex CRUD operations."""
+from datetime import datetime, timezone
 from flask import g
 from app.extensions import db
 from app.models.components import (ComponentMaster, ComponentCheckingParam,
-                                    ComponentSpecification, ComponentVendor)
+                                    ComponentSpecification, ComponentDocument, ComponentVendor)
 from app.models.masters import (ProductCategory, ProductGroup, Vendor, Department,
                                  Unit, Instrument)
 from app.models.sampling import SamplingPlan
 from app.models.qc_plans import QCPlan
 from app.models.audit import AuditLog, ComponentHistory
+from app.services.ref_validation import RefValidator
 
 
 def validate_component_refs(data, component_id=None):
-    """Validate all FK references. Returns list of error dicts."""
-    errors = []
-
-    # Category
-    cat = ProductCategory.query.filter_by(id=data['category_id'], is_active=True).first()
-    if not cat:
-        errors.append({'field': 'category_id', 'message': 'Invalid or inactive category'})
+    """Validate all FK references. Returns list of error dicts.
 
+    One IN query per referenced table (RefValidator) plus the part-code check.
+    """
+    refs = RefValidator()
+    refs.check(ProductCategory, data['category_id'], 'category_id', 'Invalid or inactive category')
     # Group must belong to category
-    grp = ProductGroup.query.filter_by(id=data['product_group_id'], is_active=True).first()
-    if not grp:
-        errors.append({'field': 'product_group_id', 'message': 'Invalid or inactive product group'})
-    elif grp.category_id != data['category_id']:
-        errors.append({'field': 'product_group_id',
-                       'message': f'Group does not belong to category_id {data["category_id"]}'})
-
-    # QC Plan
-    if data.get('qc_plan_id'):
-        if not QCPlan.query.filter_by(id=data['qc_plan_id'], is_active=True).first():
-            errors.append({'field': 'qc_plan_id', 'message': 'Invalid or inactive QC plan'})
-
-    # Sampling plan
-    if data.get('default_sampling_plan_id'):
-        if not SamplingPlan.query.filter_by(id=data['default_sampling_plan_id'], is_active=True).first():
-            errors.append({'field': 'default_sampling_plan_id', 'message': 'Invalid or inactive sampling plan'})
-
-    # Department
-    if data.get('department_id'):
-        if not Department.query.filter_by(id=data['department_id'], is_active=True).first():
-            errors.append({'field': 'department_id', 'message': 'Invalid or inactive department'})
-
-    # Primary vendor
-    if data.get('primary_vendor_id'):
-        if not Vendor.query.filter_by(id=data['primary_vendor_id'], is_active=True).first():
-            errors.append({'field': 'primary_vendor_id', 'message': 'Invalid or inactive vendor'})
+    refs.check(ProductGroup, data['product_group_id'], 'product_group_id', 'Invalid or inactive product group',
+               rule=(lambda grp: grp.category_id == data['category_id'],
+                     f'Group does not belong to category_id {data["category_id"]}'))
+    refs.check(QCPlan, data.get('qc_plan_id'), 'qc_plan_id', 'Invalid or inactive QC plan')
+    refs.check(SamplingPlan, data.get('default_sampling_plan_id'), 'default_sampling_plan_id',
+               'Invalid or inactive sampling plan')
+    refs.check(Department, data.get('department_id'), 'department_id', 'Invalid or inactive department')
+    refs.check(Vendor, data.get('primary_vendor_id'), 'primary_vendor_id', 'Invalid or inactive vendor')
 
     # Unique part_code
     query = ComponentMaster.query.filter(
@@ -55,28 +37,33 @@ def validate_component_refs(data, component_id=None):
     if component_id:
         query = query.filter(ComponentMaster.id != component_id)
     if query.first():
-        errors.append({'field': 'part_code', 'message': f'Part code {data["part_code"]} already exists'})
+        refs.error('part_code', f'Part code {data["part_code"]} already exists')
 
-    # Validate checking params refs
+    # Checking params refs
     for i, param in enumerate(data.get('checking_parameters', [])):
-        if param.get('unit_id') and not Unit.query.filter_by(id=param['unit_id'], is_active=True).first():
-            errors.append({'field': f'checking_parameters[{i}].unit_id', 'message': 'Invalid unit'})
-        if param.get('instrument_id') and not Instrument.query.filter_by(id=param['instrument_id'], is_active=True).first():
-            errors.append({'field': f'checking_parameters[{i}].instrument_id', 'message': 'Invalid instrument'})
+        refs.check(Unit, param.get('unit_id'), f'checking_parameters[{i}].unit_id', 'Invalid unit')
+        refs.check(Instrument, param.get('instrument_id'), f'checking_parameters[{i}].instrument_id',
+                   'Invalid instrument')
 
-    # Validate vendor refs
+    # Vendor refs
     for i, v in enumerate(data.get('approved_vendors', [])):
-        if not Vendor.query.filter_by(id=v['vendor_id'], is_active=True).first():
-            errors.append({'field': f'approved_vendors[{i}].vendor_id', 'message': 'Invalid or inactive vendor'})
+        refs.check(Vendor, v['vendor_id'], f'approved_vendors[{i}].vendor_id', 'Invalid or inactive vendor')
 
-    return errors
+    # Child row ids (update only) must belong to this component
+    for key, (model, _) in CHILD_SYNC.items():
+        for i, item in enumerate(data.get(key, [])):
+            if component_id and item.get('id'):
+                refs.check(model, item['id'], f'{key}[{i}].id', 'Not a row of this component', active_only=False,
+                           rule=(lambda row: row.component_id == component_id, 'Not a row of this component'))
+            elif item.get('id'):
+                refs.error(f'{key}[{i}].id', 'id is only allowed when updating a component')
 
+    return refs.validate()
 
-def create_component(data):
-    """Create component with children. Returns (component, errors)."""
-    user = g.current_user
 
-    comp = ComponentMaster(
+def component_values(data):
+    """Column values for a new component from loaded ComponentSchema data."""
+    return dict(
         part_code=data['part_code'], part_name=data['part_name'],
         part_description=data.get('part_description'),
         category_id=data['category_id'], product_group_id=data['product_group_id'],
@@ -98,9 +85,14 @@ def create_component(data):
         primary_vendor_id=data.get('primary_vendor_id'),
         odoo_product_id=data.get('odoo_product_id'),
         lead_time_days=data.get('lead_time_days'),
-        status='active',
-        created_by=user.get('user_name'),
     )
+
+
+def create_component(data):
+    """Create component with children. Returns (component, errors)."""
+    user = g.current_user
+
+    comp = ComponentMaster(**component_values(data), status='active', created_by=user.get('user_name'))
     db.session.add(comp)
     db.session.flush()  # Get ID
 
@@ -112,7 +104,7 @@ def create_component(data):
 
 
 def update_component(comp, data):
-    """Update component, replace children, log changes."""
+    """Update component, sync children, log changes."""
     user = g.current_user
     fields_to_track = [
         'part_code', 'part_name', 'category_id', 'product_group_id',
@@ -142,20 +134,16 @@ def update_component(comp, data):
 
     comp.updated_by = user.get('user_name')
 
-    # Replace children
-    if 'checking_parameters' in data or 'specifications' in data or 'approved_vendors' in data:
-        ComponentCheckingParam.query.filter_by(component_id=comp.id).delete()
-        ComponentSpecification.query.filter_by(component_id=comp.id).delete()
-        ComponentVendor.query.filter_by(component_id=comp.id).delete()
-        _save_children(comp.id, data)
+    # Sync children in place; only the collections sent are touched
+    _sync_children(comp.id, data)
 
     AuditLog.log('qc_component_master', comp.id, 'UPDATE')
 
 
-def _save_children(component_id, data):
-    """Save checking params, specs, and vendor mappings."""
-    for cp in data.get('checking_parameters', []):
-        param = ComponentCheckingParam(
+def child_values(component_id, data):
+    """[(model, [column values])] for the checking params, specs and vendor mappings in data."""
+    return [
+        (ComponentCheckingParam, [dict(
             component_id=component_id,
             checking_type=cp['checking_type'],
             checking_point=cp['checking_point'],
@@ -170,20 +158,15 @@ def _save_children(component_id, data):
             input_type=cp.get('input_type', 'measurement'),
             sort_order=cp.get('sort_order', 0),
             is_mandatory=cp.get('is_mandatory', True),
-        )
-        db.session.add(param)
-
-    for sp in data.get('specifications', []):
-        spec = ComponentSpecification(
+            is_active=cp.get('is_active', True),
+        ) for cp in data.get('checking_parameters', [])]),
+        (ComponentSpecification, [dict(
             component_id=component_id,
             spec_key=sp['spec_key'],
             spec_value=sp['spec_value'],
             sort_order=sp.get('sort_order', 0),
-        )
-        db.session.add(spec)
-
-    for av in data.get('approved_vendors', []):
-        cv = ComponentVendor(
+        ) for sp in data.get('specifications', [])]),
+        (ComponentVendor, [dict(
             component_id=component_id,
             vendor_id=av['vendor_id'],
             is_primary=av.get('is_primary', False),
@@ -192,5 +175,123 @@ def _save_children(component_id, data):
             unit_price=av.get('unit_price'),
             lead_time_days=av.get('lead_time_days'),
             remarks=av.get('remarks'),
-        )
-        db.session.add(cv)
+        ) for av in data.get('approved_vendors', [])]),
+    ]
+
+
+# data key -> (model, natural key columns matched when an incoming row has no id)
+CHILD_SYNC = {
+    'checking_parameters': (ComponentCheckingParam, ('checking_type', 'checking_point')),
+    'specifications': (ComponentSpecification, ('spec_key',)),
+    'approved_vendors': (ComponentVendor, ('vendor_id',)),
+}
+
+
+def _sync_children(component_id, data):
+    """Apply the child collections in data as a diff against the stored rows.
+
+    Incoming rows match stored rows by id, then by natural key. Matched rows are
+    updated in place and only where a value changed, unmatched incoming rows are
+    inserted and unmatched stored rows deleted. Each change goes to component history.
+    """
+    now = datetime.now(timezone.utc)
+    for key, (model, rows) in zip(CHILD_SYNC, child_values(component_id, data)):
+        if key not in data:
+            continue
+        natural = CHILD_SYNC[key][1]
+        stored = {row.id: row for row in model.query.filter_by(component_id=component_id).order_by(model.id)}
+        pairs = [[stored.pop(item['id'], None) if item.get('id') else None, values]
+                 for item, values in zip(data[key], rows)]
+        by_key = {}
+        for row in stored.values():
+            by_key.setdefault(tuple(getattr(row, c) for c in natural), []).append(row)
+        for pair in pairs:
+            candidates = by_key.get(tuple(pair[1][c] for c in natural)) if pair[0] is None else None
+            if candidates:
+                pair[0] = candidates.pop(0)
+                del stored[pair[0].id]
+
+        # Deletes first so a freed unique key (spec_key, vendor_id) can be reused below
+        for row in stored.values():
+            ComponentHistory.log_change(component_id, 'UPDATE', f'{key}[{row.id}]',
+                                        ', '.join(str(getattr(row, c)) for c in natural), None)
+            db.session.delete(row)
+        if stored:
+            db.session.flush()
+
+        for row, values in pairs:
+            if row is None:
+                db.session.add(model(**values))
+                ComponentHistory.log_change(component_id, 'UPDATE', key, None,
+                                            ', '.join(str(values[c]) for c in natural))
+                continue
+            changed = [col for col, value in values.items() if getattr(row, col) != value]
+            for col in changed:
+                ComponentHistory.log_change(component_id, 'UPDATE', f'{key}[{row.id}].{col}',
+                                            getattr(row, col), values[col])
+                setattr(row, col, values[col])
+            if changed and hasattr(row, 'updated_at'):
+                row.updated_at = now
+
+
+def _save_children(component_id, data):
+    """Save checking params, specs, and vendor mappings."""
+    for model, rows in child_values(component_id, data):
+        for values in rows:
+            db.session.add(model(**values))
+
+
+CHILD_COUNT_MODELS = {
+    'checking_params_count': ComponentCheckingParam,
+    'specifications_count': ComponentSpecification,
+    'documents_count': ComponentDocument,
+    'vendors_count': ComponentVendor,
+}
+
+
+def get_child_counts(component_ids):
+    """Child-row counts for many components in one grouped UNION ALL query.
+
+    Returns {component_id: {'checking_params_count': n, ...}} with zeros for missing rows.
+    """
+    counts = {cid: dict.fromkeys(CHILD_COUNT_MODELS, 0) for cid in component_ids}
+    if not counts:
+        return counts
+    stmt = db.union_all(*[
+        db.select(db.literal(key).label('kind'), model.component_id, db.func.count())
+        .where(model.component_id.in_(list(counts)))
+        .group_by(model.component_id)
+        for key, model in CHILD_COUNT_MODELS.items()
+    ])
+    for kind, component_id, n in db.session.execute(stmt):
+        counts[component_id][kind] = n
+    return counts
+
+
+def load_component_children(component_id):
+    """Every child row of one component: one query per child table.
+
+    Units, instruments and vendors are joined eagerly by the child models, so the
+    detail view is always the master row plus these four queries. Rows are not
+    filtered; callers pick active params / current documents themselves.
+    """
+    return {
+        'checking_params': ComponentCheckingParam.query.filter_by(component_id=component_id)
+        .order_by(ComponentCheckingParam.sort_order, ComponentCheckingParam.id).all(),
+        'specifications': ComponentSpecification.query.filter_by(component_id=component_id)
+        .order_by(ComponentSpecification.sort_order, ComponentSpecification.id).all(),
+        'documents': ComponentDocument.query.filter_by(component_id=component_id)
+        .order_by(ComponentDocument.id).all(),
+        'component_vendors': ComponentVendor.query.filter_by(component_id=component_id)
+        .order_by(ComponentVendor.id).all(),
+    }
+
+
+def child_counts_from(children):
+    """The get_child_counts() shape, computed from load_component_children() output."""
+    return {
+        'checking_params_count': len(children['checking_params']),
+        'specifications_count': len(children['specifications']),
+        'documents_count': len(children['documents']),
+        'vendors_count': len(children['component_vendors']),
+    }
@@ -0,0 +1,53 @@
+"""Document numbers (GRN-2026-00001, COMP-001, ...) from one sequence per prefix and year.
+
+The insert triggers number rows one at a time through fn_next_doc_number().
+allocate_numbers() takes numbers for a whole batch in one statement, for bulk
+inserts that set the number column themselves. Sequences never wait on other
+transactions, so a long import does not hold up single inserts; a rollback
+leaves a gap instead of returning its numbers (see migration 012).
+
+prepare_year() creates a year's sequences ahead of time (flask doc-numbers-prepare).
+"""
+from app.extensions import db
+
+# series -> (prefix, numbered per year, minimum digits); must match the triggers in migration 009
+SERIES = {
+    'gate_entry': ('GE', True, 5),
+    'grn': ('GRN', True, 5),
+    'inspection_queue': ('QC', True, 5),
+    'inspection_result': ('IR', True, 5),
+    'vendor_return': ('VR', True, 5),
+    'store_transfer': ('ST', True, 5),
+    'inspection_report': ('IRP', True, 5),
+    'component': ('COMP', False, 3),
+}
+
+
+def format_number(prefix, period, num, width):
+    digits = str(num).zfill(width)
+    return f'{prefix}-{period}-{digits}' if period else f'{prefix}-{digits}'
+
+
+def allocate_numbers(series, count=1):
+    """Take `count` numbers of a series, ascending. Returns formatted numbers.
+
+    They are unique but need not be consecutive: concurrent inserts draw from the same sequence.
+    """
+    if count < 1:
+        return []
+    prefix, yearly, width = SERIES[series]
+    rows = db.session.execute(
+        db.text("SELECT s.period, nextval(s.seq) AS num FROM "
+                "(SELECT p.period, fn_doc_number_sequence(:prefix, p.period) AS seq FROM "
+                "(SELECT CASE WHEN :yearly THEN TO_CHAR(CURRENT_DATE, 'YYYY') ELSE '' END AS period) p "
+                "OFFSET 0) s, generate_series(1, :count) ORDER BY num"),
+        {'prefix': prefix, 'count': count, 'yearly': yearly}).all()
+    return [format_number(prefix, row.period, row.num, width) for row in rows]
+
+
+def prepare_year(year):
+    """Create the sequences of the yearly series for `year`. Returns how many were missing."""
+    created = db.session.execute(db.text('SELECT fn_create_doc_number_sequences(:period)'),
+                                 {'period': str(year)}).scalar()
+    db.session.commit()
+    return created
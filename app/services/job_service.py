@@ -0,0 +1,172 @@
+"""Background jobs: queued from a request, built in a per-worker thread pool.
+
+submit_job() stores a qc_background_jobs row and hands its id to the pool. While
+a job is queued or running, an identical request (same job type and params)
+attaches to it instead of starting a second build; the partial unique index on
+(job_type, params_hash) settles races between workers.
+
+Job types register a runner with @job_runner. A runner gets the params, the path
+to write its artifact to and a progress callback, and returns the download file
+name and mimetype. Artifacts live under UPLOAD_DIR/exports until JOB_RESULT_TTL.
+A job whose worker died stops heartbeating and is failed once it is older than
+JOB_STALE_SECONDS, so the next identical request starts a fresh build.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from flask import current_app, g
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.jobs import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+_runners = {}
+_pool = {'pid': None, 'executor': None}
+_pool_lock = threading.Lock()
+
+
+def job_runner(job_type):
+    """Register fn(params, path, progress) -> (file_name, mime_type) as the runner for job_type."""
+    def decorator(fn):
+        _runners[job_type] = fn
+        return fn
+    return decorator
+
+
+def _executor():
+    # One pool per worker process; a forked child must not reuse the parent's threads
+    pid = os.getpid()
+    if _pool['pid'] != pid:
+        with _pool_lock:
+            if _pool['pid'] != pid:
+                _pool['executor'] = ThreadPoolExecutor(max_workers=current_app.config.get('JOB_WORKERS', 2),
+                                                       thread_name_prefix='qc-job')
+                _pool['pid'] = pid
+    return _pool['executor']
+
+
+def params_hash(job_type, params):
+    canonical = json.dumps({'job_type': job_type, 'params': params}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _active_job(job_type, digest):
+    stale_before = _now() - timedelta(seconds=current_app.config.get('JOB_STALE_SECONDS', 600))
+    job = BackgroundJob.query.filter(BackgroundJob.job_type == job_type, BackgroundJob.params_hash == digest,
+                                     BackgroundJob.status.in_(ACTIVE_STATUSES)).first()
+    if job is not None and job.updated_at < stale_before:
+        job.status = 'failed'
+        job.error = 'Worker stopped before the job finished'
+        job.completed_at = _now()
+        db.session.flush()
+        return None
+    return job
+
+
+def purge_expired_jobs():
+    """Remove artifacts of completed jobs past expires_at and mark them expired."""
+    expired = BackgroundJob.query.filter(BackgroundJob.status == 'completed', BackgroundJob.expires_at < _now()).all()
+    for job in expired:
+        if job.file_path and os.path.exists(job.file_path):
+            os.remove(job.file_path)
+        job.status = 'expired'
+        job.file_path = None
+
+
+def submit_job(job_type, params):
+    """Queue a job, or attach to an identical one in flight. Commits. Returns (job, attached)."""
+    purge_expired_jobs()
+    digest = params_hash(job_type, params)
+    for _ in range(2):
+        job = _active_job(job_type, digest)
+        if job is not None:
+            db.session.commit()
+            return job, True
+        job = BackgroundJob(id=uuid4().hex, job_type=job_type, params=params, params_hash=digest,
+                            status='queued', created_by=g.current_user.get('user_name'))
+        try:
+            with db.session.begin_nested():
+                db.session.add(job)
+        except IntegrityError:
+            # Another worker queued the same job between the lookup and the insert
+            continue
+        db.session.commit()
+        _executor().submit(_run, current_app._get_current_object(), job.id)
+        return job, False
+    raise RuntimeError(f'Could not queue {job_type} job')
+
+
+def _set(job_id, **values):
+    """Update a job row on its own connection (the runner's session may hold an open cursor)."""
+    values.setdefault('updated_at', _now())
+    with db.engine.begin() as conn:
+        conn.execute(db.update(BackgroundJob).where(BackgroundJob.id == job_id).values(**values))
+
+
+def _run(app, job_id):
+    with app.app_context():
+        job = db.session.get(BackgroundJob, job_id)
+        if job is None or job.status != 'queued':
+            return
+        job_type, params = job.job_type, job.params
+        db.session.rollback()
+        _set(job_id, status='running', started_at=_now())
+
+        export_dir = os.path.join(app.config['UPLOAD_DIR'], 'exports')
+        os.makedirs(export_dir, exist_ok=True)
+        path = os.path.join(export_dir, job_id)
+
+        def progress(done, total=None):
+            values = {'progress': done}
+            if total is not None:
+                values['total'] = total
+            _set(job_id, **values)
+
+        try:
+            file_name, mime_type = _runners[job_type](params, path, progress)
+        except Exception as e:
+            logger.exception('Job %s (%s) failed', job_id, job_type)
+            if os.path.exists(path):
+                os.remove(path)
+            _set(job_id, status='failed', error=str(e)[:1000], completed_at=_now())
+            return
+        finally:
+            db.session.rollback()
+
+        _set(job_id, status='completed', file_path=path, file_name=file_name, mime_type=mime_type,
+             file_size=os.path.getsize(path), completed_at=_now(),
+             expires_at=_now() + timedelta(seconds=app.config.get('JOB_RESULT_TTL', 86400)))
+
+
+def serialize_job(job):
+    return {
+        'id': job.id,
+        'job_type': job.job_type,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'percent': round(100 * job.progress / job.total, 1) if job.total else None,
+        'file_name': job.file_name,
+        'file_size': job.file_size,
+        'error': job.error,
+        'created_by': job.created_by,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'completed_at': job.completed_at.isoformat() if job.completed_at else None,
+        'expires_at': job.expires_at.isoformat() if job.expires_at else None,
+        'download_url': f'/api/v1/jobs/{job.id}/download' if job.status == 'completed' else None,
+    }
@@ -0,0 +1,59 @@
+"""Part-code availability checks backed by a per-worker set of taken codes.
+
+The set holds lower(part_code) of every live component and is tagged with the
+qc_component_master version from the lookup cache, so any component write (in
+this worker or, via the invalidation bus, in another) makes it reload on the
+next check. A reload is a single query.
+"""
+import threading
+import time
+
+from flask import current_app
+
+from app.extensions import db
+from app.models.components import ComponentMaster
+from app.utils.cache import lookup_cache
+
+_TABLES = ('qc_component_master',)
+_lock = threading.Lock()
+_state = {'versions': None, 'loaded_at': 0.0, 'codes': frozenset()}
+
+
+def _taken_codes():
+    versions = lookup_cache.versions(_TABLES)
+    ttl = current_app.config.get('LOOKUP_CACHE_TTL', 300)
+    if _state['versions'] == versions and time.monotonic() - _state['loaded_at'] <= ttl:
+        return _state['codes']
+    with _lock:
+        if _state['versions'] != versions or time.monotonic() - _state['loaded_at'] > ttl:
+            rows = db.session.execute(
+                db.select(db.func.lower(ComponentMaster.part_code))
+                .where(ComponentMaster.is_deleted == False))
+            # Versions were read before the query, so a concurrent write forces another reload
+            _state.update(codes=frozenset(r[0] for r in rows), versions=versions, loaded_at=time.monotonic())
+        return _state['codes']
+
+
+def taken_part_codes():
+    """frozenset of lower(part_code) for every live component."""
+    return _taken_codes()
+
+
+def is_part_code_taken(part_code):
+    return part_code.lower() in _taken_codes()
+
+
+def check_part_codes(part_codes):
+    """Availability for many codes. Codes are normalised like the single check (strip + upper).
+
+    Returns (results, duplicates): results in request order, duplicates = codes repeated in the batch.
+    """
+    taken = _taken_codes()
+    results, seen, duplicates = [], set(), []
+    for raw in part_codes:
+        code = str(raw).strip().upper()
+        if code in seen:
+            duplicates.append(code)
+        seen.add(code)
+        results.append({'part_code': code, 'available': bool(code) and code.lower() not in taken})
+    return results, sorted(set(duplicates))
@@ -0,0 +1,128 @@
+"""Thumbnails and first-page previews for uploaded images and PDFs.
+
+After an upload, schedule_previews() renders the derivatives in a small
+per-process thread pool. They are written next to the original as
+<file>.thumb.jpg and <file>.preview.jpg (for a blob that is once per content, so
+duplicate uploads reuse them). get_preview() serves an existing derivative, or
+renders it on the spot if the background task has not run yet (or was lost in a
+restart).
+
+Images need Pillow; PDFs also need pypdfium2. Without them, previews are
+unavailable and uploads are unaffected.
+"""
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+SIZES = {'thumb': 256, 'preview': 1024}  # longest edge, px
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+PDF_EXTENSIONS = {'pdf'}
+
+_pool = {'pid': None, 'executor': None}
+_pool_lock = threading.Lock()
+
+
+def is_previewable(file_name):
+    ext = file_name.rsplit('.', 1)[-1].lower() if file_name and '.' in file_name else ''
+    return ext in IMAGE_EXTENSIONS or ext in PDF_EXTENSIONS
+
+
+def derivative_path(file_path, kind):
+    return f'{file_path}.{kind}.jpg'
+
+
+def remove_previews(file_path):
+    for kind in SIZES:
+        path = derivative_path(file_path, kind)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _open_first_page(file_path, file_name, size):
+    """First page as a PIL image, rendered at about `size` px for PDFs."""
+    from PIL import Image
+    if file_name.rsplit('.', 1)[-1].lower() in PDF_EXTENSIONS:
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            page = pdf[0]
+            scale = size / max(page.get_size())
+            return page.render(scale=scale).to_pil().copy()  # detach from the pdfium bitmap
+        finally:
+            pdf.close()
+    image = Image.open(file_path)
+    image.draft('RGB', (size, size))  # JPEG: decode at reduced scale
+    return image
+
+
+def _render(file_path, file_name, kind):
+    from PIL import Image, ImageOps
+    size = SIZES[kind]
+    image = _open_first_page(file_path, file_name, size)
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.thumbnail((size, size))
+    target = derivative_path(file_path, kind)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.jpg')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            image.save(out, 'JPEG', quality=80, optimize=True)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return target
+
+
+def generate_previews(file_path, file_name):
+    """Render every missing derivative of file_path. Failures are logged, not raised."""
+    for kind in SIZES:
+        if os.path.exists(derivative_path(file_path, kind)):
+            continue
+        try:
+            _render(file_path, file_name, kind)
+        except Exception:
+            logger.warning('Could not render %s of %s', kind, file_path, exc_info=True)
+            return
+
+
+def _executor():
+    pid = os.getpid()
+    if _pool['pid'] != pid:
+        with _pool_lock:
+            if _pool['pid'] != pid:
+                _pool['executor'] = ThreadPoolExecutor(max_workers=current_app.config.get('PREVIEW_WORKERS', 2),
+                                                       thread_name_prefix='qc-preview')
+                _pool['pid'] = pid
+    return _pool['executor']
+
+
+def schedule_previews(file_path, file_name):
+    if is_previewable(file_name) and not all(os.path.exists(derivative_path(file_path, k)) for k in SIZES):
+        _executor().submit(generate_previews, file_path, file_name)
+
+
+def get_preview(file_path, file_name, kind):
+    """Path of the derivative, rendering it now if missing. None if it cannot be made."""
+    path = derivative_path(file_path, kind)
+    if os.path.exists(path):
+        return path
+    if not is_previewable(file_name) or not os.path.exists(file_path):
+        return None
+    try:
+        return _render(file_path, file_name, kind)
+    except Exception:
+        logger.warning('Could not render %s of %s', kind, file_path, exc_info=True)
+        return None
@@ -0,0 +1,50 @@
+"""Set-based foreign-key validation for writes with many referenced rows.
+
+Queue every reference with check() (and any non-FK error with error()), then
+validate() looks up each target table with a single `id IN (...)` query and
+returns error dicts in the order they were queued, so callers keep the field
+paths and messages of the old one-query-per-ID checks.
+"""
+
+
+class RefValidator:
+
+    def __init__(self):
+        self._entries = []  # ((model, active_only), ref_id, field, message, rule)
+
+    def check(self, model, ref_id, field, message, rule=None, active_only=True):
+        """Require ref_id to be an active `model` row (any row with active_only=False); None is skipped.
+
+        rule=(predicate, message) adds a condition on the found row, e.g. a group
+        that must belong to the given category.
+        """
+        if ref_id is not None:
+            self._entries.append(((model, active_only), ref_id, field, message, rule))
+
+    def error(self, field, message):
+        """Queue an error that is not a reference check, keeping its position in the output."""
+        self._entries.append((None, None, field, message, None))
+
+    def validate(self):
+        """Run one query per referenced table. Returns the list of error dicts."""
+        wanted = {}
+        for target, ref_id, *_ in self._entries:
+            if target is not None:
+                wanted.setdefault(target, set()).add(ref_id)
+        found = {}
+        for (model, active_only), ids in wanted.items():
+            query = model.query.filter(model.id.in_(ids))
+            if active_only:
+                query = query.filter(model.is_active == True)
+            found[model, active_only] = {row.id: row for row in query}
+
+        errors = []
+        for target, ref_id, field, message, rule in self._entries:
+            if target is not None:
+                row = found[target].get(ref_id)
+                if row is not None:
+                    if rule is None or rule[0](row):
+                        continue
+                    message = rule[1]
+            errors.append({'field': field, 'message': message})
+        return errors
@@ -0,0 +1,98 @@
+"""Substring search over master records, backed by pg_trgm GiST indexes.
+
+Every searchable column has a trigram index (migration 013), so `ILIKE '%term%'`
+is an index scan instead of a sequential scan. List endpoints filter with
+apply_search(); the global /search endpoint takes each column's nearest matches
+from its index (`col <-> term`) and ranks those by trigram similarity.
+Trigram indexes need a term of at least 3 characters to narrow anything down.
+"""
+from app.extensions import db
+from app.models.components import ComponentMaster
+from app.models.masters import Vendor, Instrument
+from app.models.sampling import SamplingPlan
+from app.models.qc_plans import QCPlan
+
+SEARCH_TYPES = {
+    'components': {
+        'model': ComponentMaster,
+        'columns': (ComponentMaster.part_code, ComponentMaster.part_name, ComponentMaster.component_code),
+        'filters': (ComponentMaster.is_deleted == False,),
+        'fields': (ComponentMaster.component_code, ComponentMaster.part_code, ComponentMaster.part_name,
+                   ComponentMaster.status),
+    },
+    'vendors': {
+        'model': Vendor,
+        'columns': (Vendor.vendor_code, Vendor.vendor_name, Vendor.city),
+        'filters': (),
+        'fields': (Vendor.vendor_code, Vendor.vendor_name, Vendor.city, Vendor.is_active),
+    },
+    'instruments': {
+        'model': Instrument,
+        'columns': (Instrument.instrument_code, Instrument.instrument_name),
+        'filters': (),
+        'fields': (Instrument.instrument_code, Instrument.instrument_name, Instrument.is_active),
+    },
+    'sampling_plans': {
+        'model': SamplingPlan,
+        'columns': (SamplingPlan.plan_code, SamplingPlan.plan_name),
+        'filters': (),
+        'fields': (SamplingPlan.plan_code, SamplingPlan.plan_name, SamplingPlan.is_active),
+    },
+    'qc_plans': {
+        'model': QCPlan,
+        'columns': (QCPlan.plan_code, QCPlan.plan_name),
+        'filters': (),
+        'fields': (QCPlan.plan_code, QCPlan.plan_name, QCPlan.status),
+    },
+}
+
+
+def _pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _matches(columns, term):
+    pattern = _pattern(term)
+    return db.or_(*[col.ilike(pattern, escape='\\') for col in columns])
+
+
+def apply_search(query, search_type, term):
+    """Filter a list query to rows whose searchable columns contain term (case-insensitive)."""
+    term = (term or '').strip()
+    if not term:
+        return query
+    return query.filter(_matches(SEARCH_TYPES[search_type]['columns'], term))
+
+
+def global_search(term, types, limit):
+    """Top `limit` hits per type, best trigram similarity first.
+
+    Each column contributes its `limit` matches nearest to term, read in distance
+    order from its GiST index, so the work does not grow with how common the
+    term is; those candidates are ranked by their best column.
+    Returns {type: [{'id', <fields>..., 'score'}]}; one query per type.
+    """
+    pattern = _pattern(term)
+    results = {}
+    for search_type in types:
+        spec = SEARCH_TYPES[search_type]
+        model = spec['model']
+        candidates = db.union(*[
+            db.select(model.id)
+            .where(*spec['filters'], col.ilike(pattern, escape='\\'))
+            .order_by(col.op('<->', return_type=db.Float)(term))
+            .limit(limit)
+            for col in spec['columns']
+        ])
+        score = db.func.greatest(*[db.func.similarity(db.func.coalesce(col, ''), term)
+                                   for col in spec['columns']]).label('score')
+        stmt = (db.select(model.id, *spec['fields'], score)
+                .where(model.id.in_(candidates))
+                .order_by(score.desc(), model.id)
+                .limit(limit))
+        results[search_type] = [
+            {**row._asdict(), 'score': round(float(row.score), 4)}
+            for row in db.session.execute(stmt)
+        ]
+    return results
@@ -0,0 +1,132 @@
+"""Storage backends for uploaded files: local disk (UPLOAD_DIR) or an S3-compatible bucket.
+
+get_storage() returns the backend named by UPLOAD_STORAGE (or the one a stored
+blob records). Backends address files by key, e.g. blobs/ab/cd/<digest>, and
+store a location in file_path: the absolute path for local, the key for S3.
+
+The S3 backend keeps one boto3 client per process. boto3 clients are thread-safe
+and reuse their HTTP connection pool (S3_MAX_POOL_CONNECTIONS), instead of each
+upload building a client and a TLS connection. S3_ENDPOINT_URL points it at
+MinIO or another S3-compatible store.
+"""
+import base64
+import os
+import threading
+from urllib.parse import quote
+
+from flask import current_app, redirect
+
+from app.utils.file_upload import send_stored_file
+
+
+def _b64_sha256(sha256_hex):
+    return base64.b64encode(bytes.fromhex(sha256_hex)).decode()
+
+
+class LocalStorage:
+    name = 'local'
+    direct_uploads = False
+
+    def location(self, key):
+        return os.path.join(current_app.config['UPLOAD_DIR'], key)
+
+    def exists(self, location):
+        return os.path.exists(location)
+
+    def put_file(self, tmp_path, location):
+        os.makedirs(os.path.dirname(location), exist_ok=True)
+        os.replace(tmp_path, location)
+
+    def delete(self, location):
+        if os.path.exists(location):
+            os.remove(location)
+
+    def send(self, location, mimetype=None, download_name=None, etag=True, as_attachment=True):
+        return send_stored_file(location, mimetype=mimetype, download_name=download_name, etag=etag,
+                                as_attachment=as_attachment)
+
+
+class S3Storage:
+    name = 's3'
+    direct_uploads = True
+
+    def __init__(self, config):
+        import boto3
+        from botocore.config import Config
+        self.bucket = config.get('AWS_S3_BUCKET')
+        self.presign_expiry = config.get('S3_PRESIGN_EXPIRY', 900)
+        self.client = boto3.session.Session().client(
+            's3', region_name=config.get('AWS_REGION'), endpoint_url=config.get('S3_ENDPOINT_URL') or None,
+            config=Config(max_pool_connections=config.get('S3_MAX_POOL_CONNECTIONS', 20),
+                          signature_version='s3v4', retries={'max_attempts': 3, 'mode': 'standard'}))
+
+    def location(self, key):
+        return key
+
+    def head(self, location, **params):
+        """Object metadata, or None if it does not exist."""
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=location, **params)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def exists(self, location):
+        return self.head(location) is not None
+
+    def put_file(self, tmp_path, location):
+        self.client.upload_file(tmp_path, self.bucket, location)
+        os.remove(tmp_path)
+
+    def delete(self, location):
+        self.client.delete_object(Bucket=self.bucket, Key=location)
+
+    def has_upload(self, location, size, sha256_hex):
+        """Whether a presigned PUT of this size and SHA-256 has landed."""
+        head = self.head(location, ChecksumMode='ENABLED')
+        if head is None or head['ContentLength'] != size:
+            return False
+        # Stores without checksum support omit it; the signed checksum header was still required on PUT
+        checksum = head.get('ChecksumSHA256')
+        return checksum is None or checksum == _b64_sha256(sha256_hex)
+
+    def presign_put(self, location, size, sha256_hex, content_type):
+        """URL and headers for a client-side PUT; S3 rejects a body whose SHA-256 does not match."""
+        checksum = _b64_sha256(sha256_hex)
+        url = self.client.generate_presigned_url('put_object', ExpiresIn=self.presign_expiry, Params={
+            'Bucket': self.bucket, 'Key': location, 'ContentLength': size, 'ContentType': content_type,
+            'ChecksumSHA256': checksum})
+        return {'method': 'PUT', 'url': url, 'expires_in': self.presign_expiry,
+                'headers': {'Content-Type': content_type, 'Content-Length': str(size),
+                            'x-amz-checksum-sha256': checksum}}
+
+    def presign_get(self, location, mimetype=None, download_name=None, as_attachment=True):
+        params = {'Bucket': self.bucket, 'Key': location}
+        if mimetype:
+            params['ResponseContentType'] = mimetype
+        if download_name:
+            disposition = 'attachment' if as_attachment else 'inline'
+            params['ResponseContentDisposition'] = f"{disposition}; filename*=UTF-8''{quote(download_name, safe='')}"
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=self.presign_expiry)
+
+    def send(self, location, mimetype=None, download_name=None, etag=True, as_attachment=True):
+        # The bytes go straight from the bucket to the client
+        return redirect(self.presign_get(location, mimetype, download_name, as_attachment), code=302)
+
+
+_BACKENDS = {'local': LocalStorage, 's3': S3Storage}
+_instances = {}
+_lock = threading.Lock()
+
+
+def get_storage(name=None):
+    """Backend for `name` (default UPLOAD_STORAGE), created once per process."""
+    key = (name or current_app.config.get('UPLOAD_STORAGE', 'local'), os.getpid())
+    if key not in _instances:
+        with _lock:
+            if key not in _instances:
+                backend = _BACKENDS[key[0]]
+                _instances[key] = backend(current_app.config) if backend is S3Storage else backend()
+    return _instances[key]
@@ -0,0 +1,211 @@
+"""Garbage collection for UPLOAD_DIR (flask uploads-gc).
+
+Files can outlive their rows: a request that fails after its file was written, a
+rolled-back transaction, a component removed by hand. sweep_files() finds them:
+
+- UPLOAD_DIR is walked by a thread pool, one directory per task, and every
+  file is COPYed into a temp table as it is found.
+- The paths the database knows (documents, blobs, job results, plan documents)
+  are streamed into a second temp table, relative to UPLOAD_DIR.
+- Postgres then compares the two, so memory stays flat however many files there
+  are. A scanned file no row knows is an orphan; a known path with no file is
+  missing. Thumbnails / previews (<file>.thumb.jpg) belong to their original.
+
+Only files older than the grace period count as orphans, which leaves uploads,
+exports and previews still being written alone. Orphans are reported, or moved
+to UPLOAD_DIR/.quarantine/<timestamp>/; missing files are only reported.
+
+reclaim_blobs() deletes blobs no document has referenced for the grace period,
+and purge_sessions() removes expired resumable uploads.
+"""
+import csv
+import io
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+
+from app.extensions import db
+from app.models.files import FileBlob
+from app.services.blob_store import release_blob
+from app.services.preview_service import SIZES
+from app.services.upload_sessions import expired_sessions, discard_session
+
+DERIVATIVE_SUFFIXES = tuple(f'.{kind}.jpg' for kind in SIZES)
+SKIP_DIRS = {'.sessions', '.quarantine'}
+COPY_BATCH = 10000
+STREAM = {'stream_results': True, 'yield_per': COPY_BATCH}  # server-side cursor
+FILE_URL_PREFIX = '/api/v1/files/'  # app.utils.file_upload.save_file() returns paths as URLs
+
+KNOWN_PATHS_SQL = '''
+    SELECT file_path FROM qc_component_documents WHERE storage = 'local' AND file_path IS NOT NULL
+    UNION ALL SELECT file_path FROM qc_file_blobs WHERE storage = 'local'
+    UNION ALL SELECT file_path FROM qc_background_jobs WHERE file_path IS NOT NULL
+    UNION ALL SELECT document_path FROM qc_plans WHERE document_path IS NOT NULL
+'''
+
+
+def _upload_root():
+    return os.path.abspath(current_app.config['UPLOAD_DIR'])
+
+
+def _relative(root, path):
+    """path relative to UPLOAD_DIR, or None if it lies outside."""
+    if path.startswith(FILE_URL_PREFIX):
+        return path[len(FILE_URL_PREFIX):]
+    rel = os.path.relpath(os.path.abspath(path), root)
+    return None if rel.startswith('..') else rel
+
+
+def _list_dir(root, rel):
+    """(files, subdirectories) of one directory; files as (path, base path, size, mtime)."""
+    files, subdirs = [], []
+    try:
+        entries = list(os.scandir(os.path.join(root, rel)))
+    except FileNotFoundError:
+        return files, subdirs
+    for entry in entries:
+        path = os.path.join(rel, entry.name) if rel else entry.name
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIP_DIRS:
+                    subdirs.append(path)
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                base = next((path[:-len(s)] for s in DERIVATIVE_SUFFIXES if path.endswith(s)), path)
+                files.append((path, base, stat.st_size, stat.st_mtime))
+        except FileNotFoundError:
+            continue  # removed while scanning
+    return files, subdirs
+
+
+def scan_files(root, workers=8):
+    """Yield (path, base path, size, mtime) for every file under root, listing directories in parallel."""
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='qc-gc-scan') as executor:
+        pending = {executor.submit(_list_dir, root, '')}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for task in done:
+                files, subdirs = task.result()
+                pending.update(executor.submit(_list_dir, root, d) for d in subdirs)
+                yield from files
+
+
+def _copy_rows(cursor, table, columns, rows):
+    """COPY rows into table in batches; returns how many."""
+    count, buffer = 0, io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % COPY_BATCH == 0:
+            _flush_copy(cursor, table, columns, buffer)
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+    _flush_copy(cursor, table, columns, buffer)
+    return count
+
+
+def _flush_copy(cursor, table, columns, buffer):
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _known_paths(connection, root):
+    result = connection.execute(db.text(KNOWN_PATHS_SQL), execution_options=STREAM)
+    for (path,) in result:
+        rel = _relative(root, path)
+        if rel is not None:
+            yield (rel,)
+
+
+def sweep_files(grace_seconds, workers=8, quarantine_dir=None, on_orphan=None, on_missing=None):
+    """Compare UPLOAD_DIR with the database. Returns counts; calls on_orphan(path, size) / on_missing(path)."""
+    root = _upload_root()
+    cutoff = time.time() - grace_seconds
+    stats = {'scanned': 0, 'orphaned': 0, 'orphaned_bytes': 0, 'quarantined': 0, 'missing': 0}
+    connection = db.session.connection()
+    connection.execute(db.text(
+        'CREATE TEMP TABLE gc_scanned (path TEXT, base TEXT, size BIGINT, mtime DOUBLE PRECISION) ON COMMIT DROP'))
+    connection.execute(db.text('CREATE TEMP TABLE gc_known (path TEXT) ON COMMIT DROP'))
+    cursor = connection.connection.cursor()
+    try:
+        stats['scanned'] = _copy_rows(cursor, 'gc_scanned', ('path', 'base', 'size', 'mtime'),
+                                      scan_files(root, workers))
+        _copy_rows(cursor, 'gc_known', ('path',), _known_paths(connection, root))
+    finally:
+        cursor.close()
+    connection.execute(db.text('ANALYZE gc_scanned'))
+    connection.execute(db.text('ANALYZE gc_known'))
+
+    orphans = connection.execute(db.text('''
+        SELECT s.path, s.size FROM gc_scanned s
+        WHERE s.mtime < :cutoff AND NOT EXISTS (SELECT 1 FROM gc_known k WHERE k.path = s.base)
+        ORDER BY s.path'''), {'cutoff': cutoff}, execution_options=STREAM)
+    for path, size in orphans:
+        stats['orphaned'] += 1
+        stats['orphaned_bytes'] += size
+        if on_orphan:
+            on_orphan(path, size)
+        if quarantine_dir:
+            target = os.path.join(quarantine_dir, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.replace(os.path.join(root, path), target)
+                stats['quarantined'] += 1
+            except FileNotFoundError:
+                pass
+
+    missing = connection.execute(db.text('''
+        SELECT DISTINCT k.path FROM gc_known k
+        WHERE NOT EXISTS (SELECT 1 FROM gc_scanned s WHERE s.path = k.path)
+        ORDER BY k.path'''), execution_options=STREAM)
+    for (path,) in missing:
+        stats['missing'] += 1
+        if on_missing:
+            on_missing(path)
+    db.session.commit()
+    return stats
+
+
+def reclaim_blobs(grace_seconds, dry_run=False, batch_size=500):
+    """Delete blobs unreferenced for longer than the grace period. Returns (count, bytes)."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+    query = (db.select(FileBlob.digest, FileBlob.file_size)
+             .where(FileBlob.ref_count == 0,
+                    db.func.coalesce(FileBlob.released_at, FileBlob.created_at) < cutoff)
+             .order_by(FileBlob.digest))
+    count = size = 0
+    last = ''
+    while True:
+        rows = db.session.execute(query.where(FileBlob.digest > last).limit(batch_size)).all()
+        if not rows:
+            break
+        for digest, file_size in rows:
+            # release_blob() locks the row and re-checks ref_count
+            if dry_run or release_blob(digest):
+                count += 1
+                size += file_size
+        last = rows[-1].digest
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+    return count, size
+
+
+def purge_sessions(dry_run=False):
+    """Remove expired resumable uploads. Returns how many."""
+    count = 0
+    for upload_id in expired_sessions():
+        if not dry_run:
+            discard_session(upload_id)
+        count += 1
+    return count
+
+
+def quarantine_dir():
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    return os.path.join(_upload_root(), '.quarantine', stamp)
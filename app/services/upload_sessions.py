@@ -0,0 +1,163 @@
+"""Resumable document uploads, kept on disk under UPLOAD_DIR/.sessions/<upload_id>.
+
+A session is a meta.json (target component, file name, declared size and
+SHA-256, owner, expiry) plus a data file that chunks are appended to. The data
+file's length is the upload offset, so a chunk needs no other bookkeeping, and
+a session outlives the worker that created it: any worker can take the next
+chunk or finish the upload, also after a restart. Appends and completion hold
+an exclusive flock on the data file, so two requests for one session never
+interleave.
+
+A chunk must start at the current offset. If the connection drops mid-chunk,
+the bytes that arrived are kept; the client asks for the offset and sends the
+rest from there.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import re
+import secrets
+import shutil
+import time
+from contextlib import contextmanager
+
+from flask import current_app
+
+from app.services.blob_store import CHUNK_SIZE
+
+UPLOAD_ID_RE = re.compile(r'[0-9a-f]{32}')
+META_FILE = 'meta.json'
+DATA_FILE = 'data'
+
+
+class UploadSessionError(ValueError):
+    """Request that does not fit the session's state; `offset` is set when the client should resume from it."""
+
+    def __init__(self, message, status_code=400, offset=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+def sessions_root():
+    # Under UPLOAD_DIR, so completing an upload renames the data file into the blob store
+    return os.path.join(current_app.config['UPLOAD_DIR'], '.sessions')
+
+
+def _session_dir(upload_id):
+    if not UPLOAD_ID_RE.fullmatch(upload_id or ''):
+        raise UploadSessionError('Upload not found', 404)
+    return os.path.join(sessions_root(), upload_id)
+
+
+def create_session(**meta):
+    """Start an upload of meta['size'] bytes; meta is returned by get_session() along with the offset."""
+    upload_id = secrets.token_hex(16)
+    path = os.path.join(sessions_root(), upload_id)
+    os.makedirs(path)
+    meta = dict(meta, upload_id=upload_id,
+                expires_at=int(time.time()) + current_app.config.get('UPLOAD_SESSION_TTL', 86400))
+    open(os.path.join(path, DATA_FILE), 'wb').close()
+    tmp_path = os.path.join(path, META_FILE + '.tmp')
+    with open(tmp_path, 'w') as out:
+        json.dump(meta, out)
+    os.replace(tmp_path, os.path.join(path, META_FILE))
+    return dict(meta, offset=0)
+
+
+def get_session(upload_id):
+    path = _session_dir(upload_id)
+    try:
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        offset = os.path.getsize(os.path.join(path, DATA_FILE))
+    except FileNotFoundError:
+        raise UploadSessionError('Upload not found', 404)
+    if meta['expires_at'] < time.time():
+        raise UploadSessionError('Upload has expired', 410)
+    return dict(meta, offset=offset)
+
+
+@contextmanager
+def _locked_data(upload_id):
+    try:
+        data = open(os.path.join(_session_dir(upload_id), DATA_FILE), 'r+b')
+    except FileNotFoundError:
+        raise UploadSessionError('Upload not found', 404)
+    with data:
+        try:
+            fcntl.flock(data, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadSessionError('Another request is writing to this upload', 409)
+        # Re-read under the lock: the session may have been completed or discarded meanwhile
+        session = get_session(upload_id)
+        data.seek(session['offset'])
+        yield session, data
+
+
+def append_chunk(upload_id, start, length, stream):
+    """Append `length` bytes from stream at offset `start`. Returns the new offset."""
+    with _locked_data(upload_id) as (session, data):
+        offset = session['offset']
+        if start != offset:
+            raise UploadSessionError(f'Chunk starts at {start}, expected {offset}', 409, offset=offset)
+        if offset + length > session['size']:
+            raise UploadSessionError(f'Chunk runs past the declared size of {session["size"]} bytes', 400,
+                                     offset=offset)
+        try:
+            remaining = length
+            while remaining and (chunk := stream.read(min(CHUNK_SIZE, remaining))):
+                data.write(chunk)
+                remaining -= len(chunk)
+        finally:
+            # Keep whatever arrived before a disconnect
+            data.flush()
+            os.fsync(data.fileno())
+        return data.tell()
+
+
+@contextmanager
+def completing(upload_id):
+    """Check the finished upload and yield (session, data_path, digest), locked.
+
+    The data file is the caller's to move (blob_store.store_file()); the session
+    is removed when the block exits cleanly. A hash mismatch discards the upload.
+    """
+    with _locked_data(upload_id) as (session, data):
+        if session['offset'] != session['size']:
+            raise UploadSessionError(f'Upload is incomplete: {session["offset"]} of {session["size"]} bytes',
+                                     409, offset=session['offset'])
+        data_path = data.name
+        sha = hashlib.sha256()
+        with open(data_path, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        if digest != session['sha256']:
+            discard_session(upload_id)
+            raise UploadSessionError('Uploaded content does not match sha256; start the upload again', 422)
+        yield session, data_path, digest
+    discard_session(upload_id)
+
+
+def discard_session(upload_id):
+    shutil.rmtree(_session_dir(upload_id), ignore_errors=True)
+
+
+def expired_sessions():
+    """Ids of sessions past their expiry (a session without meta.json expires UPLOAD_SESSION_TTL after creation)."""
+    root = sessions_root()
+    if not os.path.isdir(root):
+        return
+    now = time.time()
+    for entry in os.scandir(root):
+        if not (entry.is_dir() and UPLOAD_ID_RE.fullmatch(entry.name)):
+            continue
+        try:
+            with open(os.path.join(entry.path, META_FILE)) as f:
+                expires_at = json.load(f)['expires_at']
+        except (FileNotFoundError, ValueError, KeyError):
+            expires_at = entry.stat().st_mtime + current_app.config.get('UPLOAD_SESSION_TTL', 86400)
+        if expires_at < now:
+            yield entry.name
@@ -0,0 +1,25 @@
+"""Lookups against the trigger-maintained qc_usage_counters table."""
+from app.extensions import db
+from app.models.masters import UsageCounter
+
+
+def get_usage_count(ref_table, ref_id, usage_type):
+    """Number of live rows referencing ref_table.id = ref_id (primary-key lookup)."""
+    count = db.session.query(UsageCounter.usage_count).filter_by(
+        ref_table=ref_table, ref_id=ref_id, usage_type=usage_type).scalar()
+    return count or 0
+
+
+def get_usage_counts(ref_table, ref_ids, usage_type):
+    """Batch variant for list pages. Returns {ref_id: count} with 0 for unreferenced ids."""
+    ref_ids = list(ref_ids)
+    counts = dict.fromkeys(ref_ids, 0)
+    if not ref_ids:
+        return counts
+    rows = db.session.query(UsageCounter.ref_id, UsageCounter.usage_count).filter(
+        UsageCounter.ref_table == ref_table,
+        UsageCounter.usage_type == usage_type,
+        UsageCounter.ref_id.in_(ref_ids)).all()
+    for ref_id, count in rows:
+        counts[ref_id] = count
+    return counts
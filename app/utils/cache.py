@@ -0,0 +1,161 @@
+"""Per-worker cache of serialized lookup payloads.
+
+Every entry remembers the version of each table it was built from. Commits that
+write to a table bump its version (tracked through SQLAlchemy session events),
+which makes all dependent entries stale without any explicit invalidation call
+in the routes. Other workers learn about the commit through the invalidation bus.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from itertools import chain
+
+from flask import current_app, has_app_context, request
+from sqlalchemy import event
+from werkzeug.datastructures import MultiDict
+from sqlalchemy.orm import Session
+
+from app.utils import invalidation_bus
+from app.utils.responses import json_fragment_response
+from app.utils.sync import sync_cursor
+
+
+class LookupCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._entries = OrderedDict()
+
+    def versions(self, tables):
+        return tuple(self._versions.get(t, 0) for t in tables)
+
+    def bump(self, *tables):
+        with self._lock:
+            for t in tables:
+                self._versions[t] = self._versions.get(t, 0) + 1
+
+    def invalidate(self, tables):
+        """Invalidation bus subscriber; None means everything."""
+        if tables is None:
+            self.bump_all()
+        else:
+            self.bump(*tables)
+
+    def bump_all(self):
+        """Invalidate everything (e.g. after missing change notifications)."""
+        with self._lock:
+            for t in list(self._versions):
+                self._versions[t] += 1
+            self._entries.clear()
+
+    def get(self, key, versions, ttl):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry_versions, stored_at, value = entry
+            if entry_versions != versions or time.monotonic() - stored_at > ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, versions, value, max_entries):
+        with self._lock:
+            self._entries[key] = (versions, time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+
+lookup_cache = LookupCache()
+
+
+def get_cached_fragment(builder, args):
+    """(serialized JSON of builder(args), sync meta), cached while the builder's tables are unchanged.
+
+    Delta requests (?since=) are always built fresh. The sync cursor is the time the
+    cached data was read, not the time it is served.
+    """
+    if not builder.supports_delta:
+        args = MultiDict([(k, v) for k, v in args.items(multi=True) if k != 'since'])
+    delta = 'since' in args
+    key = (builder.__name__, tuple(sorted(args.items(multi=True))))
+    versions = lookup_cache.versions(builder.cache_tables)
+    cached = None if delta else lookup_cache.get(key, versions, current_app.config.get('LOOKUP_CACHE_TTL', 300))
+    if cached is None:
+        # Versions and cursor are taken before querying, so a concurrent commit leaves this entry stale
+        cursor = sync_cursor()
+        fragment = current_app.json.dumps(builder(args), separators=(',', ':')).encode()
+        cached = (fragment, cursor)
+        if not delta:
+            lookup_cache.set(key, versions, cached, current_app.config.get('LOOKUP_CACHE_MAX_ENTRIES', 512))
+    fragment, cursor = cached
+    return fragment, {'sync_cursor': cursor, 'delta': delta}
+
+
+def cached_lookup(*tables, supports_delta=True):
+    """Cache a lookup view's data per filter args until one of `tables` is written.
+
+    The wrapped function takes the request args and returns the `data` list. Lookups
+    whose membership depends on more than their own table's updated_at pass
+    supports_delta=False; they ignore ?since= and always return the full list.
+    """
+    def decorator(f):
+        f.cache_tables = tables
+        f.supports_delta = supports_delta
+
+        @wraps(f)
+        def decorated():
+            fragment, meta = get_cached_fragment(f, request.args)
+            return json_fragment_response(fragment, meta=meta)
+        decorated.builder = f
+        return decorated
+    return decorator
+
+
+# ─── Table write tracking ───
+
+def mark_tables_changed(session, *tables):
+    """Record writes the session events cannot see (raw SQL text statements)."""
+    session.info.setdefault('changed_tables', set()).update(tables)
+
+
+def _after_flush(session, flush_context):
+    tables = {obj.__table__.name for obj in chain(session.new, session.dirty, session.deleted)}
+    if tables:
+        mark_tables_changed(session, *tables)
+
+
+def _do_orm_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            mark_tables_changed(orm_execute_state.session, table.name)
+
+
+def _before_commit(session):
+    if not (has_app_context() and current_app.config.get('CACHE_BUS_ENABLED')):
+        return
+    session.flush()  # so the commit's own flush is recorded before publishing
+    tables = session.info.get('changed_tables')
+    if tables:
+        invalidation_bus.publish(session, tables)
+
+
+def _after_commit(session):
+    # Rolled-back writes are left in the set; the next commit over-invalidates, which is harmless
+    tables = session.info.pop('changed_tables', None)
+    if tables:
+        lookup_cache.bump(*tables)
+
+
+def init_app(app):
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'do_orm_execute', _do_orm_execute)
+        event.listen(Session, 'before_commit', _before_commit)
+        event.listen(Session, 'after_commit', _after_commit)
+        invalidation_bus.subscribe(lookup_cache.invalidate)
+    invalidation_bus.init_app(app)
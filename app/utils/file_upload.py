@@ -1,7 +1,9 @@
 import os
+import unicodedata
+from urllib.parse import quote
 from uuid import uuid4
 from werkzeug.utils import secure_filename
-from flask import current_app, send_from_directory
+from flask import current_app, send_file, send_from_directory
 
 ALLOWED_EXTENSIONS = {'pdf', 'jpg', 'jpeg', 'png', 'xlsx', 'docx'}
 
@@ -12,6 +14,39 @@ def is_allowed_file(filename):
     ext = get_extension(filename)
     return ext in ALLOWED_EXTENSIONS
 
+def validate_upload(filename, size=None, max_size=None):
+    """Why a file may not be stored, or None if it may.
+
+    The extension must be in ALLOWED_EXTENSIONS, and no part of the name may be
+    in BLOCKED_EXTENSIONS (so report.php.pdf is refused too). A known size must
+    be non-zero and at most max_size (default MAX_FILE_SIZE).
+    """
+    parts = secure_filename(filename or '').lower().split('.')
+    blocked = current_app.config.get('BLOCKED_EXTENSIONS', set()).intersection(parts[1:])
+    if blocked:
+        return f'File type .{sorted(blocked)[0]} not allowed'
+    ext = parts[-1] if len(parts) > 1 else ''
+    if ext not in current_app.config.get('ALLOWED_EXTENSIONS', ALLOWED_EXTENSIONS):
+        return f'File type .{ext} not allowed'
+    max_size = max_size or current_app.config.get('MAX_FILE_SIZE')
+    if size is not None and size == 0:
+        return 'File is empty'
+    if size is not None and max_size and size > max_size:
+        return f'File is larger than {max_size // (1024 * 1024)}MB'
+    return None
+
+
+def upload_limit(config_key):
+    """Let a view take request bodies up to app.config[config_key] instead of MAX_CONTENT_LENGTH.
+
+    Apply it directly under @route (the Request class in app/__init__.py reads it).
+    """
+    def decorator(f):
+        f.max_content_length = config_key
+        return f
+    return decorator
+
+
 def save_file(file, module, record_id):
     storage = current_app.config.get('UPLOAD_STORAGE', 'local')
     original_name = secure_filename(file.filename)
@@ -25,15 +60,47 @@ def save_file(file, module, record_id):
         file.save(filepath)
         return f"/api/v1/files/{module}/{record_id}/{unique_name}", filepath
     else:
-        import boto3
-        s3 = boto3.client('s3', region_name=current_app.config.get('AWS_REGION'))
-        bucket = current_app.config.get('AWS_S3_BUCKET')
+        from app.services.storage import get_storage
+        s3 = get_storage('s3')  # process-wide client, reuses its connections
+        bucket = s3.bucket
         s3_key = f"{module}/{record_id}/{unique_name}"
         file.seek(0)
-        s3.upload_fileobj(file, bucket, s3_key)
+        s3.client.upload_fileobj(file, bucket, s3_key)
         return f"https://{bucket}.s3.amazonaws.com/{s3_key}", s3_key
 
 def serve_local_file(module, record_id, filename):
     upload_dir = current_app.config.get('UPLOAD_DIR', './uploads')
     directory = os.path.join(upload_dir, module, str(record_id))
     return send_from_directory(os.path.abspath(directory), filename, as_attachment=True)
+
+def _filename_params(name):
+    """Content-Disposition filename params, RFC 5987 encoded when not ASCII (as send_file does)."""
+    try:
+        name.encode('ascii')
+        return {'filename': name}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+        return {'filename': simple, 'filename*': f"UTF-8''{quote(name, safe='!#$&+-.^_`|~')}"}
+
+
+def send_stored_file(file_path, mimetype=None, download_name=None, etag=True, as_attachment=True):
+    """Send a file under UPLOAD_DIR, handing the transfer to the web server when configured.
+
+    With DOWNLOAD_ACCEL_PREFIX set, Nginx serves the bytes from an internal location
+    mapped to UPLOAD_DIR (X-Accel-Redirect) and answers Range / conditional headers
+    itself. Otherwise send_file() answers them (conditional=True) and uses the
+    server's sendfile / X-Sendfile (USE_X_SENDFILE) where available.
+    """
+    accel_prefix = current_app.config.get('DOWNLOAD_ACCEL_PREFIX')
+    upload_root = os.path.abspath(current_app.config.get('UPLOAD_DIR', './uploads'))
+    full_path = os.path.abspath(file_path)
+    if accel_prefix and os.path.commonpath([upload_root, full_path]) == upload_root:
+        response = current_app.response_class(mimetype=mimetype or 'application/octet-stream')
+        rel_path = os.path.relpath(full_path, upload_root).replace(os.sep, '/')
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{rel_path}"
+        if download_name:
+            response.headers.set('Content-Disposition', 'attachment' if as_attachment else 'inline',
+                                 **_filename_params(download_name))
+        return response
+    return send_file(full_path, mimetype=mimetype, as_attachment=as_attachment, download_name=download_name,
+                     conditional=True, etag=etag)
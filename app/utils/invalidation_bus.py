@@ -0,0 +1,96 @@
+"""Cross-worker cache invalidation over PostgreSQL LISTEN/NOTIFY.
+
+Writers publish the names of the tables they changed inside their own
+transaction, so PostgreSQL delivers the notification only if (and when) the
+transaction commits. Every worker process runs one listener thread on a
+dedicated connection and hands the table names to the subscribers.
+"""
+import logging
+import os
+import select
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'qc_invalidate'
+KEEPALIVE_SECONDS = 30
+RECONNECT_SECONDS = 5
+
+_subscribers = []
+_listener = {'pid': None}
+_listener_lock = threading.Lock()
+
+
+def subscribe(callback):
+    """callback(tables) gets a set of table names, or None when everything must be invalidated."""
+    _subscribers.append(callback)
+
+
+def publish(session, tables):
+    """Queue a notification in the session's current transaction."""
+    session.execute(text('SELECT pg_notify(:channel, :payload)'),
+                    {'channel': CHANNEL, 'payload': ','.join(sorted(tables))})
+
+
+def _dispatch(tables):
+    for callback in list(_subscribers):
+        try:
+            callback(tables)
+        except Exception:
+            logger.exception('Invalidation subscriber failed')
+
+
+def _listen(engine):
+    while True:
+        pg_conn = None
+        try:
+            conn = engine.raw_connection()
+            pg_conn = conn.driver_connection
+            conn.detach()  # long-lived; must not hold a pool slot
+            pg_conn.autocommit = True
+            cursor = pg_conn.cursor()
+            cursor.execute(f'LISTEN {CHANNEL}')
+            # Anything committed before LISTEN (or while disconnected) was missed
+            _dispatch(None)
+
+            while True:
+                if select.select([pg_conn], [], [], KEEPALIVE_SECONDS) == ([], [], []):
+                    cursor.execute('SELECT 1')  # surfaces dropped connections
+                    continue
+                pg_conn.poll()
+                tables = set()
+                while pg_conn.notifies:
+                    tables.update(pg_conn.notifies.pop(0).payload.split(','))
+                if tables:
+                    _dispatch(tables)
+        except Exception as e:
+            logger.warning(f'Invalidation listener disconnected: {e}')
+            if pg_conn is not None:
+                try:
+                    pg_conn.close()
+                except Exception:
+                    pass
+            time.sleep(RECONNECT_SECONDS)
+
+
+def _ensure_listener():
+    # Started lazily so each forked worker gets its own thread
+    if _listener['pid'] == os.getpid():
+        return
+    with _listener_lock:
+        if _listener['pid'] == os.getpid():
+            return
+        thread = threading.Thread(target=_listen, args=(db.engine,),
+                                  name='qc-invalidation-listener', daemon=True)
+        thread.start()
+        _listener['pid'] = os.getpid()
+
+
+def init_app(app):
+    if app.config.get('CACHE_BUS_ENABLED'):
+        app.before_request(_ensure_listener)
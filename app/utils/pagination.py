@@ -1,4 +1,9 @@
-from flask import request, current_app
+import base64
+import json
+from datetime import datetime
+
+from flask import abort, request, current_app
+from sqlalchemy import and_, or_, tuple_
 
 
 def get_pagination_params():
@@ -43,3 +48,85 @@ def get_sort_params(allowed_columns, default_sort='created_at', default_order='d
         sort_order = default_order
 
     return sort_by, sort_order
+
+
+def use_keyset_pagination():
+    """Cursor mode is opt-in: any ?cursor= (empty for the first page) selects it."""
+    return 'cursor' in request.args
+
+
+def _encode_cursor(sort_by, value, row_id, direction):
+    if isinstance(value, datetime):
+        value = {'dt': value.isoformat()}
+    raw = json.dumps({'s': sort_by, 'v': value, 'id': row_id, 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor, sort_by):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        value = data['v']
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value['dt'])
+        row_id, direction = int(data['id']), data['d']
+    except (ValueError, TypeError, KeyError):
+        abort(400, description='Invalid pagination cursor')
+    if data.get('s') != sort_by or direction not in ('next', 'prev'):
+        abort(400, description='Pagination cursor does not match the current sort')
+    return value, row_id, direction
+
+
+def _seek(col, id_col, value, row_id, upward):
+    """Rows past (value, row_id) towards larger (upward) or smaller keys.
+
+    NULL sorts as the largest value, matching PostgreSQL's default ASC NULLS LAST /
+    DESC NULLS FIRST, so both directions can scan a plain (col, id) index.
+    """
+    if upward:
+        if value is None:
+            return and_(col.is_(None), id_col > row_id)
+        return or_(tuple_(col, id_col) > tuple_(value, row_id), col.is_(None))
+    if value is None:
+        return or_(col.isnot(None), id_col < row_id)
+    return tuple_(col, id_col) < tuple_(value, row_id)
+
+
+def paginate_keyset(query, sort_by, sort_col, sort_order, id_col, per_page):
+    """Keyset pagination on (sort_col, id): no OFFSET and no COUNT(*).
+
+    Cursors are opaque base64url tokens returned as next_cursor / prev_cursor in meta.
+    """
+    cursor = request.args.get('cursor')
+    ascending = sort_order == 'asc'
+    backwards = False
+    if cursor:
+        value, row_id, direction = _decode_cursor(cursor, sort_by)
+        backwards = direction == 'prev'
+        query = query.filter(_seek(sort_col, id_col, value, row_id, upward=ascending != backwards))
+
+    # Walking backwards scans the reversed order and flips the page afterwards
+    if ascending != backwards:
+        order = (sort_col.asc(), id_col.asc())
+    else:
+        order = (sort_col.desc(), id_col.desc())
+    items = query.order_by(None).order_by(*order).limit(per_page + 1).all()
+
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if backwards:
+        items.reverse()
+        has_next, has_prev = bool(items), has_more
+    else:
+        has_next, has_prev = has_more, bool(cursor)
+
+    def token(row, direction):
+        return _encode_cursor(sort_by, getattr(row, sort_col.key), row.id, direction)
+
+    meta = {
+        'per_page': per_page,
+        'has_next': has_next,
+        'has_prev': has_prev,
+        'next_cursor': token(items[-1], 'next') if has_next and items else None,
+        'prev_cursor': token(items[0], 'prev') if has_prev and items else None,
+    }
+    return items, meta
@@ -1,4 +1,4 @@
-from flask import jsonify
+from flask import current_app, jsonify
 
 
 def success_response(data=None, message='Success', status_code=200, meta=None):
@@ -14,6 +14,16 @@ def success_response(data=None, message='Success', status_code=200, meta=None):
     return jsonify(response), status_code
 
 
+def json_fragment_response(data_json, message='Success', status_code=200, meta=None):
+    """Success response around an already-serialized `data` payload (bytes)."""
+    dumps = current_app.json.dumps
+    parts = [b'{"data":', data_json, b',"message":', dumps(message).encode()]
+    if meta is not None:
+        parts += [b',"meta":', dumps(meta).encode()]
+    parts.append(b',"success":true}\n')
+    return current_app.response_class(b''.join(parts), status=status_code, mimetype=current_app.json.mimetype)
+
+
 def error_response(message='An error occurred', status_code=400, errors=None):
     """Standard error response."""
     return jsonify({
@@ -0,0 +1,53 @@
+"""Delta sync for master lists: ?since=<cursor> returns only rows changed after it.
+
+The cursor is an ISO-8601 UTC timestamp taken before the rows were read. Rows are
+matched with a safety overlap (SYNC_OVERLAP_SECONDS) so writes whose transaction
+started before the cursor but committed after the read are not missed; clients
+upsert by id, so repeated rows are harmless. Deactivated rows are returned with
+is_active = false.
+"""
+from datetime import datetime, timedelta, timezone
+
+from flask import abort, current_app, request
+
+
+def sync_cursor():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def get_since(args=None):
+    """Parsed ?since= cursor, or None. Aborts with 400 on a malformed value."""
+    value = (request.args if args is None else args).get('since')
+    if not value:
+        return None
+    try:
+        since = datetime.fromisoformat(value.replace(' ', '+').replace('Z', '+00:00'))
+    except ValueError:
+        abort(400, description='Invalid since cursor; expected an ISO-8601 timestamp')
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return since - timedelta(seconds=current_app.config.get('SYNC_OVERLAP_SECONDS', 120))
+
+
+def apply_since(query, model, args=None):
+    """Restrict a list query to rows changed since ?since=. Returns (query, sync meta)."""
+    meta = {'sync_cursor': sync_cursor()}
+    since = get_since(args)
+    meta['delta'] = since is not None
+    if since is not None:
+        query = query.filter(model.updated_at > since)
+    return query, meta
+
+
+def lookup_rows(query, args):
+    """(row, in_list) pairs for a lookup query.
+
+    With ?since= only changed rows are returned, regardless of the lookup's filters;
+    in_list is False for rows that dropped out (deactivated or no longer matching).
+    """
+    since = get_since(args)
+    if since is None:
+        return [(row, True) for row in query]
+    model = query.column_descriptions[0]['entity']
+    in_list = model.id.in_(query.with_entities(model.id).order_by(None))
+    return model.query.filter(model.updated_at > since).add_columns(in_list).order_by(model.id).all()
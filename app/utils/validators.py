@@ -1,6 +1,9 @@
 import re
 import bleach
 
+# Characters bleach.clean() may rewrite; strings without any come back unchanged
+_NEEDS_CLEANING = re.compile('[<>&\x00-\x1f\x7f-\x9f\ufdd0-\ufdef\ufffe\uffff]')
+
 
 def sanitize_string(value):
     """Strip HTML tags and trim whitespace from string inputs."""
@@ -8,6 +11,8 @@ def sanitize_string(value):
         return None
     if not isinstance(value, str):
         return value
+    if not _NEEDS_CLEANING.search(value):
+        return value.strip()
     cleaned = bleach.clean(str(value), tags=[], strip=True)
     return cleaned.strip()
 
@@ -0,0 +1,12 @@
+-- ================================================================================
+-- MIGRATION 001: Component counts per product group
+-- ================================================================================
+-- GET /categories and /categories/<id>/groups aggregate live component counts per
+-- group in a single statement. product_group_id had no index on the master table.
+-- ================================================================================
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_cm_group ON qc_component_master(product_group_id) WHERE is_deleted = FALSE;
+
+COMMIT;
@@ -0,0 +1,152 @@
+-- ================================================================================
+-- MIGRATION 002: Maintained reference-usage counters for master tables
+-- ================================================================================
+-- Serializers and delete guards read how many rows reference a master record
+-- (components per vendor / plan / sampling plan, checking params per unit, ...).
+-- These counts are kept in qc_usage_counters by row-level triggers on the
+-- referencing tables, so reads are a primary-key lookup instead of a COUNT(*).
+--
+--   ref_table               usage_type           source
+--   qc_product_categories   components           qc_component_master.category_id
+--   qc_product_groups       components           qc_component_master.product_group_id
+--   qc_plans                components           qc_component_master.qc_plan_id
+--   qc_sampling_plans       components           qc_component_master.default_sampling_plan_id
+--   qc_vendors              primary_components   qc_component_master.primary_vendor_id
+--   qc_units                checking_params      qc_component_checking_params.unit_id
+--   qc_instruments          checking_params      qc_component_checking_params.instrument_id
+--   qc_units                plan_parameters      qc_plan_parameters.unit_id
+--   qc_sampling_plans       plan_stages          qc_plan_stages.sampling_plan_id
+--
+-- Component counts only include rows with is_deleted = FALSE.
+-- ================================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS qc_usage_counters (
+    ref_table VARCHAR(100) NOT NULL,
+    ref_id INTEGER NOT NULL,
+    usage_type VARCHAR(50) NOT NULL,
+    usage_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (ref_table, ref_id, usage_type)
+);
+
+-- Move one unit of usage from (old_id, old_live) to (new_id, new_live)
+CREATE OR REPLACE FUNCTION fn_move_usage(p_table VARCHAR, p_type VARCHAR,
+                                         p_old_id INTEGER, p_old_live BOOLEAN,
+                                         p_new_id INTEGER, p_new_live BOOLEAN)
+RETURNS VOID AS $$
+BEGIN
+    IF p_old_live AND p_new_live AND p_old_id IS NOT DISTINCT FROM p_new_id THEN
+        RETURN;
+    END IF;
+    IF p_old_live AND p_old_id IS NOT NULL THEN
+        UPDATE qc_usage_counters SET usage_count = usage_count - 1, updated_at = CURRENT_TIMESTAMP
+        WHERE ref_table = p_table AND ref_id = p_old_id AND usage_type = p_type;
+    END IF;
+    IF p_new_live AND p_new_id IS NOT NULL THEN
+        INSERT INTO qc_usage_counters (ref_table, ref_id, usage_type, usage_count)
+        VALUES (p_table, p_new_id, p_type, 1)
+        ON CONFLICT (ref_table, ref_id, usage_type)
+        DO UPDATE SET usage_count = qc_usage_counters.usage_count + 1, updated_at = CURRENT_TIMESTAMP;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_cm_usage_counters()
+RETURNS TRIGGER AS $$
+DECLARE old_live BOOLEAN := FALSE; new_live BOOLEAN := FALSE;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN old_live := NOT COALESCE(OLD.is_deleted, FALSE); END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN new_live := NOT COALESCE(NEW.is_deleted, FALSE); END IF;
+    IF TG_OP = 'INSERT' THEN OLD := NEW; END IF;
+    IF TG_OP = 'DELETE' THEN NEW := OLD; END IF;
+    PERFORM fn_move_usage('qc_product_categories', 'components', OLD.category_id, old_live, NEW.category_id, new_live);
+    PERFORM fn_move_usage('qc_product_groups', 'components', OLD.product_group_id, old_live, NEW.product_group_id, new_live);
+    PERFORM fn_move_usage('qc_plans', 'components', OLD.qc_plan_id, old_live, NEW.qc_plan_id, new_live);
+    PERFORM fn_move_usage('qc_sampling_plans', 'components', OLD.default_sampling_plan_id, old_live, NEW.default_sampling_plan_id, new_live);
+    PERFORM fn_move_usage('qc_vendors', 'primary_components', OLD.primary_vendor_id, old_live, NEW.primary_vendor_id, new_live);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_ccp_usage_counters()
+RETURNS TRIGGER AS $$
+DECLARE old_live BOOLEAN := TG_OP IN ('UPDATE', 'DELETE'); new_live BOOLEAN := TG_OP IN ('INSERT', 'UPDATE');
+BEGIN
+    IF TG_OP = 'INSERT' THEN OLD := NEW; END IF;
+    IF TG_OP = 'DELETE' THEN NEW := OLD; END IF;
+    PERFORM fn_move_usage('qc_units', 'checking_params', OLD.unit_id, old_live, NEW.unit_id, new_live);
+    PERFORM fn_move_usage('qc_instruments', 'checking_params', OLD.instrument_id, old_live, NEW.instrument_id, new_live);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_qpp_usage_counters()
+RETURNS TRIGGER AS $$
+DECLARE old_live BOOLEAN := TG_OP IN ('UPDATE', 'DELETE'); new_live BOOLEAN := TG_OP IN ('INSERT', 'UPDATE');
+BEGIN
+    IF TG_OP = 'INSERT' THEN OLD := NEW; END IF;
+    IF TG_OP = 'DELETE' THEN NEW := OLD; END IF;
+    PERFORM fn_move_usage('qc_units', 'plan_parameters', OLD.unit_id, old_live, NEW.unit_id, new_live);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_qps_usage_counters()
+RETURNS TRIGGER AS $$
+DECLARE old_live BOOLEAN := TG_OP IN ('UPDATE', 'DELETE'); new_live BOOLEAN := TG_OP IN ('INSERT', 'UPDATE');
+BEGIN
+    IF TG_OP = 'INSERT' THEN OLD := NEW; END IF;
+    IF TG_OP = 'DELETE' THEN NEW := OLD; END IF;
+    PERFORM fn_move_usage('qc_sampling_plans', 'plan_stages', OLD.sampling_plan_id, old_live, NEW.sampling_plan_id, new_live);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_cm_usage ON qc_component_master;
+CREATE TRIGGER trg_cm_usage AFTER INSERT OR DELETE OR UPDATE OF
+    category_id, product_group_id, qc_plan_id, default_sampling_plan_id, primary_vendor_id, is_deleted
+    ON qc_component_master FOR EACH ROW EXECUTE FUNCTION fn_cm_usage_counters();
+DROP TRIGGER IF EXISTS trg_ccp_usage ON qc_component_checking_params;
+CREATE TRIGGER trg_ccp_usage AFTER INSERT OR DELETE OR UPDATE OF unit_id, instrument_id
+    ON qc_component_checking_params FOR EACH ROW EXECUTE FUNCTION fn_ccp_usage_counters();
+DROP TRIGGER IF EXISTS trg_qpp_usage ON qc_plan_parameters;
+CREATE TRIGGER trg_qpp_usage AFTER INSERT OR DELETE OR UPDATE OF unit_id
+    ON qc_plan_parameters FOR EACH ROW EXECUTE FUNCTION fn_qpp_usage_counters();
+DROP TRIGGER IF EXISTS trg_qps_usage ON qc_plan_stages;
+CREATE TRIGGER trg_qps_usage AFTER INSERT OR DELETE OR UPDATE OF sampling_plan_id
+    ON qc_plan_stages FOR EACH ROW EXECUTE FUNCTION fn_qps_usage_counters();
+
+-- Backfill from current data (safe to re-run)
+LOCK TABLE qc_component_master, qc_component_checking_params, qc_plan_parameters, qc_plan_stages IN SHARE MODE;
+DELETE FROM qc_usage_counters;
+INSERT INTO qc_usage_counters (ref_table, ref_id, usage_type, usage_count)
+SELECT 'qc_product_categories', category_id, 'components', COUNT(*) FROM qc_component_master
+    WHERE is_deleted = FALSE AND category_id IS NOT NULL GROUP BY category_id
+UNION ALL
+SELECT 'qc_product_groups', product_group_id, 'components', COUNT(*) FROM qc_component_master
+    WHERE is_deleted = FALSE AND product_group_id IS NOT NULL GROUP BY product_group_id
+UNION ALL
+SELECT 'qc_plans', qc_plan_id, 'components', COUNT(*) FROM qc_component_master
+    WHERE is_deleted = FALSE AND qc_plan_id IS NOT NULL GROUP BY qc_plan_id
+UNION ALL
+SELECT 'qc_sampling_plans', default_sampling_plan_id, 'components', COUNT(*) FROM qc_component_master
+    WHERE is_deleted = FALSE AND default_sampling_plan_id IS NOT NULL GROUP BY default_sampling_plan_id
+UNION ALL
+SELECT 'qc_vendors', primary_vendor_id, 'primary_components', COUNT(*) FROM qc_component_master
+    WHERE is_deleted = FALSE AND primary_vendor_id IS NOT NULL GROUP BY primary_vendor_id
+UNION ALL
+SELECT 'qc_units', unit_id, 'checking_params', COUNT(*) FROM qc_component_checking_params
+    WHERE unit_id IS NOT NULL GROUP BY unit_id
+UNION ALL
+SELECT 'qc_instruments', instrument_id, 'checking_params', COUNT(*) FROM qc_component_checking_params
+    WHERE instrument_id IS NOT NULL GROUP BY instrument_id
+UNION ALL
+SELECT 'qc_units', unit_id, 'plan_parameters', COUNT(*) FROM qc_plan_parameters
+    WHERE unit_id IS NOT NULL GROUP BY unit_id
+UNION ALL
+SELECT 'qc_sampling_plans', sampling_plan_id, 'plan_stages', COUNT(*) FROM qc_plan_stages
+    WHERE sampling_plan_id IS NOT NULL GROUP BY sampling_plan_id;
+
+COMMIT;
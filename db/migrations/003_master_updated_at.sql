@@ -0,0 +1,61 @@
+-- ================================================================================
+-- MIGRATION 003: Reliable updated_at on master tables (delta sync)
+-- ================================================================================
+-- Lookup and master list endpoints accept ?since=<cursor> and return only rows
+-- whose updated_at is newer. Every master table therefore needs an updated_at
+-- column maintained by fn_update_timestamp(); previously only qc_vendors and
+-- qc_departments had the trigger, and several tables had no column at all.
+--
+-- Sampling plan details and QC plan stages are edited by replacing the child
+-- rows, so changes to them also touch the parent plan's updated_at.
+-- ================================================================================
+
+BEGIN;
+
+ALTER TABLE qc_units             ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE qc_defect_types      ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE qc_rejection_reasons ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE qc_locations         ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE qc_roles             ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'qc_product_categories', 'qc_product_groups', 'qc_units', 'qc_instruments',
+        'qc_defect_types', 'qc_rejection_reasons', 'qc_locations', 'qc_sampling_plans',
+        'qc_plans', 'qc_roles', 'qc_users'
+    ] LOOP
+        EXECUTE format('UPDATE %I SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_ts ON %I', t, t);
+        EXECUTE format('CREATE TRIGGER trg_%s_ts BEFORE UPDATE ON %I FOR EACH ROW EXECUTE FUNCTION fn_update_timestamp()', t, t);
+    END LOOP;
+END $$;
+
+-- Touch the parent row when child rows change. TG_ARGV: parent table, FK column.
+CREATE OR REPLACE FUNCTION fn_touch_parent()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_parent_id INTEGER;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        v_parent_id := (to_jsonb(OLD) ->> TG_ARGV[1])::INTEGER;
+    ELSE
+        v_parent_id := (to_jsonb(NEW) ->> TG_ARGV[1])::INTEGER;
+    END IF;
+    EXECUTE format('UPDATE %I SET updated_at = CURRENT_TIMESTAMP WHERE id = $1 AND updated_at < CURRENT_TIMESTAMP', TG_ARGV[0])
+        USING v_parent_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_spd_touch ON qc_sampling_plan_details;
+CREATE TRIGGER trg_spd_touch AFTER INSERT OR UPDATE OR DELETE ON qc_sampling_plan_details
+    FOR EACH ROW EXECUTE FUNCTION fn_touch_parent('qc_sampling_plans', 'sampling_plan_id');
+
+DROP TRIGGER IF EXISTS trg_qps_touch ON qc_plan_stages;
+CREATE TRIGGER trg_qps_touch AFTER INSERT OR UPDATE OR DELETE ON qc_plan_stages
+    FOR EACH ROW EXECUTE FUNCTION fn_touch_parent('qc_plans', 'qc_plan_id');
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- ================================================================================
+-- MIGRATION 004: Keyset pagination indexes for the component master
+-- ================================================================================
+-- GET /components?cursor= seeks on (sort column, id) instead of OFFSET/COUNT.
+-- part_code and component_code are unique and already indexed; the remaining
+-- sortable columns get a composite index matching the seek order.
+-- ================================================================================
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_cm_created_id ON qc_component_master(created_at, id) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_cm_updated_id ON qc_component_master(updated_at, id) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_cm_part_name_id ON qc_component_master(part_name, id) WHERE is_deleted = FALSE;
+
+COMMIT;
@@ -0,0 +1,30 @@
+-- ================================================================================
+-- MIGRATION 005: Trigram indexes for substring search
+-- ================================================================================
+-- List ?search= filters and GET /search use ILIKE '%term%' over these columns and
+-- rank with similarity(). pg_trgm GIN indexes serve both without sequential scans.
+-- pg_trgm ships with PostgreSQL contrib and is available on RDS.
+-- ================================================================================
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_cm_part_code_trgm      ON qc_component_master USING gin (part_code gin_trgm_ops) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_cm_part_name_trgm      ON qc_component_master USING gin (part_name gin_trgm_ops) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_cm_component_code_trgm ON qc_component_master USING gin (component_code gin_trgm_ops) WHERE is_deleted = FALSE;
+
+CREATE INDEX IF NOT EXISTS idx_vnd_code_trgm ON qc_vendors USING gin (vendor_code gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_vnd_name_trgm ON qc_vendors USING gin (vendor_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_vnd_city_trgm ON qc_vendors USING gin (city gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_inst_code_trgm ON qc_instruments USING gin (instrument_code gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_inst_name_trgm ON qc_instruments USING gin (instrument_name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_sp_code_trgm ON qc_sampling_plans USING gin (plan_code gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_sp_name_trgm ON qc_sampling_plans USING gin (plan_name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_qp_code_trgm ON qc_plans USING gin (plan_code gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_qp_name_trgm ON qc_plans USING gin (plan_name gin_trgm_ops);
+
+COMMIT;
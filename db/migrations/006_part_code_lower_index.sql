@@ -0,0 +1,12 @@
+-- ================================================================================
+-- MIGRATION 006: Case-insensitive part-code lookups
+-- ================================================================================
+-- Part-code availability checks compare lower(part_code) among live components.
+-- The plain idx_cm_part_code index cannot serve that expression.
+-- ================================================================================
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_cm_part_code_lower ON qc_component_master(lower(part_code)) WHERE is_deleted = FALSE;
+
+COMMIT;
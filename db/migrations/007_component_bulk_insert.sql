@@ -0,0 +1,91 @@
+-- ================================================================================
+-- MIGRATION 007: Component triggers fit for bulk imports
+-- ================================================================================
+-- POST /components/import inserts components and checking params hundreds of rows
+-- per statement. Two triggers did not hold up:
+--
+-- fn_generate_component_code()
+--   * LPAD(n, 3) truncates, so the 1000th component got COMP-100 (a duplicate).
+--   * Every insert cast SUBSTRING(component_code FROM 6) of every row, i.e. a
+--     sequential scan per row, and failed outright on codes not shaped COMP-<n>.
+--   The number is now read from an expression index over COMP-<n> codes only,
+--   so MAX() is a single index probe and foreign codes are ignored.
+--
+-- Usage counters (migration 002)
+--   The row-level triggers bumped the same counter row once per inserted row.
+--   Inserts are now counted once per statement from the transition table;
+--   updates and deletes keep the row-level triggers.
+-- ================================================================================
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_cm_component_code_num ON qc_component_master (
+    (CASE WHEN component_code ~ '^COMP-[0-9]{1,9}$' THEN SUBSTRING(component_code FROM 6)::INTEGER END)
+);
+
+CREATE OR REPLACE FUNCTION fn_generate_component_code()
+RETURNS TRIGGER AS $$
+DECLARE num INTEGER;
+BEGIN
+    SELECT COALESCE(MAX(CASE WHEN component_code ~ '^COMP-[0-9]{1,9}$' THEN SUBSTRING(component_code FROM 6)::INTEGER END), 0) + 1
+    INTO num FROM qc_component_master;
+    NEW.component_code := 'COMP-' || LPAD(num::TEXT, GREATEST(3, LENGTH(num::TEXT)), '0');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_cm_usage_counters_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO qc_usage_counters (ref_table, ref_id, usage_type, usage_count)
+    SELECT u.ref_table, u.ref_id, u.usage_type, COUNT(*)
+    FROM new_rows n
+    CROSS JOIN LATERAL (VALUES
+        ('qc_product_categories', n.category_id, 'components'),
+        ('qc_product_groups', n.product_group_id, 'components'),
+        ('qc_plans', n.qc_plan_id, 'components'),
+        ('qc_sampling_plans', n.default_sampling_plan_id, 'components'),
+        ('qc_vendors', n.primary_vendor_id, 'primary_components')
+    ) AS u(ref_table, ref_id, usage_type)
+    WHERE NOT COALESCE(n.is_deleted, FALSE) AND u.ref_id IS NOT NULL
+    GROUP BY u.ref_table, u.ref_id, u.usage_type
+    ON CONFLICT (ref_table, ref_id, usage_type)
+    DO UPDATE SET usage_count = qc_usage_counters.usage_count + EXCLUDED.usage_count, updated_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_ccp_usage_counters_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO qc_usage_counters (ref_table, ref_id, usage_type, usage_count)
+    SELECT u.ref_table, u.ref_id, 'checking_params', COUNT(*)
+    FROM new_rows n
+    CROSS JOIN LATERAL (VALUES
+        ('qc_units', n.unit_id),
+        ('qc_instruments', n.instrument_id)
+    ) AS u(ref_table, ref_id)
+    WHERE u.ref_id IS NOT NULL
+    GROUP BY u.ref_table, u.ref_id
+    ON CONFLICT (ref_table, ref_id, usage_type)
+    DO UPDATE SET usage_count = qc_usage_counters.usage_count + EXCLUDED.usage_count, updated_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_cm_usage ON qc_component_master;
+CREATE TRIGGER trg_cm_usage AFTER DELETE OR UPDATE OF
+    category_id, product_group_id, qc_plan_id, default_sampling_plan_id, primary_vendor_id, is_deleted
+    ON qc_component_master FOR EACH ROW EXECUTE FUNCTION fn_cm_usage_counters();
+DROP TRIGGER IF EXISTS trg_cm_usage_insert ON qc_component_master;
+CREATE TRIGGER trg_cm_usage_insert AFTER INSERT ON qc_component_master
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION fn_cm_usage_counters_insert();
+
+DROP TRIGGER IF EXISTS trg_ccp_usage ON qc_component_checking_params;
+CREATE TRIGGER trg_ccp_usage AFTER DELETE OR UPDATE OF unit_id, instrument_id
+    ON qc_component_checking_params FOR EACH ROW EXECUTE FUNCTION fn_ccp_usage_counters();
+DROP TRIGGER IF EXISTS trg_ccp_usage_insert ON qc_component_checking_params;
+CREATE TRIGGER trg_ccp_usage_insert AFTER INSERT ON qc_component_checking_params
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION fn_ccp_usage_counters_insert();
+
+COMMIT;
@@ -0,0 +1,40 @@
+-- ================================================================================
+-- MIGRATION 008: Background jobs (async exports)
+-- ================================================================================
+-- Long exports run in a per-worker thread pool instead of inside the request.
+-- A job row tracks status and progress; the built file lives under
+-- UPLOAD_DIR/exports until expires_at.
+--
+-- params_hash identifies identical requests (job type + parameters). The partial
+-- unique index allows only one queued/running job per hash, so a duplicate
+-- request attaches to the job already in flight instead of starting a new build.
+-- ================================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS qc_background_jobs (
+    id VARCHAR(32) PRIMARY KEY,
+    job_type VARCHAR(50) NOT NULL,
+    params JSONB NOT NULL DEFAULT '{}',
+    params_hash VARCHAR(64) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',   -- queued, running, completed, failed, expired
+    progress INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    file_path VARCHAR(500),
+    file_name VARCHAR(300),
+    mime_type VARCHAR(100),
+    file_size BIGINT,
+    error TEXT,
+    created_by VARCHAR(100),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    expires_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_bj_active_hash ON qc_background_jobs(job_type, params_hash)
+    WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_bj_expires ON qc_background_jobs(expires_at) WHERE status = 'completed';
+
+COMMIT;
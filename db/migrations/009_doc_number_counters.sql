@@ -0,0 +1,158 @@
+-- ================================================================================
+-- MIGRATION 009: Document numbers from counters instead of MAX() + 1
+-- ================================================================================
+-- The numbering triggers (GE-, GRN-, QC-, IR-, VR-, ST-, IRP-, COMP-) read
+-- MAX(number) + 1 from their table on every insert. That scans the year's rows,
+-- and two transactions inserting at the same time read the same MAX and the
+-- second one fails on the UNIQUE constraint.
+--
+-- Numbers now come from qc_doc_number_counters: one row per prefix and period
+-- (the year, or '' for COMP- which never resets). fn_allocate_doc_numbers() bumps
+-- the row with a single upsert, so an insert costs one index lookup. The row lock
+-- is held until commit: concurrent inserts of the same series queue behind it
+-- and get consecutive numbers, and a rolled-back insert gives its number back.
+-- Bulk writers take a block of numbers in one call
+-- (app.services.doc_number_service.allocate_numbers).
+--
+-- Superseded by migration 012: holding the row lock until commit made every
+-- insert of a series wait for a bulk import or clone to finish, so numbers now
+-- come from sequences and the series is no longer gapless.
+--
+-- Counters are seeded from the highest existing number of each series. The
+-- COMP- expression index from migration 007 was only there for MAX() and is dropped.
+-- ================================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS qc_doc_number_counters (
+    prefix VARCHAR(10) NOT NULL,
+    period VARCHAR(4) NOT NULL DEFAULT '',   -- YYYY for yearly series, '' for continuous ones
+    last_value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (prefix, period)
+);
+
+-- Reserve p_count numbers; returns the last one (the block is last - p_count + 1 .. last)
+CREATE OR REPLACE FUNCTION fn_allocate_doc_numbers(p_prefix VARCHAR, p_period VARCHAR, p_count INTEGER DEFAULT 1)
+RETURNS BIGINT AS $$
+    INSERT INTO qc_doc_number_counters (prefix, period, last_value) VALUES (p_prefix, p_period, p_count)
+    ON CONFLICT (prefix, period) DO UPDATE
+        SET last_value = qc_doc_number_counters.last_value + EXCLUDED.last_value, updated_at = CURRENT_TIMESTAMP
+    RETURNING last_value;
+$$ LANGUAGE sql;
+
+-- Next formatted number: PREFIX-PERIOD-00001, or PREFIX-001 without a period
+CREATE OR REPLACE FUNCTION fn_next_doc_number(p_prefix VARCHAR, p_period VARCHAR, p_width INTEGER DEFAULT 5)
+RETURNS VARCHAR AS $$
+DECLARE num TEXT;
+BEGIN
+    num := fn_allocate_doc_numbers(p_prefix, p_period)::TEXT;
+    RETURN p_prefix || '-' || CASE WHEN p_period = '' THEN '' ELSE p_period || '-' END
+        || LPAD(num, GREATEST(p_width, LENGTH(num)), '0');
+END;
+$$ LANGUAGE plpgsql;
+
+-- Seed from existing numbers; the table locks keep inserts out until the new triggers are in place
+LOCK TABLE qc_gate_entries, qc_grn, qc_inspection_queue, qc_inspection_results, qc_vendor_returns,
+    qc_store_transfers, qc_inspection_reports, qc_component_master IN SHARE ROW EXCLUSIVE MODE;
+
+DO $$
+DECLARE s RECORD;
+BEGIN
+    FOR s IN SELECT * FROM (VALUES
+        ('GE',   'qc_gate_entries',       'gate_entry_number'),
+        ('GRN',  'qc_grn',                'grn_number'),
+        ('QC',   'qc_inspection_queue',   'queue_number'),
+        ('IR',   'qc_inspection_results', 'result_number'),
+        ('VR',   'qc_vendor_returns',     'return_number'),
+        ('ST',   'qc_store_transfers',    'transfer_number'),
+        ('IRP',  'qc_inspection_reports', 'ir_number')
+    ) AS t(prefix, tbl, col)
+    LOOP
+        EXECUTE format(
+            'INSERT INTO qc_doc_number_counters (prefix, period, last_value)
+             SELECT %L, SUBSTRING(%2$I FROM %3$L), MAX(SUBSTRING(%2$I FROM %4$L)::BIGINT)
+             FROM %5$I WHERE %2$I ~ %6$L GROUP BY 2
+             ON CONFLICT (prefix, period) DO UPDATE
+                 SET last_value = GREATEST(qc_doc_number_counters.last_value, EXCLUDED.last_value)',
+            s.prefix, s.col,
+            '^' || s.prefix || '-([0-9]{4})-[0-9]{1,18}$',
+            '^' || s.prefix || '-[0-9]{4}-([0-9]{1,18})$',
+            s.tbl,
+            '^' || s.prefix || '-[0-9]{4}-[0-9]{1,18}$');
+    END LOOP;
+END $$;
+
+INSERT INTO qc_doc_number_counters (prefix, period, last_value)
+SELECT 'COMP', '', MAX(SUBSTRING(component_code FROM '^COMP-([0-9]{1,18})$')::BIGINT)
+FROM qc_component_master WHERE component_code ~ '^COMP-[0-9]{1,18}$'
+ON CONFLICT (prefix, period) DO UPDATE
+    SET last_value = GREATEST(qc_doc_number_counters.last_value, EXCLUDED.last_value);
+
+CREATE OR REPLACE FUNCTION fn_generate_gate_entry_number()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.gate_entry_number := fn_next_doc_number('GE', TO_CHAR(CURRENT_DATE, 'YYYY'));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_generate_component_code()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.component_code := fn_next_doc_number('COMP', '', 3);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_generate_grn_number()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.grn_number := fn_next_doc_number('GRN', TO_CHAR(CURRENT_DATE, 'YYYY'));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_generate_queue_number()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.queue_number := fn_next_doc_number('QC', TO_CHAR(CURRENT_DATE, 'YYYY'));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_generate_result_number()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.result_number := fn_next_doc_number('IR', TO_CHAR(CURRENT_DATE, 'YYYY'));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_generate_return_number()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.return_number := fn_next_doc_number('VR', TO_CHAR(CURRENT_DATE, 'YYYY'));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_generate_transfer_number()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.transfer_number := fn_next_doc_number('ST', TO_CHAR(CURRENT_DATE, 'YYYY'));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_generate_ir_number()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.ir_number := fn_next_doc_number('IRP', TO_CHAR(CURRENT_DATE, 'YYYY'));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP INDEX IF EXISTS idx_cm_component_code_num;
+
+COMMIT;
@@ -0,0 +1,58 @@
+-- ================================================================================
+-- MIGRATION 010: Content-addressed storage for uploaded documents
+-- ================================================================================
+-- The same drawing or certificate is uploaded against many components. Each
+-- upload used to be written under its own UUID name. File content is now stored
+-- once per SHA-256 digest (UPLOAD_DIR/blobs/ab/cd/<digest>) in qc_file_blobs, and
+-- qc_component_documents.content_hash points at it.
+--
+-- ref_count is kept by a trigger on qc_component_documents, so it stays right
+-- however a document row goes away (DELETE /components/documents/<id>, or the
+-- cascade from a component). released_at records when the count last reached 0.
+-- A blob is removed only while its row is locked with ref_count = 0; see
+-- app/services/blob_store.py.
+--
+-- Documents uploaded before this migration keep content_hash NULL and their
+-- own file_path.
+-- ================================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS qc_file_blobs (
+    digest CHAR(64) PRIMARY KEY,              -- SHA-256, hex
+    file_path VARCHAR(500) NOT NULL,
+    file_size BIGINT NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    released_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_fb_unreferenced ON qc_file_blobs(released_at) WHERE ref_count = 0;
+
+ALTER TABLE qc_component_documents
+    ADD COLUMN IF NOT EXISTS content_hash CHAR(64) REFERENCES qc_file_blobs(digest);
+
+CREATE INDEX IF NOT EXISTS idx_cd_content_hash ON qc_component_documents(content_hash);
+
+CREATE OR REPLACE FUNCTION fn_file_blob_refs()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.content_hash IS NOT NULL THEN
+        UPDATE qc_file_blobs
+        SET ref_count = ref_count - 1,
+            released_at = CASE WHEN ref_count = 1 THEN CURRENT_TIMESTAMP ELSE released_at END
+        WHERE digest = OLD.content_hash;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.content_hash IS NOT NULL THEN
+        UPDATE qc_file_blobs SET ref_count = ref_count + 1, released_at = NULL
+        WHERE digest = NEW.content_hash;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_cd_blob_refs ON qc_component_documents;
+CREATE TRIGGER trg_cd_blob_refs AFTER INSERT OR DELETE OR UPDATE OF content_hash ON qc_component_documents
+    FOR EACH ROW EXECUTE FUNCTION fn_file_blob_refs();
+
+COMMIT;
@@ -0,0 +1,21 @@
+-- ================================================================================
+-- MIGRATION 011: Storage backend per blob / document
+-- ================================================================================
+-- With UPLOAD_STORAGE=s3, clients PUT document content straight to the bucket
+-- through a presigned URL (POST /components/documents/presign, then /complete).
+-- file_path then holds the object key instead of a path under UPLOAD_DIR, so
+-- each row records which backend it lives in. Existing rows are local.
+--
+-- A blob keeps the backend it was first written to; later uploads of the same
+-- content reuse it wherever it is (see app/services/storage.py).
+-- ================================================================================
+
+BEGIN;
+
+ALTER TABLE qc_file_blobs
+    ADD COLUMN IF NOT EXISTS storage VARCHAR(20) NOT NULL DEFAULT 'local';
+
+ALTER TABLE qc_component_documents
+    ADD COLUMN IF NOT EXISTS storage VARCHAR(20) NOT NULL DEFAULT 'local';
+
+COMMIT;
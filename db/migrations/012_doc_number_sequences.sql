@@ -0,0 +1,88 @@
+-- ================================================================================
+-- MIGRATION 012: Document numbers from sequences
+-- ================================================================================
+-- Migration 009 took numbers from a row in qc_doc_number_counters, locked until
+-- commit. Every transaction inserting a GRN, queue entry or component therefore
+-- waited for the previous one to finish, and a bulk import or clone held the
+-- COMP- row for its whole run.
+--
+-- Each prefix and period now has its own sequence (qc_docno_grn_2026,
+-- qc_docno_comp, ...). nextval() never waits for other transactions. This gives
+-- up 009's gapless series: a rolled-back insert leaves a gap, the numbers stay
+-- unique and ascending.
+--
+-- Sequences are created ahead of use: this migration creates the current and
+-- next year's, and `flask --app wsgi doc-numbers-prepare` creates the year after
+-- (run it yearly from cron, before 31 December). fn_doc_number_sequence() still
+-- creates a missing sequence on first use, as a fallback; it runs as the
+-- function owner, so the app role needs no CREATE privilege on the schema. A
+-- sequence created that way starts after the counter in qc_doc_number_counters,
+-- which is kept, frozen, for that purpose.
+--
+-- fn_allocate_doc_numbers() is dropped; bulk writers call nextval() on
+-- fn_doc_number_sequence() once per row (app.services.doc_number_service).
+-- ================================================================================
+
+BEGIN;
+
+-- Wait for transactions still numbering through the counters, and keep new ones out until the swap
+LOCK TABLE qc_doc_number_counters IN EXCLUSIVE MODE;
+
+-- Sequence of a prefix / period, created if missing
+CREATE OR REPLACE FUNCTION fn_doc_number_sequence(p_prefix VARCHAR, p_period VARCHAR)
+RETURNS REGCLASS AS $$
+DECLARE
+    seq_name TEXT := 'qc_docno_' || LOWER(p_prefix) || CASE WHEN p_period = '' THEN '' ELSE '_' || p_period END;
+    seq REGCLASS := TO_REGCLASS(seq_name);
+    start_value BIGINT;
+BEGIN
+    IF seq IS NULL THEN
+        SELECT COALESCE(MAX(last_value), 0) + 1 INTO start_value
+        FROM qc_doc_number_counters WHERE prefix = p_prefix AND period = p_period;
+        BEGIN
+            EXECUTE format('CREATE SEQUENCE %I START WITH %s', seq_name, start_value);
+        EXCEPTION WHEN duplicate_table OR unique_violation THEN
+            NULL;  -- created by a concurrent transaction meanwhile
+        END;
+        seq := TO_REGCLASS(seq_name);
+    END IF;
+    RETURN seq;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Create the sequences of every yearly series for one year; returns how many were missing
+CREATE OR REPLACE FUNCTION fn_create_doc_number_sequences(p_period VARCHAR)
+RETURNS INTEGER AS $$
+DECLARE
+    p TEXT;
+    created INTEGER := 0;
+BEGIN
+    FOREACH p IN ARRAY ARRAY['GE', 'GRN', 'QC', 'IR', 'VR', 'ST', 'IRP'] LOOP
+        IF TO_REGCLASS('qc_docno_' || LOWER(p) || '_' || p_period) IS NULL THEN
+            PERFORM fn_doc_number_sequence(p, p_period);
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Next formatted number: PREFIX-PERIOD-00001, or PREFIX-001 without a period
+CREATE OR REPLACE FUNCTION fn_next_doc_number(p_prefix VARCHAR, p_period VARCHAR, p_width INTEGER DEFAULT 5)
+RETURNS VARCHAR AS $$
+DECLARE num TEXT;
+BEGIN
+    num := nextval(fn_doc_number_sequence(p_prefix, p_period))::TEXT;
+    RETURN p_prefix || '-' || CASE WHEN p_period = '' THEN '' ELSE p_period || '-' END
+        || LPAD(num, GREATEST(p_width, LENGTH(num)), '0');
+END;
+$$ LANGUAGE plpgsql;
+
+DROP FUNCTION IF EXISTS fn_allocate_doc_numbers(VARCHAR, VARCHAR, INTEGER);
+
+-- Sequences in use now and next year, so inserts do not race to create them
+SELECT fn_doc_number_sequence('COMP', '');
+SELECT fn_create_doc_number_sequences(TO_CHAR(CURRENT_DATE, 'YYYY'));
+SELECT fn_create_doc_number_sequences(TO_CHAR(CURRENT_DATE + INTERVAL '1 year', 'YYYY'));
+
+COMMIT;
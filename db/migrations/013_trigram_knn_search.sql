@@ -0,0 +1,39 @@
+-- ================================================================================
+-- MIGRATION 013: GiST trigram indexes for ranked search
+-- ================================================================================
+-- GET /search ranked every ILIKE match by similarity() before its LIMIT, so a
+-- common term scored thousands of rows per table. GiST trigram indexes also
+-- return rows nearest first (ORDER BY col <-> 'term' LIMIT n), which lets each
+-- column hand over only its top n matches (app.services.search_service).
+--
+-- GiST serves the ILIKE filters of the list endpoints too, so it replaces the GIN
+-- indexes of migration 005 rather than sitting next to them; with both present
+-- the planner picks GiST anyway.
+-- ================================================================================
+
+BEGIN;
+
+DROP INDEX IF EXISTS idx_cm_part_code_trgm, idx_cm_part_name_trgm, idx_cm_component_code_trgm,
+    idx_vnd_code_trgm, idx_vnd_name_trgm, idx_vnd_city_trgm,
+    idx_inst_code_trgm, idx_inst_name_trgm,
+    idx_sp_code_trgm, idx_sp_name_trgm,
+    idx_qp_code_trgm, idx_qp_name_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_cm_part_code_trgm      ON qc_component_master USING gist (part_code gist_trgm_ops) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_cm_part_name_trgm      ON qc_component_master USING gist (part_name gist_trgm_ops) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_cm_component_code_trgm ON qc_component_master USING gist (component_code gist_trgm_ops) WHERE is_deleted = FALSE;
+
+CREATE INDEX IF NOT EXISTS idx_vnd_code_trgm ON qc_vendors USING gist (vendor_code gist_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_vnd_name_trgm ON qc_vendors USING gist (vendor_name gist_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_vnd_city_trgm ON qc_vendors USING gist (city gist_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_inst_code_trgm ON qc_instruments USING gist (instrument_code gist_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_inst_name_trgm ON qc_instruments USING gist (instrument_name gist_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_sp_code_trgm ON qc_sampling_plans USING gist (plan_code gist_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_sp_name_trgm ON qc_sampling_plans USING gist (plan_name gist_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_qp_code_trgm ON qc_plans USING gist (plan_code gist_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_qp_name_trgm ON qc_plans USING gist (plan_name gist_trgm_ops);
+
+COMMIT;
@@ -0,0 +1,60 @@
+"""Fixtures for tests against a PostgreSQL test database.
+
+Point TEST_DATABASE_URL at a database with db/qc_holistic_schema_v4.sql and
+db/migrations/*.sql applied. Tests are skipped when it cannot be reached.
+"""
+import os
+
+# Read when app.config is imported
+os.environ.setdefault('AUTH_ENABLED', 'false')
+os.environ.setdefault('CACHE_BUS_ENABLED', 'false')
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app import create_app
+from app.extensions import db
+
+ADMIN = {'X-User-Id': '1', 'X-User-Name': 'test-admin', 'X-User-Role': 'admin'}
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    os.environ.setdefault('LOG_FILE', str(tmp_path_factory.mktemp('logs') / 'app.log'))
+    app = create_app('testing')
+    app.config['UPLOAD_DIR'] = str(tmp_path_factory.mktemp('uploads'))
+    with app.app_context():
+        try:
+            db.session.execute(db.text('SELECT 1'))
+        except OperationalError:
+            pytest.skip('test database not available (set TEST_DATABASE_URL)')
+        finally:
+            db.session.remove()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin():
+    return dict(ADMIN)
+
+
+
+@pytest.fixture
+def statements(app):
+    """SQL statements run while the test is active (clear() to start counting again)."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', record)
@@ -0,0 +1,50 @@
+import pytest
+
+from app.extensions import db
+from app.services import component_clone
+
+SOURCE_ID = 1  # sample component BSC-TRD-001
+
+
+@pytest.fixture
+def taken_code(app):
+    """A live component holding the code a clone of SOURCE_ID would get, as if created concurrently."""
+    with app.app_context():
+        code = component_clone.apply_part_code_rule(
+            db.session.get(component_clone.ComponentMaster, SOURCE_ID).part_code, component_clone.DEFAULT_RULE)
+        db.session.execute(db.text("INSERT INTO qc_component_master (part_code, part_name) VALUES (:code, 'Race')"),
+                           {'code': code})
+        db.session.commit()
+    yield code
+    with app.app_context():
+        db.session.execute(db.text("DELETE FROM qc_component_master WHERE part_code LIKE :code || '%'"),
+                           {'code': code})
+        db.session.commit()
+
+
+def _stale_lookup(monkeypatch, calls):
+    """free_part_codes() that misses the taken code `calls` times, then looks again for real."""
+    real = component_clone.free_part_codes
+    seen = []
+
+    def lookup(bases):
+        seen.append(bases)
+        return list(bases) if len(seen) <= calls else real(bases)
+
+    monkeypatch.setattr(component_clone, 'free_part_codes', lookup)
+    return seen
+
+
+def test_clone_retries_when_part_code_is_taken_meanwhile(client, admin, taken_code, monkeypatch):
+    seen = _stale_lookup(monkeypatch, calls=1)
+    resp = client.post('/api/v1/components/clone', json={'component_ids': [SOURCE_ID]}, headers=admin)
+    assert resp.status_code == 201, resp.get_json()
+    assert resp.get_json()['data'][0]['part_code'] == f'{taken_code}-2'
+    assert len(seen) == 2
+
+
+def test_clone_conflicting_twice_returns_409(client, admin, taken_code, monkeypatch):
+    _stale_lookup(monkeypatch, calls=2)
+    resp = client.post('/api/v1/components/clone', json={'component_ids': [SOURCE_ID]}, headers=admin)
+    assert resp.status_code == 409
+    assert taken_code in resp.get_json()['message']
@@ -0,0 +1,43 @@
+import io
+
+import pytest
+
+from app.extensions import db
+
+COMPONENTS = (b'part_code,part_name,category_code,group_code,inspection_type,qc_required\n'
+              b'IMPT-1,Import one,CAT-ELEC,GRP-PCB,100_percent,yes\n'
+              b'IMPT-2,Import two,CAT-ELEC,GRP-PCB,100_percent,yes\n')
+CHECKING_PARAMS = (b'part_code,checking_type,checking_point\n'
+                   b'impt-1,functional,Power on\n'
+                   b'IMPT-1,visual,Surface\n'
+                   b'IMPT-2,sideways,Bad type\n'
+                   b'IMPT-9,visual,No component\n')
+
+
+@pytest.fixture
+def cleanup(app):
+    yield
+    with app.app_context():
+        db.session.execute(db.text("DELETE FROM qc_component_master WHERE part_code LIKE 'IMPT-%'"))
+        db.session.commit()
+
+
+def test_import_matches_child_rows_to_components(app, client, admin, cleanup):
+    resp = client.post('/api/v1/components/import', headers=admin, content_type='multipart/form-data', data={
+        'file': (io.BytesIO(COMPONENTS), 'components.csv'),
+        'checking_parameters': (io.BytesIO(CHECKING_PARAMS), 'params.csv'),
+    })
+    assert resp.status_code == 200
+    result = resp.get_json()['data']
+    assert (result['created'], result['failed']) == (1, 1)
+    errors = {(e['sheet'], e['row'], e['part_code']) for e in result['errors']}
+    assert errors == {
+        ('Checking Parameters', 4, 'IMPT-2'),   # invalid checking_type
+        ('Components', 3, 'IMPT-2'),            # rejected for its invalid child row
+        ('Checking Parameters', 5, 'IMPT-9'),   # no such component in the file
+    }
+    with app.app_context():
+        points = db.session.execute(db.text(
+            "SELECT p.checking_point FROM qc_component_checking_params p "
+            "JOIN qc_component_master m ON m.id = p.component_id WHERE m.part_code = 'IMPT-1' ORDER BY p.id")).scalars()
+        assert list(points) == ['Power on', 'Surface']
@@ -0,0 +1,36 @@
+import pytest
+
+from app.extensions import db
+
+ROWS = 100
+
+
+@pytest.fixture
+def components(app):
+    """ROWS new components spread over the sample categories and vendors, each with checking params."""
+    with app.app_context():
+        db.session.execute(db.text('''
+            INSERT INTO qc_component_master (part_code, part_name, category_id, primary_vendor_id)
+            SELECT 'TEST-LIST-' || i, 'List test part ' || i, 1 + i % 6, 1 + i % 5
+            FROM generate_series(1, :rows) i'''), {'rows': ROWS})
+        db.session.execute(db.text('''
+            INSERT INTO qc_component_checking_params (component_id, checking_type, checking_point)
+            SELECT c.id, t.kind, 'Point ' || c.part_code
+            FROM qc_component_master c, (VALUES ('visual'), ('functional')) t(kind)
+            WHERE c.part_code LIKE 'TEST-LIST-%' '''))
+        db.session.commit()
+    yield
+    with app.app_context():
+        db.session.execute(db.text("DELETE FROM qc_component_master WHERE part_code LIKE 'TEST-LIST-%'"))
+        db.session.commit()
+
+
+def test_component_list_query_count_does_not_grow_with_page_size(client, admin, components, statements):
+    counts = {}
+    for per_page in (1, ROWS):
+        statements.clear()
+        resp = client.get(f'/api/v1/components?per_page={per_page}', headers=admin)
+        assert resp.status_code == 200
+        assert len(resp.get_json()['data']) == per_page
+        counts[per_page] = len(statements)
+    assert counts[1] == counts[ROWS], counts
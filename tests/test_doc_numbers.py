@@ -0,0 +1,78 @@
+import re
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from app.extensions import db
+from app.services.doc_number_service import allocate_numbers
+
+CONCURRENT = 50
+
+
+def test_concurrent_grn_inserts_get_unique_numbers(app):
+    """50 transactions inserting a GRN at once all commit, with distinct numbers."""
+    with app.app_context():
+        # A connection per thread; the app's pool is smaller than CONCURRENT
+        engine = create_engine(db.engine.url, poolclass=NullPool)
+    barrier = threading.Barrier(CONCURRENT, timeout=30)
+    numbers, errors = [], []
+
+    def insert_grn(i):
+        conn = engine.raw_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute('SET lock_timeout = 2000')
+            barrier.wait()
+            cur.execute("INSERT INTO qc_grn (vendor_id, po_number) VALUES (1, %s) RETURNING grn_number",
+                        (f'PO-CONC-{i}',))
+            numbers.append(cur.fetchone()[0])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            errors.append(e)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=insert_grn, args=(i,)) for i in range(CONCURRENT)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert errors == []
+        assert len(set(numbers)) == CONCURRENT
+        assert all(re.fullmatch(r'GRN-\d{4}-\d{5,}', n) for n in numbers)
+    finally:
+        engine.dispose()
+        with app.app_context():
+            db.session.execute(db.text("DELETE FROM qc_grn WHERE po_number LIKE 'PO-CONC-%'"))
+            db.session.commit()
+
+
+def test_open_bulk_allocation_does_not_block_inserts(app):
+    """A transaction holding a block of COMP- numbers does not make other allocations wait."""
+    result = {}
+
+    def allocate_elsewhere():
+        with app.app_context():
+            try:
+                db.session.execute(db.text('SET LOCAL lock_timeout = 1000'))
+                result['codes'] = allocate_numbers('component', 1)
+            finally:
+                db.session.rollback()
+
+    with app.app_context():
+        bulk = allocate_numbers('component', 500)  # transaction left open
+        try:
+            t = threading.Thread(target=allocate_elsewhere)
+            t.start()
+            t.join(timeout=10)
+            assert not t.is_alive(), 'allocation blocked behind the open bulk allocation'
+        finally:
+            db.session.rollback()
+
+    nums = [int(code.rsplit('-', 1)[1]) for code in bulk]
+    assert len(set(nums)) == 500 and nums == sorted(nums)
+    assert 'codes' in result, 'allocation in the second transaction failed'
+    assert result['codes'][0] not in bulk
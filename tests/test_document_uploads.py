@@ -0,0 +1,22 @@
+import io
+
+import pytest
+
+SHA256 = 'e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855'
+
+
+@pytest.mark.parametrize('component_id', ['abc', '1.5', [1], True, 2.0])
+def test_upload_session_rejects_non_integer_component_id(client, admin, component_id):
+    resp = client.post('/api/v1/components/documents/uploads', headers=admin, json={
+        'component_id': component_id, 'document_type': 'drawing', 'file_name': 'a.pdf',
+        'size': 10, 'sha256': SHA256})
+    assert resp.status_code == 400
+    assert resp.get_json()['message'] == 'component_id must be an integer'
+
+
+def test_batch_upload_rejects_non_integer_component_id(client, admin):
+    resp = client.post('/api/v1/components/documents/batch', headers=admin, content_type='multipart/form-data',
+                       data={'component_id': 'abc', 'document_type': 'drawing',
+                             'files': [(io.BytesIO(b'%PDF-1.4'), 'a.pdf')]})
+    assert resp.status_code == 400
+    assert resp.get_json()['message'] == 'component_id must be an integer'